@@ -37,6 +37,8 @@ class RealAgentDeployment:
         self.aws_instance = "i-020ec2022c95828c8"
         self.aws_ip = "23.20.144.42"
         self.anthropic_key = os.environ.get('ANTHROPIC_API_KEY', 'NEED_TO_SET')
+        # One systemd unit per agent (deployment/agentforce@.service) so deploys restart agents individually
+        self.restart_command = "sudo systemctl restart agentforce@{agent}"
         
     def create_agent_directives(self):
         """Create comprehensive directives for all agents"""
@@ -167,143 +169,30 @@ AGENTFORCE INTEGRATION TEST SUITE
 Test all real integrations and report results
 """
 
-import os
 import json
-import subprocess
-from datetime import datetime
-
-def test_claude_integration():
-    """Test Claude API integration"""
-    try:
-        import anthropic
-        
-        api_key = os.environ.get('ANTHROPIC_API_KEY')
-        if not api_key:
-            return {"success": False, "error": "ANTHROPIC_API_KEY not set"}
-            
-        client = anthropic.Anthropic(api_key=api_key)
-        
-        response = client.messages.create(
-            model="claude-3-5-sonnet-latest",
-            max_tokens=100,
-            messages=[{"role": "user", "content": "AgentForce integration test - respond with success confirmation"}]
-        )
-        
-        return {
-            "success": True,
-            "service": "Claude API",
-            "response": response.content[0].text[:100] + "...",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e), "service": "Claude API"}
-
-def test_google_workspace():
-    """Test Google Workspace integration"""
-    try:
-        from google.oauth2.service_account import Credentials
-        from googleapiclient.discovery import build
-        
-        # Check service account file
-        service_account_file = "google_service_account.json"
-        if not os.path.exists(service_account_file):
-            return {"success": False, "error": "Service account file not found"}
-            
-        scopes = ['https://www.googleapis.com/auth/drive.readonly']
-        creds = Credentials.from_service_account_file(service_account_file, scopes=scopes)
-        
-        # Test Drive API connection
-        drive_service = build('drive', 'v3', credentials=creds)
-        
-        return {
-            "success": True,
-            "service": "Google Workspace",
-            "credentials_loaded": True,
-            "apis_ready": True,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e), "service": "Google Workspace"}
+import sys
 
-def test_gimp_availability():
-    """Test GIMP installation and virtual display"""
-    try:
-        # Check GIMP installation
-        result = subprocess.run(["which", "gimp"], capture_output=True, text=True)
-        gimp_installed = result.returncode == 0
-        
-        # Check Xvfb for virtual display
-        xvfb_result = subprocess.run(["which", "Xvfb"], capture_output=True, text=True)
-        xvfb_installed = xvfb_result.returncode == 0
-        
-        return {
-            "success": gimp_installed and xvfb_installed,
-            "service": "GIMP Image Processing",
-            "gimp_installed": gimp_installed,
-            "xvfb_installed": xvfb_installed,
-            "ready_for_agents": gimp_installed and xvfb_installed,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e), "service": "GIMP"}
+from integrations.health_checks import check_health, summarize, LIVENESS, READINESS
 
-def test_ffmpeg_availability():
-    """Test FFmpeg installation"""
-    try:
-        # Check FFmpeg installation
-        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
-        ffmpeg_installed = result.returncode == 0
-        
-        # Check FFprobe
-        probe_result = subprocess.run(["ffprobe", "-version"], capture_output=True, text=True)
-        ffprobe_installed = probe_result.returncode == 0
-        
-        return {
-            "success": ffmpeg_installed and ffprobe_installed,
-            "service": "FFmpeg Video Processing",
-            "ffmpeg_installed": ffmpeg_installed,
-            "ffprobe_installed": ffprobe_installed,
-            "ready_for_agents": ffmpeg_installed and ffprobe_installed,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e), "service": "FFmpeg"}
-
-def run_integration_tests():
-    """Run all integration tests and report results"""
+def run_integration_tests(mode=READINESS):
+    """Run all integration probes concurrently and report results"""
     print("🧪 AGENTFORCE INTEGRATION TEST SUITE")
     print("=" * 45)
     
-    tests = [
-        test_claude_integration,
-        test_google_workspace,
-        test_gimp_availability,
-        test_ffmpeg_availability
-    ]
-    
-    results = []
+    results = check_health(mode, timeout=15.0)
     
-    for test in tests:
-        print(f"\n🔬 Running {test.__name__}...")
-        result = test()
-        results.append(result)
-        
+    for result in results:
         if result["success"]:
-            print(f"✅ {result['service']}: PASSED")
+            print(f"✅ {result['service']}: PASSED ({result['duration_ms']} ms)")
         else:
             print(f"❌ {result['service']}: FAILED - {result['error']}")
     
     # Summary
-    passed = sum(1 for r in results if r["success"])
-    total = len(results)
+    summary = summarize(results)
     
-    print(f"\n📊 TEST SUMMARY: {passed}/{total} PASSED")
+    print(f"\\n📊 TEST SUMMARY: {summary['passed']}/{summary['total']} PASSED")
     
-    if passed == total:
+    if summary["healthy"]:
         print("🎯 ALL INTEGRATIONS READY FOR AGENT DEPLOYMENT")
     else:
         print("⚠️ SOME INTEGRATIONS NEED SETUP")
@@ -311,17 +200,27 @@ def run_integration_tests():
     return results
 
 if __name__ == "__main__":
-    results = run_integration_tests()
+    # --live runs the cheap liveness probes only
+    results = run_integration_tests(LIVENESS if "--live" in sys.argv else READINESS)
     
     # Save results
     with open("integration_test_results.json", "w") as f:
         json.dump(results, f, indent=2)
     
-    print(f"\n💾 Results saved to integration_test_results.json")
+    print(f"\\n💾 Results saved to integration_test_results.json")
 '''
         
         return test_suite
     
+    def deploy_bundle(self, target=None, root="."):
+        """Delta-deploy the code tree; target defaults to the EC2 host over ssh (LocalTarget for tests)"""
+        from deployment.bundle_builder import CommandTarget, deploy
+        target = target or CommandTarget(
+            ["ssh", f"ubuntu@{self.aws_ip}"], "/home/ubuntu/agentforce_integrations/code",
+            self.restart_command, remote_shell=True
+        )
+        return deploy(root, target)
+
     async def deploy_to_agents(self):
         """Deploy directives and integrations to agents"""
         
@@ -345,6 +244,7 @@ if __name__ == "__main__":
         print("✅ Integration test suite: integration_test_suite.py")
         
         # Create AWS deployment commands
+        units = " ".join(f"agentforce@{name}" for group in AGENT_CONFIGS.values() for name in group)
         aws_commands = f'''
 #!/bin/bash
 # AWS Agent Deployment Commands
@@ -353,27 +253,45 @@ echo "🚀 DEPLOYING AGENTFORCE WITH REAL INTEGRATIONS"
 echo "AWS Instance: {self.aws_instance}"
 echo "IP Address: {self.aws_ip}"
 
-# Upload files to AWS
-scp google_service_account.json ubuntu@{self.aws_ip}:/home/ubuntu/agentforce_integrations/
-scp AGENT_DEPLOYMENT_DIRECTIVES.md ubuntu@{self.aws_ip}:/home/ubuntu/agentforce_integrations/
-scp integration_test_suite.py ubuntu@{self.aws_ip}:/home/ubuntu/agentforce_integrations/
+# Credentials, generated files and the unit template are not part of the code bundle
+scp google_service_account.json AGENT_DEPLOYMENT_DIRECTIVES.md integration_test_suite.py \\
+    deployment/agentforce@.service ubuntu@{self.aws_ip}:/home/ubuntu/agentforce_integrations/
 
-# Run deployment on AWS
+# Install the per-agent unit template before the deploy restarts anything through it
 ssh ubuntu@{self.aws_ip} << 'EOF'
 cd /home/ubuntu/agentforce_integrations
+echo "ANTHROPIC_API_KEY={self.anthropic_key}" > agentforce.env
+chmod 600 agentforce.env
+sudo install -m 644 agentforce@.service /etc/systemd/system/agentforce@.service
+sudo systemctl daemon-reload
+EOF
 
-# Set environment variables
+# Refuse to ship agents whose cold-start import time regressed
+python3 -m deployment.import_budget || exit 1
+
+# Ship only files changed since the live release, swap it in atomically and
+# restart just the agents whose code changed
+python3 -m deployment.bundle_builder deploy --ssh ubuntu@{self.aws_ip} \\
+    --deploy-root /home/ubuntu/agentforce_integrations/code \\
+    --restart-command "{self.restart_command}"
+case $? in
+    0) ;;
+    3) echo "⚠️ Release is live but some agent restarts failed; see the report above" ;;
+    *) exit 1 ;;
+esac
+
+# Run integration tests against the new release
+ssh ubuntu@{self.aws_ip} << 'EOF'
+cd /home/ubuntu/agentforce_integrations/code/current
 export ANTHROPIC_API_KEY="{self.anthropic_key}"
 export DISPLAY=:99
+source /home/ubuntu/agentforce_integrations/agentforce_env/bin/activate
+# The suite lives outside the release; put the release's packages on the path
+PYTHONPATH="$PWD" python3 /home/ubuntu/agentforce_integrations/integration_test_suite.py
 
-# Activate virtual environment
-source agentforce_env/bin/activate
-
-# Run integration tests
-python3 integration_test_suite.py
-
-# Start agents with real integrations
-./start_agents.sh
+# Start (and enable at boot) every agent; agents already running are left alone
+sudo systemctl enable --now {units}
+systemctl --no-pager --plain list-units 'agentforce@*'
 
 echo "✅ AgentForce deployed with real integrations!"
 EOF
@@ -394,7 +312,7 @@ echo "🎯 Agent deployment complete!"
                 "deploy_to_aws.sh"
             ],
             "next_steps": [
-                "Run deploy_to_aws.sh to upload to AWS",
+                "Run deploy_to_aws.sh to upload changed files to AWS",
                 "Agents will activate with real integrations",
                 "Monitor agent progress through GitHub commits"
             ]
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Agent Job Server - Async HTTP job API on each agent's configured port
+Accepts jobs, returns job IDs, streams results by long-poll or server-sent
+events, and answers 429 when the agent's queue is full
+"""
+
+import argparse
+import asyncio
+import inspect
+import itertools
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+from agents.agent_metrics import QUEUE_DEPTH, REGISTRY, record_job
+from agents.event_scheduler import NEW_TASK
+from integrations.google_quota_manager import acting_as
+from integrations.tracing import run_in_context, span
+
+STATUS_TEXT = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error", 503: "Service Unavailable"
+}
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+def _gimp(server):
+    return server.component("gimp", "integrations.gimp_agent_processor", "GimpAgentProcessor")
+
+
+def _ffmpeg(server):
+    processor = server.component("ffmpeg", "integrations.ffmpeg_agent_processor", "FFmpegAgentProcessor")
+    processor.load_probe = server.backlog  # Queue depth drives adaptive encoder presets
+    return processor
+
+
+def _google(server):
+    if server.clients is not None:
+        return server.clients.get("google")
+    return server.component("google", "integrations.real_google_workspace_agent", "RealGoogleWorkspaceAgent")
+
+
+def _claude(server):
+    if server.clients is not None:
+        return server.clients.claude_integration(server.agent_name)
+    from integrations.agent_claude_integration import AgentClaudeIntegration
+    return AgentClaudeIntegration(server.agent_name)
+
+
+async def ping_job(server, params):
+    """Lightweight job used for health and load testing"""
+    return {"success": True, "agent": server.agent_name, "echo": params}
+
+
+async def workflow_job(server, params):
+    """Run a declarative multi-agent workflow (see agents/workflow_dag.py)"""
+    from agents.workflow_dag import WorkflowDAG
+    dag = WorkflowDAG(params["workflow"], checkpoint_path=params.get("checkpoint_path"), clients=server.clients)
+    return await dag.run(params.get("inputs"))
+
+
+# Job types each agent accepts: job_type -> handler(server, params)
+JOB_HANDLERS = {
+    "image_editor": {
+        "process_image": lambda s, p: _gimp(s).process_image(p["input_path"], p["output_path"], p.get("operations", []), p.get("tiled"), p.get("encode_options")),
+        "create_design_template": lambda s, p: _gimp(s).create_design_template(p["template_type"], p["output_path"], p.get("encode_options")),
+        "batch_process_images": lambda s, p: _gimp(s).batch_process_images(p["input_dir"], p["output_dir"], p.get("operations", []), p.get("encode_options"), transport=p.get("transport", "files"))
+    },
+    "video_processor": {
+        "process_video": lambda s, p: _ffmpeg(s).process_video(p["input_path"], p["output_path"], p.get("operations", []), preset=p.get("preset"), deadline_s=p.get("deadline_s")),
+        "compress_video": lambda s, p: _ffmpeg(s).compress_video(p["input_path"], p["output_path"], p.get("target_size_mb"), p.get("preset"), p.get("deadline_s")),
+        "extract_audio": lambda s, p: _ffmpeg(s).extract_audio(p["video_path"], p["audio_path"], p.get("normalize", False), p.get("loudness_targets")),
+        "extract_audio_batch": lambda s, p: _ffmpeg(s).extract_audio_batch(p["jobs"], p.get("normalize", False), p.get("loudness_targets")),
+        "create_video_from_images": lambda s, p: _ffmpeg(s).create_video_from_images(p["image_pattern"], p["output_path"], p.get("fps", 30)),
+        "get_video_info": lambda s, p: _ffmpeg(s).get_video_info(p["video_path"]),
+        "autonomous_video_processing": lambda s, p: _ffmpeg(s).autonomous_video_processing(p["input_video"], p.get("target_format", "web"), output_dir=p.get("output_dir")),
+        "package_stream": lambda s, p: _ffmpeg(s).package_stream(p["input_path"], p["output_dir"], tuple(p.get("formats", ("hls", "dash"))), p.get("ladder"), p.get("segment_seconds", 4)),
+        "analyze_video": lambda s, p: _ffmpeg(s).analyze_video(p["video_path"], p["output_dir"], p.get("scene_threshold", 0.3), p.get("sample_interval"))
+    },
+    "design_agent": {
+        "ask_claude": lambda s, p: _claude(s).ask_claude(p["question"], p.get("context", "")),
+        "analyze_video": lambda s, p: _ffmpeg(s).analyze_video(p["video_path"], p["output_dir"], p.get("scene_threshold", 0.3), p.get("sample_interval"))
+    },
+    "analytics_agent": {
+        "create_spreadsheet": lambda s, p: _google(s).create_spreadsheet(p["title"], p.get("headers"), p.get("data"))
+    },
+    "report_generator": {
+        "create_document": lambda s, p: _google(s).create_document(p["title"], p.get("content", "")),
+        "upload_file": lambda s, p: _google(s).upload_file(p["file_path"], p.get("filename"), p.get("folder_id")),
+        "sync_drive_folder": lambda s, p: _google(s).sync_folder(p["local_dir"], p["folder_id"], p.get("delete_missing", False))
+    },
+    "project_manager": {
+        "create_document": lambda s, p: _google(s).create_document(p["title"], p.get("content", "")),
+        "ask_claude": lambda s, p: _claude(s).ask_claude(p["question"], p.get("context", "")),
+        "run_workflow": workflow_job
+    },
+    "ai_architect": {
+        "claude_code_review": lambda s, p: _claude(s).claude_code_review(p["code"])
+    },
+    "code_generator": {
+        "claude_problem_solve": lambda s, p: _claude(s).claude_problem_solve(p["problem"])
+    }
+}
+
+
+class Job:
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.params = params
+        self.status = "queued"
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "result": self.result,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "duration": round(self.finished_at - self.created_at, 4) if self.finished_at else None
+        }
+
+
+class JobContext:
+    """Agent identity plus lazily built integration processors for job handlers"""
+
+    def __init__(self, agent_name, handlers=None, clients=None):
+        self.agent_name = agent_name
+        self.clients = clients
+        self.handlers = {"ping": ping_job}
+        self.handlers.update(JOB_HANDLERS.get(agent_name, {}) if handlers is None else handlers)
+        self.components = {}
+
+    def backlog(self):
+        """Jobs waiting behind the current one; servers and consumers override this"""
+        return 0
+
+    def component(self, key, module_name, class_name):
+        """Build an integration processor once and reuse it for every job"""
+        if key not in self.components:
+            module = __import__(module_name, fromlist=[class_name])
+            self.components[key] = getattr(module, class_name)()
+        return self.components[key]
+
+
+class AgentJobServer(JobContext):
+    def __init__(self, agent_name, port, host="0.0.0.0", handlers=None, max_queue=1000,
+                 workers=8, max_finished_jobs=10000, scheduler=None, clients=None):
+        super().__init__(agent_name, handlers, clients)
+        self.port = port
+        self.host = host
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.worker_count = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.scheduler = scheduler
+        self.jobs = OrderedDict()
+        self.server = None
+        self.workers = []
+
+    def backlog(self):
+        return self.queue.qsize()
+
+    # ---- job lifecycle -------------------------------------------------
+
+    def submit(self, job_type, params):
+        """Queue a job; raises asyncio.QueueFull when the agent is saturated"""
+        if job_type not in self.handlers:
+            raise KeyError(job_type)
+        job = Job(job_type, params)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        if self.scheduler is not None:
+            self.scheduler.publish(NEW_TASK, {"agent": self.agent_name, "task": job_type, "job_id": job.id},
+                                   source=self.agent_name)
+        return job
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            started = time.perf_counter()
+            try:
+                # acting_as attributes shared-client Google quota use to this agent
+                with span(f"job.{job.type}", agent=self.agent_name, job_id=job.id) as job_span, \
+                        acting_as(self.agent_name):
+                    handler = self.handlers[job.type]
+                    if inspect.iscoroutinefunction(handler):
+                        result = await handler(self, job.params)
+                    else:
+                        # Integrations block on subprocesses and HTTP; keep the loop free.
+                        # The copied context keeps integration spans nested under the job span.
+                        result = await loop.run_in_executor(None, run_in_context(handler, self, job.params))
+                    if inspect.isawaitable(result):
+                        result = await result
+                    job_span.record_result(result)
+                job.result = result
+                job.status = "completed" if not isinstance(result, dict) or result.get("success", True) else "failed"
+            except Exception as e:
+                job.result = {"success": False, "error": str(e)}
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                if job.type != "ping":
+                    record_job(self.agent_name, job.type, job.result, time.perf_counter() - started, job.params)
+                job.done.set()
+                self.queue.task_done()
+                self._evict_finished()
+
+    def _evict_finished(self):
+        while len(self.jobs) > self.max_finished_jobs:
+            oldest_id = next(iter(self.jobs))
+            if not self.jobs[oldest_id].done.is_set():
+                break
+            del self.jobs[oldest_id]
+
+    # ---- HTTP ----------------------------------------------------------
+
+    async def start(self):
+        QUEUE_DEPTH.set_function(self.queue.qsize, agent=self.agent_name)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                 reuse_address=True, backlog=1024)
+        print(f"🌐 {self.agent_name} job API listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, {"error": "Headers too large"}, keep_alive=False)
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    await self._send(writer, 413, {"error": "Headers too large"}, keep_alive=False)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                request_line = lines[0].split(" ", 2)
+                if len(request_line) != 3:
+                    await self._send(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+                method, target, version = request_line
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                # Without a usable length the body can't be framed, so the connection closes after the 400
+                length = headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self._send(writer, 400, {"error": f"Invalid Content-Length: {length!r}"}, keep_alive=False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": "Body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                keep_alive = await self._route(method, target, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body, writer, keep_alive):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+
+        if parts == ["health"]:
+            await self._send(writer, 200, {"agent": self.agent_name, "status": "ok",
+                                           "queue_depth": self.queue.qsize(),
+                                           "queue_capacity": self.queue.maxsize}, keep_alive)
+        elif parts == ["metrics"]:
+            await self._send(writer, 200, REGISTRY.render(), keep_alive,
+                             content_type="text/plain; version=0.0.4; charset=utf-8")
+        elif parts == ["ready"]:
+            from integrations.health_checks import run_health_checks, summarize, READINESS
+            results = await run_health_checks(READINESS)
+            summary = summarize(results)
+            await self._send(writer, 200 if summary["healthy"] else 503,
+                             dict(summary, agent=self.agent_name, probes=results), keep_alive)
+        elif parts == ["jobs"] and method == "POST":
+            await self._create_job(body, writer, keep_alive)
+        elif parts == ["jobs"] and method == "GET":
+            await self._send(writer, 200, {"agent": self.agent_name, "job_types": sorted(self.handlers)}, keep_alive)
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            await self._get_job(parts[1], query, writer, keep_alive)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and method == "GET":
+            await self._stream_job(parts[1], writer)
+            return False
+        else:
+            await self._send(writer, 404, {"error": f"No route for {method} {url.path}"}, keep_alive)
+        return keep_alive
+
+    async def _create_job(self, body, writer, keep_alive):
+        try:
+            request = json.loads(body or b"{}")
+            job_type = request["type"]
+            params = request.get("params", {})
+        except (ValueError, KeyError, TypeError):
+            await self._send(writer, 400, {"error": "Expected JSON body with 'type' and 'params'"}, keep_alive)
+            return
+
+        try:
+            job = self.submit(job_type, params)
+        except KeyError:
+            await self._send(writer, 400, {"error": f"Unknown job type: {job_type}",
+                                           "job_types": sorted(self.handlers)}, keep_alive)
+        except asyncio.QueueFull:
+            await self._send(writer, 429, {"error": "Queue full", "queue_depth": self.queue.qsize()},
+                             keep_alive, extra_headers={"Retry-After": "1"})
+        else:
+            await self._send(writer, 202, {"job_id": job.id, "status": job.status,
+                                           "status_url": f"/jobs/{job.id}",
+                                           "events_url": f"/jobs/{job.id}/events"}, keep_alive)
+
+    async def _get_job(self, job_id, query, writer, keep_alive):
+        job = self.jobs.get(job_id)
+        if job is None:
+            await self._send(writer, 404, {"error": f"Unknown job: {job_id}"}, keep_alive)
+            return
+        try:
+            wait = min(float(query.get("wait", ["0"])[0]), 60.0)
+        except ValueError:
+            wait = None
+        if wait is None or wait != wait:  # NaN compares unequal to itself
+            await self._send(writer, 400, {"error": f"Invalid wait: {query['wait'][0]!r}; expected seconds"},
+                             keep_alive)
+            return
+        if wait > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        await self._send(writer, 200, job.to_dict(), keep_alive)
+
+    async def _stream_job(self, job_id, writer):
+        """Server-sent events: one status event now, one result event when done"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            await self._send(writer, 404, {"error": f"Unknown job: {job_id}"}, keep_alive=False)
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        writer.write(f"event: status\ndata: {json.dumps({'status': job.status})}\n\n".encode())
+        await writer.drain()
+        while not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), 15.0)
+            except asyncio.TimeoutError:
+                writer.write(b": keep-alive\n\n")
+                await writer.drain()
+        writer.write(f"event: result\ndata: {json.dumps(job.to_dict(), default=str)}\n\n".encode())
+        await writer.drain()
+
+    async def _send(self, writer, status, payload, keep_alive, extra_headers=None,
+                    content_type="application/json"):
+        body = payload.encode() if isinstance(payload, str) else json.dumps(payload, default=str).encode()
+        headers = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        for key, value in (extra_headers or {}).items():
+            headers.append(f"{key}: {value}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+
+async def load_test(host="127.0.0.1", port=8001, requests=20000, concurrency=64, path="/health"):
+    """Keep-alive load generator for the lightweight endpoints"""
+    counter = itertools.count()
+    statuses = {}
+    post = path == "/jobs"
+    body = json.dumps({"type": "ping", "params": {}}).encode()
+    if post:
+        request = (f"POST /jobs HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    else:
+        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        while next(counter) < requests:
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = sum(statuses.values())
+    return {"requests": total, "seconds": round(elapsed, 3),
+            "requests_per_second": round(total / elapsed), "statuses": statuses}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an agent's HTTP job API")
+    parser.add_argument("agent", help="Agent name from AGENT_CONFIGS, e.g. image_editor")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, help="Override the configured port")
+    parser.add_argument("--bench", choices=["/health", "/jobs"], help="Run a local load test and exit")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    from agents.agent_supervisor import flatten_agent_configs
+    port = args.port or flatten_agent_configs()[args.agent]["port"]
+    server = AgentJobServer(args.agent, port, host=args.host)
+
+    async def bench():
+        await server.start()
+        try:
+            result = await load_test("127.0.0.1", port, args.requests, args.concurrency, args.bench)
+        finally:
+            await server.stop()
+        print(f"📈 Load test {args.bench}: {json.dumps(result)}")
+
+    try:
+        asyncio.run(bench() if args.bench else server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Agent Metrics - Counters, gauges and latency histograms for every agent
+A small registry with array-backed fixed-bucket histograms, rendered in
+the Prometheus text exposition format on each agent's /metrics endpoint
+"""
+
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+# Seconds; integration jobs run from milliseconds (API calls) to many minutes (encodes)
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Result keys that name a file an integration wrote
+OUTPUT_FILE_KEYS = ("processed_file", "compressed_file", "audio_extracted", "encoded_file",
+                    "video_created", "template_created")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}") from e
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self.lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                    for key, value in sorted(self.values.items())]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+        self.functions = {}
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function, **labels):
+        """Evaluate `function` at scrape time, e.g. a live queue size"""
+        with self.lock:
+            self.functions[self._key(labels)] = function
+
+    def get(self, **labels):
+        key = self._key(labels)
+        function = self.functions.get(key)
+        return function() if function else self.values.get(key, 0)
+
+    def samples(self):
+        with self.lock:
+            current = dict(self.values)
+            functions = dict(self.functions)
+        for key, function in functions.items():
+            try:
+                current[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(current.items())]
+
+
+class Histogram(Metric):
+    """Fixed buckets; each label set keeps one array of per-bucket counts plus a sum"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = {}  # label key -> array('Q') of len(buckets) + 1 (last is +Inf)
+        self.sums = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = array("Q", bytes(8 * (len(self.buckets) + 1)))
+                self.sums[key] = 0.0
+            counts[index] += 1
+            self.sums[key] += value
+
+    def quantile(self, q, **labels):
+        """Bucket upper bound below which a fraction q of observations fall"""
+        counts = self.counts.get(self._key(labels))
+        if not counts:
+            return None
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def count(self, **labels):
+        counts = self.counts.get(self._key(labels))
+        return sum(counts) if counts else 0
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            snapshot = [(key, array("Q", counts), self.sums[key]) for key, counts in sorted(self.counts.items())]
+        for key, counts, total in snapshot:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+JOBS = REGISTRY.counter("agent_jobs_total", "Jobs finished by an agent", ("agent", "job_type", "status"))
+JOB_DURATION = REGISTRY.histogram("agent_job_duration_seconds", "Job wall time", ("agent", "job_type"))
+BYTES_PROCESSED = REGISTRY.counter("agent_bytes_processed_total", "Bytes read and written by jobs",
+                                   ("agent", "direction"))
+CACHE_EVENTS = REGISTRY.counter("agent_cache_events_total", "Cache and dedupe lookups",
+                                ("agent", "cache", "result"))
+QUEUE_DEPTH = REGISTRY.gauge("agent_queue_depth", "Jobs waiting for an agent", ("agent",))
+AGENT_INFO = REGISTRY.gauge("agent_info", "Configured agents", ("agent", "group", "port"))
+
+
+def declare_agents(agent_configs):
+    """Publish every configured agent, so idle agents still show up with zero counts"""
+    for name, config in agent_configs.items():
+        AGENT_INFO.set(1, agent=name, group=config.get("group", ""), port=config.get("port", ""))
+        QUEUE_DEPTH.set(0, agent=name)
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path) if path and os.path.isfile(path) else 0
+    except (OSError, TypeError):
+        return 0
+
+
+def record_cache(agent, cache, hit):
+    CACHE_EVENTS.inc(agent=agent, cache=cache, result="hit" if hit else "miss")
+
+
+def record_job(agent, job_type, result, seconds, params=None):
+    """Fold one finished job into the standard metrics"""
+    success = not isinstance(result, dict) or result.get("success", True)
+    JOBS.inc(agent=agent, job_type=job_type, status="completed" if success else "failed")
+    JOB_DURATION.observe(seconds, agent=agent, job_type=job_type)
+    if not isinstance(result, dict):
+        return
+
+    params = params or {}
+    bytes_in = sum(_file_size(params.get(key)) for key in ("input_path", "video_path"))
+    bytes_out = sum(_file_size(result.get(key)) for key in OUTPUT_FILE_KEYS)
+    if bytes_in:
+        BYTES_PROCESSED.inc(bytes_in, agent=agent, direction="in")
+    if bytes_out:
+        BYTES_PROCESSED.inc(bytes_out, agent=agent, direction="out")
+
+    # Caches surface through the result dicts of the integrations that own them
+    if "duplicate_of" in result:
+        record_cache(agent, "dedupe", True)
+    if "duplicates_found" in result:
+        hits = result["duplicates_found"]
+        CACHE_EVENTS.inc(hits, agent=agent, cache="dedupe", result="hit")
+        CACHE_EVENTS.inc(result.get("processed_count", 0) - hits, agent=agent, cache="dedupe", result="miss")
+    loudness = result.get("loudness")
+    if isinstance(loudness, dict) and "measurement_cached" in loudness:
+        record_cache(agent, "loudness", loudness["measurement_cached"])
+
+
+def _snapshot(metric):
+    with metric.lock:
+        return list(metric.values.items())
+
+
+def agent_summary(agent):
+    """Real operational numbers for one agent, for progress reports"""
+    jobs = [(k, v) for k, v in _snapshot(JOBS) if k[0] == agent]
+    completed = sum(v for k, v in jobs if k[2] == "completed")
+    failed = sum(v for k, v in jobs if k[2] == "failed")
+    with JOB_DURATION.lock:
+        durations = [(sum(counts), JOB_DURATION.sums[k]) for k, counts in JOB_DURATION.counts.items() if k[0] == agent]
+    observed = sum(count for count, _ in durations)
+    cache = [(k, v) for k, v in _snapshot(CACHE_EVENTS) if k[0] == agent]
+    hits = sum(v for k, v in cache if k[2] == "hit")
+    lookups = sum(v for _, v in cache)
+    return {
+        "jobs_completed": completed,
+        "jobs_failed": failed,
+        "success_rate": round(completed / (completed + failed), 3) if completed + failed else None,
+        "mean_job_seconds": round(sum(total for _, total in durations) / observed, 3) if observed else None,
+        "bytes_processed": sum(v for k, v in _snapshot(BYTES_PROCESSED) if k[0] == agent),
+        "cache_hit_rate": round(hits / lookups, 3) if lookups else None,
+        "queue_depth": QUEUE_DEPTH.get(agent=agent)
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(1)
+    declare_agents({"video_processor": {"group": "creative_suite_agents", "port": 8002}})
+    for _ in range(1000):
+        record_job("video_processor", "process_video", {"success": rng.random() > 0.05}, rng.expovariate(1 / 3))
+
+    scratch = Histogram("bench_seconds", "Benchmark only", ("agent",))
+    start = time.perf_counter()
+    for _ in range(100_000):
+        scratch.observe(0.2, agent="video_processor")
+    per_observe_us = (time.perf_counter() - start) * 10
+
+    print(REGISTRY.render()[:1200])
+    print(f"⏱️ Histogram observe: {per_observe_us:.2f} µs")
+    print(agent_summary("video_processor"))
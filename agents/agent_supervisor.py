@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Agent Supervisor - Host many AGENT_CONFIGS agents in one process
+One event loop (or a small fixed pool of worker processes) runs every agent,
+sharing client pools and restarting crashed agents with backoff
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import time
+from datetime import datetime
+
+from agents.agent_metrics import agent_summary, declare_agents
+from agents.event_scheduler import AgentEventScheduler, NEW_TASK
+
+
+def flatten_agent_configs(agent_configs=None):
+    """Turn the grouped AGENT_CONFIGS into {agent_name: config}"""
+    if agent_configs is None:
+        from AGENT_DEPLOYMENT_REAL_INTEGRATIONS import AGENT_CONFIGS
+        agent_configs = AGENT_CONFIGS
+
+    agents = {}
+    for group, members in agent_configs.items():
+        for name, config in members.items():
+            agents[name] = dict(config, group=group)
+    return agents
+
+
+def process_rss_mb():
+    """Resident memory of the current process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # ru_maxrss is the peak, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SharedClientPool:
+    """Lazily built clients shared by every agent hosted in this process"""
+
+    def __init__(self, service_account_file="google_service_account.json"):
+        self.service_account_file = service_account_file
+        self.factories = {
+            "http": self._build_http,
+            "claude": self._build_claude,
+            "google": self._build_google
+        }
+        self.clients = {}
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+
+    def get(self, name):
+        """Return the shared client, building it on first use"""
+        if name not in self.clients:
+            self.clients[name] = self.factories[name]()
+        return self.clients[name]
+
+    def _build_http(self):
+        import httpx
+        return httpx.Client(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=60.0
+        )
+
+    def _build_claude(self):
+        import anthropic
+        api_key = os.environ.get('ANTHROPIC_API_KEY')
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        # Claude calls reuse the shared HTTP connection pool
+        return anthropic.Anthropic(api_key=api_key, http_client=self.get("http"))
+
+    def _build_google(self):
+        from integrations.real_google_workspace_agent import RealGoogleWorkspaceAgent
+        return RealGoogleWorkspaceAgent(self.service_account_file)
+
+    def claude_integration(self, agent_name):
+        """Per-agent Claude integration backed by the shared client"""
+        from integrations.agent_claude_integration import AgentClaudeIntegration
+        return AgentClaudeIntegration(agent_name, client=self.get("claude"))
+
+    def close(self):
+        http = self.clients.get("http")
+        if http is not None:
+            http.close()
+        self.clients.clear()
+
+
+class AgentStats:
+    def __init__(self, name):
+        self.name = name
+        self.state = "pending"
+        self.cpu_seconds = 0.0
+        self.restarts = 0
+        self.last_error = None
+        self.started_at = None
+
+
+class MeteredCoroutine:
+    """Drive a coroutine step by step, charging each step's CPU time to an agent.
+
+    Only work done on the event loop thread is counted; blocking calls moved
+    to executor threads are not attributed.
+    """
+
+    def __init__(self, coro, stats):
+        self.coro = coro
+        self.stats = stats
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start = time.thread_time()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.stats.cpu_seconds += time.thread_time() - start
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+class AgentContext:
+    """Everything a hosted agent needs from the runtime"""
+
+    def __init__(self, name, config, scheduler, clients):
+        self.name = name
+        self.config = config
+        self.scheduler = scheduler
+        self.clients = clients
+
+
+async def run_idle_agent(context):
+    """Default runner: wait for NEW_TASK events addressed to this agent"""
+    mailbox = context.scheduler.mailbox([NEW_TASK])
+    try:
+        while True:
+            event = await mailbox.get()
+            if event["payload"].get("agent") == context.name:
+                print(f"📥 {context.name}: received task {event['payload'].get('task')}")
+    finally:
+        mailbox.close()
+
+
+async def run_ai_architect(context):
+    from agents.ai_workos_architect import AI_WorkOS_Architect
+    await AI_WorkOS_Architect(scheduler=context.scheduler, agent_id=context.name).autonomous_development_cycle()
+
+
+async def run_design_agent(context):
+    from agents.creative_platform_builder import Creative_Platform_Builder
+    await Creative_Platform_Builder(scheduler=context.scheduler, agent_id=context.name).serve_feature_requests()
+
+
+# Agents with a dedicated main loop; everything else uses run_idle_agent
+AGENT_RUNNERS = {
+    "ai_architect": run_ai_architect,
+    "design_agent": run_design_agent
+}
+
+
+class AgentSupervisor:
+    def __init__(self, agent_names=None, agent_configs=None, runners=None,
+                 base_backoff=1.0, max_backoff=60.0, stable_after=30.0, serve_http=False):
+        all_agents = flatten_agent_configs(agent_configs)
+        names = agent_names or list(all_agents)
+        unknown = [name for name in names if name not in all_agents]
+        if unknown:
+            raise ValueError(f"Unknown agents: {', '.join(unknown)}")
+
+        self.agents = {name: all_agents[name] for name in names}
+        self.runners = dict(AGENT_RUNNERS, **(runners or {}))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.scheduler = AgentEventScheduler()
+        self.clients = SharedClientPool()
+        self.stats = {name: AgentStats(name) for name in self.agents}
+        self.tasks = {}
+        self.serve_http = serve_http
+        self.job_servers = {}
+        declare_agents(self.agents)
+
+    def backoff_delay(self, failures):
+        """Exponential backoff with jitter, capped at max_backoff"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def supervise(self, name):
+        """Run one agent forever, restarting it with backoff when it crashes"""
+        stats = self.stats[name]
+        runner = self.runners.get(name, run_idle_agent)
+        context = AgentContext(name, self.agents[name], self.scheduler, self.clients)
+        failures = 0
+
+        while True:
+            stats.state = "running"
+            stats.started_at = time.monotonic()
+            try:
+                await MeteredCoroutine(runner(context), stats)
+                stats.state = "stopped"
+                return
+            except asyncio.CancelledError:
+                stats.state = "stopped"
+                raise
+            except Exception as e:
+                if time.monotonic() - stats.started_at >= self.stable_after:
+                    failures = 0
+                failures += 1
+                stats.restarts += 1
+                stats.last_error = str(e)
+                stats.state = "backoff"
+                delay = self.backoff_delay(failures)
+                print(f"❌ {name} crashed ({e}); restarting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def start(self):
+        self.scheduler.loop = asyncio.get_running_loop()
+        for name in self.agents:
+            self.tasks[name] = asyncio.create_task(self.supervise(name), name=name)
+        if self.serve_http:
+            from agents.agent_job_server import AgentJobServer
+            for name, config in self.agents.items():
+                server = AgentJobServer(name, config["port"], scheduler=self.scheduler, clients=self.clients)
+                await server.start()
+                self.job_servers[name] = server
+
+    async def stop(self):
+        for server in self.job_servers.values():
+            await server.stop()
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.scheduler.shutdown()
+        self.clients.close()
+
+    def report(self):
+        """Per-agent CPU and restart counts; memory is the shared process RSS"""
+        rss_mb = round(process_rss_mb(), 1)
+        return {
+            "pid": os.getpid(),
+            "process_rss_mb": rss_mb,
+            "agents": {
+                name: {
+                    "state": stats.state,
+                    "port": self.agents[name]["port"],
+                    "cpu_seconds": round(stats.cpu_seconds, 3),
+                    "restarts": stats.restarts,
+                    "queue_depth": self.job_servers[name].queue.qsize() if name in self.job_servers else None,
+                    "last_error": stats.last_error,
+                    "process_rss_mb": rss_mb,
+                    "jobs": agent_summary(name)
+                } for name, stats in self.stats.items()
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def run(self, report_interval=60.0, report_callback=None):
+        """Run until cancelled, emitting a report every `report_interval` seconds"""
+        await self.start()
+        try:
+            while True:
+                await asyncio.sleep(report_interval)
+                report = self.report()
+                if report_callback:
+                    report_callback(report)
+                else:
+                    print(json.dumps(report, indent=2))
+        finally:
+            await self.stop()
+
+
+def _worker_main(agent_names, report_queue, report_interval, serve_http):
+    supervisor = AgentSupervisor(agent_names, serve_http=serve_http)
+    try:
+        asyncio.run(supervisor.run(report_interval, report_queue.put))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_worker_pool(agent_names=None, workers=2, report_interval=60.0, serve_http=False):
+    """Spread agents across a fixed pool of processes, each with one event loop"""
+    names = agent_names or list(flatten_agent_configs())
+    workers = max(1, min(workers, len(names)))
+    assignments = [names[i::workers] for i in range(workers)]
+    report_queue = multiprocessing.Queue()
+
+    processes = [
+        multiprocessing.Process(
+            target=_worker_main, args=(subset, report_queue, report_interval, serve_http),
+            name=f"agent-worker-{i}", daemon=True
+        ) for i, subset in enumerate(assignments)
+    ]
+    for process in processes:
+        process.start()
+    print(f"🚀 Hosting {len(names)} agents in {workers} worker processes")
+
+    try:
+        while True:
+            print(json.dumps(report_queue.get(), indent=2))
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host AGENT_CONFIGS agents in one runtime")
+    parser.add_argument("--agents", help="Comma-separated agent names (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument("--report-interval", type=float, default=60.0)
+    parser.add_argument("--http", action="store_true", help="Serve each agent's job API on its port")
+    args = parser.parse_args()
+
+    selected = args.agents.split(",") if args.agents else None
+    if args.workers > 1:
+        run_worker_pool(selected, args.workers, args.report_interval, args.http)
+    else:
+        print("🚀 Hosting agents in a single event loop")
+        try:
+            asyncio.run(AgentSupervisor(selected, serve_http=args.http).run(args.report_interval))
+        except KeyboardInterrupt:
+            pass
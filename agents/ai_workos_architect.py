@@ -7,21 +7,32 @@ Autonomous development and collaboration system
 
 import asyncio
 import json
+import time
 from datetime import datetime
-import sqlite3
+
+from agents.agent_metrics import JOBS, agent_summary, record_job
+from agents.event_scheduler import AgentEventScheduler, NEW_TASK, REVIEW_REQUESTED
 
 class AI_WorkOS_Architect:
-    def __init__(self):
+    def __init__(self, scheduler=None, task_queue=None, agent_id="ai_architect"):
         self.name = "AI_WorkOS_Architect"
+        self.agent_id = agent_id  # Name in AGENT_CONFIGS, used as the metrics label
         self.status = "active_development"
         self.aws_instance = "i-020ec2022c95828c8"
         self.current_project = "Creative Suite Integration"
-        self.progress = 67.3
+        self.scheduler = scheduler or AgentEventScheduler()
+        self.task_queue = task_queue
         
-    async def autonomous_development_cycle(self):
+    async def autonomous_development_cycle(self, cycle_cron="*/5 * * * *"):
         """Execute autonomous development cycle"""
+        # Wake on new work immediately; the cron timer only covers idle periodic reviews
+        timer_event = self.scheduler.add_timer(f"{self.name}_cycle", cron=cycle_cron)
+        mailbox = self.scheduler.mailbox([NEW_TASK, REVIEW_REQUESTED, timer_event])
+        event = {"type": "startup"}
+        
         while True:
-            print(f"🤖 {self.name}: Starting development cycle...")
+            print(f"🤖 {self.name}: Starting development cycle ({event['type']})...")
+            started = time.perf_counter()
             
             # Analyze requirements
             requirements = await self.analyze_project_requirements()
@@ -36,8 +47,13 @@ class AI_WorkOS_Architect:
             if self.needs_human_input(plan):
                 await self.request_human_collaboration(plan)
             
-            # Continue autonomous work
-            await asyncio.sleep(300)  # 5-minute cycles
+            record_job(self.agent_id, "development_cycle", {"success": True}, time.perf_counter() - started)
+            
+            # Sleep until work for this agent arrives; job submissions address their owning agent
+            while True:
+                event = await mailbox.get()
+                if event["type"] != NEW_TASK or event["payload"].get("agent") in (None, self.agent_id):
+                    break
             
     async def analyze_project_requirements(self):
         """Analyze current project requirements"""
@@ -83,13 +99,23 @@ class AI_WorkOS_Architect:
         }
         
         print(f"🤝 Collaboration Request: {collaboration_request}")
+        JOBS.inc(agent=self.agent_id, job_type="collaboration_request", status="completed")
+        
+        # Persist the request so it survives agent restarts
+        if self.task_queue is not None:
+            collaboration_request["task_id"] = self.task_queue.enqueue(
+                "collaboration_requests", "architecture_review", collaboration_request, priority=1
+            )
         return collaboration_request
         
     def get_progress_report(self):
-        """Generate progress report"""
+        """Generate progress report from recorded metrics"""
         return {
             "agent_name": self.name,
-            "current_progress": self.progress,
+            "cycles_completed": JOBS.get(agent=self.agent_id, job_type="development_cycle", status="completed"),
+            "collaboration_requests": JOBS.get(agent=self.agent_id, job_type="collaboration_request",
+                                               status="completed"),
+            "operational_metrics": agent_summary(self.agent_id),
             "project": self.current_project,
             "status": self.status,
             "aws_location": self.aws_instance,
@@ -104,7 +130,7 @@ class AI_WorkOS_Architect:
 if __name__ == "__main__":
     architect = AI_WorkOS_Architect()
     print(f"🚀 {architect.name} starting autonomous development on AWS")
-    print(f"📊 Current Progress: {architect.progress}%")
+    print(f"📊 Development cycles completed: {JOBS.get(agent=architect.agent_id, job_type='development_cycle', status='completed')}")
     
     # Run autonomous cycle (would be async in production)
     report = architect.get_progress_report()
@@ -10,9 +10,13 @@ import json
 from datetime import datetime
 import random
 
+from agents.agent_metrics import agent_summary
+from agents.event_scheduler import AgentEventScheduler, NEW_TASK, REVIEW_REQUESTED
+
 class Creative_Platform_Builder:
-    def __init__(self):
+    def __init__(self, scheduler=None, agent_id="design_agent"):
         self.name = "Creative_Platform_Builder"
+        self.agent_id = agent_id  # Name in AGENT_CONFIGS, used as the metrics label
         self.status = "building_creative_suite"
         self.current_features = [
             "Visual Design Editor",
@@ -21,30 +25,66 @@ class Creative_Platform_Builder:
             "Template Library",
             "Collaboration Hub"
         ]
-        self.progress = 43.7
+        self.feature_status = {feature: {"status": "planning"} for feature in self.current_features}
+        self.scheduler = scheduler or AgentEventScheduler()
         
     async def build_creative_tools(self):
         """Build creative platform components"""
         for feature in self.current_features:
-            print(f"🎨 Building {feature}...")
-            
-            # Generate feature specifications
-            spec = await self.generate_feature_spec(feature)
-            
-            # Create implementation
-            implementation = await self.implement_feature(spec)
-            
-            # Test and validate
-            test_results = await self.test_feature(implementation)
+            await self.build_feature(feature)
             
-            if test_results["passed"]:
-                print(f"✅ {feature} completed and tested")
-                self.progress += random.uniform(2.0, 8.0)
-            else:
-                print(f"🔧 {feature} needs refinement")
-                
-            await asyncio.sleep(60)  # Simulate build time
+    async def build_feature(self, feature):
+        """Build, test and report on a single feature"""
+        print(f"🎨 Building {feature}...")
+        self.feature_status[feature] = {"status": "in_progress"}
+        
+        # Generate feature specifications
+        spec = await self.generate_feature_spec(feature)
+        
+        # Create implementation
+        implementation = await self.implement_feature(spec)
+        
+        # Test and validate
+        test_results = await self.test_feature(implementation)
+        
+        if test_results["passed"]:
+            print(f"✅ {feature} completed and tested")
+        else:
+            print(f"🔧 {feature} needs refinement")
+            self.scheduler.publish(REVIEW_REQUESTED, {"feature": feature}, source=self.name)
+        
+        # test_feature is a randomized stand-in, so its outcome is kept out of
+        # the operational job metrics and flagged as simulated in the report
+        self.feature_status[feature] = {
+            "status": "completed" if test_results["passed"] else "needs_refinement",
+            "test_coverage": round(test_results["test_coverage"], 1),
+            "bugs_found": test_results["bugs_found"],
+            "simulated": test_results["simulated"],
+            "last_built": datetime.now().isoformat()
+        }
+        return test_results
+    
+    @property
+    def progress(self):
+        """Share of features whose (simulated) build passed its tests"""
+        if not self.current_features:
+            return 0.0
+        done = sum(1 for f in self.current_features if self.feature_status.get(f, {}).get("status") == "completed")
+        return 100.0 * done / len(self.current_features)
             
+    async def serve_feature_requests(self):
+        """Build features as NEW_TASK events arrive instead of on a fixed timer"""
+        mailbox = self.scheduler.mailbox([NEW_TASK])
+        while True:
+            event = await mailbox.get()
+            feature = event["payload"].get("feature")
+            if not feature or event["payload"].get("agent") not in (None, self.agent_id):
+                continue
+            if feature not in self.current_features:
+                self.current_features.append(feature)
+                self.feature_status[feature] = {"status": "planning"}
+            await self.build_feature(feature)
+        
     async def generate_feature_spec(self, feature_name):
         """Generate detailed feature specifications"""
         specs = {
@@ -82,8 +122,9 @@ class Creative_Platform_Builder:
         }
         
     async def test_feature(self, implementation):
-        """Test implemented feature"""
+        """Test implemented feature (simulated: results are randomized placeholders)"""
         return {
+            "simulated": True,
             "passed": random.choice([True, True, True, False]),  # 75% pass rate
             "test_coverage": random.uniform(80, 95),
             "performance_score": random.uniform(85, 98),
@@ -109,22 +150,21 @@ class Creative_Platform_Builder:
         return feedback_request
         
     def generate_progress_report(self):
-        """Generate detailed progress report"""
+        """Generate progress report; real job outcomes and simulated builds are reported separately"""
+        features = {
+            feature: self.feature_status.get(feature, {"status": "planning"})
+            for feature in self.current_features
+        }
         return {
             "agent": self.name,
             "project": "Creative Platform Suite",
-            "overall_progress": round(self.progress, 1),
-            "features_status": {
-                feature: {
-                    "status": random.choice(["completed", "in_progress", "planning"]),
-                    "progress": round(random.uniform(20, 90), 1)
-                } for feature in self.current_features
+            "operational_metrics": agent_summary(self.agent_id),
+            "simulated_builds": {
+                "note": "build/test results come from randomized stand-in tests, not real jobs",
+                "progress": round(self.progress, 1),
+                "features": features,
+                "completed": [f for f, s in features.items() if s.get("status") == "completed"]
             },
-            "recent_achievements": [
-                "Completed visual design editor core functionality",
-                "Implemented real-time collaboration features",
-                "Optimized video processing pipeline"
-            ],
             "upcoming_milestones": [
                 "Deploy beta version for testing",
                 "Integrate AI voice generation",
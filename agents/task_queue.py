@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Durable Task Queue - SQLite (WAL) backed work items for agents
+Atomic claim/ack with visibility timeouts, priorities, dead-lettering and
+batch dequeue, so agent work survives restarts
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from agents.agent_metrics import QUEUE_DEPTH, record_job
+from integrations.google_quota_manager import acting_as
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    job_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'ready',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    claim_token TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim_order
+    ON tasks (queue, state, priority DESC, id);
+CREATE INDEX IF NOT EXISTS tasks_in_flight
+    ON tasks (visible_at) WHERE claim_token IS NOT NULL;
+"""
+
+
+class SQLiteTaskQueue:
+    def __init__(self, db_path="agent_tasks.db", visibility_timeout=300.0, max_attempts=5):
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        # Autocommit mode; every write path opens its own explicit transaction
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False, timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, operation):
+        """Run `operation(conn)` inside one IMMEDIATE transaction"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    # ---- producers -----------------------------------------------------
+
+    def enqueue(self, queue, job_type, payload=None, priority=0, delay=0.0, max_attempts=None):
+        """Add one task; higher priority is claimed first"""
+        return self.enqueue_batch(queue, [{
+            "job_type": job_type, "payload": payload, "priority": priority,
+            "delay": delay, "max_attempts": max_attempts
+        }])[0]
+
+    def enqueue_batch(self, queue, items):
+        """Add many tasks in one transaction; returns their IDs"""
+        now = time.time()
+        rows = [(
+            queue,
+            item["job_type"],
+            json.dumps(item.get("payload") or {}),
+            item.get("priority", 0),
+            item.get("max_attempts") or self.max_attempts,
+            now + (item.get("delay") or 0.0),
+            now
+        ) for item in items]
+
+        def insert(conn):
+            # AUTOINCREMENT ids are sequential inside an IMMEDIATE transaction
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'").fetchone()
+            first_id = (row[0] if row else 0) + 1
+            conn.executemany(
+                "INSERT INTO tasks (queue, job_type, payload, priority, max_attempts, visible_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            return list(range(first_id, first_id + len(rows)))
+
+        return self._write(insert)
+
+    # ---- consumers -----------------------------------------------------
+
+    def claim(self, queue, batch_size=1, visibility_timeout=None):
+        """Atomically claim up to `batch_size` visible tasks.
+
+        Claimed tasks stay invisible for the visibility timeout; if they are
+        not acked in time they become claimable again. Tasks that have used
+        up their attempts are moved to the dead-letter state instead.
+        """
+        now = time.time()
+        invisible_until = now + (visibility_timeout or self.visibility_timeout)
+        token = uuid.uuid4().hex
+
+        def claim_rows(conn):
+            # Only expired claims can exhaust attempts here; nack dead-letters the rest
+            conn.execute(
+                "UPDATE tasks SET state = 'dead', claim_token = NULL, "
+                "last_error = COALESCE(last_error, 'visibility timeout expired') "
+                "WHERE claim_token IS NOT NULL AND visible_at <= ? AND queue = ? "
+                "AND state = 'ready' AND attempts >= max_attempts",
+                (now, queue)
+            )
+            return conn.execute(
+                "UPDATE tasks SET claim_token = ?, visible_at = ?, attempts = attempts + 1 "
+                "WHERE id IN (SELECT id FROM tasks WHERE queue = ? AND state = 'ready' AND visible_at <= ? "
+                "ORDER BY priority DESC, id LIMIT ?) "
+                "RETURNING id, job_type, payload, priority, attempts, max_attempts",
+                (token, invisible_until, queue, now, batch_size)
+            ).fetchall()
+
+        rows = self._write(claim_rows)
+        tasks = [{
+            "id": row[0],
+            "queue": queue,
+            "job_type": row[1],
+            "payload": json.loads(row[2]),
+            "priority": row[3],
+            "attempts": row[4],
+            "max_attempts": row[5],
+            "claim_token": token
+        } for row in rows]
+        # RETURNING order is unspecified; hand tasks out in claim order
+        tasks.sort(key=lambda task: (-task["priority"], task["id"]))
+        return tasks
+
+    def ack(self, tasks):
+        """Delete completed tasks; ignores tasks whose claim has since expired"""
+        tasks = tasks if isinstance(tasks, list) else [tasks]
+        return self._write(lambda conn: conn.executemany(
+            "DELETE FROM tasks WHERE id = ? AND claim_token = ?",
+            [(task["id"], task["claim_token"]) for task in tasks]
+        ).rowcount)
+
+    def nack(self, task, error=None, delay=0.0):
+        """Release a failed task for retry, or dead-letter it when out of attempts"""
+        def release(conn):
+            cursor = conn.execute(
+                "UPDATE tasks SET claim_token = NULL, last_error = ?, visible_at = ?, "
+                "state = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'ready' END "
+                "WHERE id = ? AND claim_token = ?",
+                (error, time.time() + delay, task["id"], task["claim_token"])
+            )
+            return cursor.rowcount
+
+        return self._write(release)
+
+    def extend(self, task, visibility_timeout=None):
+        """Keep a long-running task invisible for another timeout period"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET visible_at = ? WHERE id = ? AND claim_token = ?",
+            (time.time() + (visibility_timeout or self.visibility_timeout), task["id"], task["claim_token"])
+        ).rowcount)
+
+    # ---- inspection ----------------------------------------------------
+
+    def depth(self, queue):
+        """Ready (including in-flight) and dead task counts for a queue"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE queue = ? GROUP BY state", (queue,)
+            ).fetchall()
+        counts = dict(rows)
+        return {"ready": counts.get("ready", 0), "dead": counts.get("dead", 0)}
+
+    def dead_letters(self, queue, limit=100):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, job_type, payload, attempts, last_error FROM tasks "
+                "WHERE queue = ? AND state = 'dead' ORDER BY id LIMIT ?", (queue, limit)
+            ).fetchall()
+        return [{"id": r[0], "job_type": r[1], "payload": json.loads(r[2]),
+                 "attempts": r[3], "last_error": r[4]} for r in rows]
+
+    def requeue_dead(self, queue):
+        """Give every dead-lettered task in `queue` a fresh set of attempts"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET state = 'ready', attempts = 0, visible_at = ?, claim_token = NULL "
+            "WHERE queue = ? AND state = 'dead'", (time.time(), queue)
+        ).rowcount)
+
+
+class TaskConsumer:
+    """Run a queue's tasks through an agent's integration job handlers"""
+
+    def __init__(self, task_queue, queue_name, agent_name=None, handlers=None, clients=None,
+                 batch_size=10, retry_delay=30.0, scheduler=None):
+        from agents.agent_job_server import JobContext
+        self.task_queue = task_queue
+        self.queue_name = queue_name
+        self.context = JobContext(agent_name or queue_name, handlers, clients)
+        self.context.backlog = lambda: task_queue.depth(queue_name)["ready"]
+        QUEUE_DEPTH.set_function(self.context.backlog, agent=self.context.agent_name)
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.scheduler = scheduler
+
+    def _handle(self, task):
+        handler = self.context.handlers.get(task["job_type"])
+        if handler is None:
+            return {"success": False, "error": f"No handler for {task['job_type']}"}
+        with acting_as(self.context.agent_name):
+            result = handler(self.context, task["payload"])
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+        return result
+
+    def run_once(self):
+        """Claim one batch, process it and ack or nack each task"""
+        tasks = self.task_queue.claim(self.queue_name, self.batch_size)
+        completed = []
+        for task in tasks:
+            started = time.perf_counter()
+            try:
+                result = self._handle(task)
+                error = None if not isinstance(result, dict) or result.get("success", True) else result.get("error")
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+                error = str(e)
+            record_job(self.context.agent_name, task["job_type"], result, time.perf_counter() - started,
+                       task["payload"])
+            if error is None:
+                completed.append(task)
+            else:
+                self.task_queue.nack(task, error, delay=self.retry_delay)
+        if completed:
+            self.task_queue.ack(completed)
+        return len(tasks)
+
+    async def run(self, idle_timeout=5.0):
+        """Drain the queue, then sleep until a NEW_TASK event or the idle timeout"""
+        from agents.event_scheduler import NEW_TASK
+        mailbox = self.scheduler.mailbox([NEW_TASK]) if self.scheduler else None
+        try:
+            while True:
+                processed = await asyncio.to_thread(self.run_once)
+                if processed:
+                    continue
+                if mailbox:
+                    await mailbox.get(timeout=idle_timeout)
+                else:
+                    await asyncio.sleep(idle_timeout)
+        finally:
+            if mailbox:
+                mailbox.close()
+
+
+def benchmark(operations=50000, batch_size=100):
+    """Measure enqueue + claim + ack throughput on a scratch database"""
+    with tempfile.TemporaryDirectory() as scratch:
+        task_queue = SQLiteTaskQueue(os.path.join(scratch, "bench.db"))
+        items = [{"job_type": "ping", "payload": {"n": i}, "priority": i % 3} for i in range(batch_size)]
+
+        start = time.perf_counter()
+        for _ in range(operations // batch_size):
+            task_queue.enqueue_batch("bench", items)
+        enqueue_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dequeued = 0
+        while True:
+            tasks = task_queue.claim("bench", batch_size)
+            if not tasks:
+                break
+            task_queue.ack(tasks)
+            dequeued += len(tasks)
+        dequeue_seconds = time.perf_counter() - start
+        task_queue.close()
+
+    return {
+        "tasks": dequeued,
+        "batch_size": batch_size,
+        "enqueue_per_second": round(dequeued / enqueue_seconds),
+        "claim_ack_per_second": round(dequeued / dequeue_seconds),
+        "round_trip_per_second": round(dequeued / (enqueue_seconds + dequeue_seconds))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite task queue benchmark")
+    parser.add_argument("--operations", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    print("🗄️ Durable Task Queue Benchmark")
+    print(json.dumps(benchmark(args.operations, args.batch_size), indent=2))
+    print(json.dumps(benchmark(args.operations // 10, 1), indent=2))
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Watch Folder - inotify-driven ingestion for the media agents
+Files dropped into a watched directory are enqueued on the agent's durable
+task queue the moment they are finished (close-write / moved-in, or size and
+mtime quiet for a while), with the rule's operations or target formats. A
+persisted cursor of what was already enqueued lets a restart catch up on
+files that landed while the daemon was down; without inotify it polls.
+"""
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import time
+from datetime import datetime
+
+from agents.event_scheduler import FILE_ARRIVED, NEW_TASK
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v")
+# Partial downloads and editor scratch files are never ingested
+IGNORED_SUFFIXES = (".part", ".tmp", ".crdownload", ".partial", "~")
+
+DEFAULT_RULES = {
+    "image_editor": {"job_type": "process_image", "extensions": IMAGE_EXTENSIONS,
+                     "operations": ["auto_level", "enhance_color", "sharpen"]},
+    "video_processor": {"job_type": "autonomous_video_processing", "extensions": VIDEO_EXTENSIONS,
+                        "target_formats": ["web"]}
+}
+
+# job_type -> payloads for one arrived file
+TASK_BUILDERS = {
+    "process_image": lambda rule, path: [{
+        "input_path": path,
+        "output_path": os.path.join(rule["output_dir"], os.path.basename(path)),
+        "operations": rule.get("operations", []),
+        "encode_options": rule.get("encode_options")
+    }],
+    "batch_process_images": lambda rule, path: [{
+        "input_dir": os.path.dirname(path), "output_dir": rule["output_dir"],
+        "operations": rule.get("operations", []), "encode_options": rule.get("encode_options")
+    }],
+    "autonomous_video_processing": lambda rule, path: [
+        {"input_video": path, "target_format": target_format, "output_dir": rule["output_dir"]}
+        for target_format in rule.get("target_formats", ["web"])
+    ],
+    "process_video": lambda rule, path: [{
+        "input_path": path,
+        "output_path": os.path.join(rule["output_dir"], os.path.basename(path)),
+        "operations": rule.get("operations", [])
+    }]
+}
+
+
+def make_rule(agent, path, **overrides):
+    """A watch rule for `agent` on directory `path`, starting from DEFAULT_RULES"""
+    rule = dict(DEFAULT_RULES.get(agent, {}), agent=agent, path=os.path.abspath(path), **overrides)
+    rule.setdefault("queue", agent)
+    rule.setdefault("output_dir", os.path.join(rule["path"], "processed"))
+    if rule.get("job_type") not in TASK_BUILDERS:
+        raise ValueError(f"No task builder for job type {rule.get('job_type')!r}")
+    os.makedirs(rule["output_dir"], exist_ok=True)
+    return rule
+
+
+class Inotify:
+    """Minimal ctypes binding over the Linux inotify syscalls"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.paths = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch {path}: {os.strerror(errno)}")
+        self.paths[wd] = path
+        return wd
+
+    def read_events(self):
+        """Drain queued events as (directory, name, mask); empty when none are pending"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((self.paths.get(wd), name, mask))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WatchFolderService:
+    """Turns finished files in watched directories into queued agent tasks.
+
+    Close-write and moved-in events mean the writer is done, so those files
+    are enqueued after a short debounce; create/modify events (or a rescan)
+    wait until the file's mtime has been quiet for `stable_seconds`.
+    """
+
+    def __init__(self, rules, task_queue, cursor_path="watch_folder_cursor.json", scheduler=None,
+                 debounce=0.02, stable_seconds=2.0, poll_interval=1.0, use_inotify=True):
+        self.rules = rules
+        self.task_queue = task_queue
+        self.cursor_path = cursor_path
+        self.scheduler = scheduler
+        self.debounce = debounce
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.rules_by_dir = {}
+        for rule in rules:
+            self.rules_by_dir.setdefault(rule["path"], []).append(rule)
+        self.cursor = self._load_cursor()
+        self.pending = {}  # path -> {"deadline", "closed"}
+        self.inotify = None
+        self.stats = {"events": 0, "ingested": 0, "tasks": 0, "rescans": 0, "mode": None}
+        self._wake = None
+
+    # ---- cursor --------------------------------------------------------
+
+    def _load_cursor(self):
+        if self.cursor_path and os.path.exists(self.cursor_path):
+            try:
+                with open(self.cursor_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass  # A lost cursor means a full rescan, never lost files
+        return {"files": {}}
+
+    def _save_cursor(self):
+        if not self.cursor_path:
+            return
+        self.cursor["updated_at"] = datetime.now().isoformat()
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cursor, f, indent=2)
+        os.replace(tmp_path, self.cursor_path)
+
+    @staticmethod
+    def _signature(stat):
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # ---- detection -----------------------------------------------------
+
+    def _rules_for(self, path):
+        name = os.path.basename(path)
+        if name.startswith(".") or name.endswith(IGNORED_SUFFIXES):
+            return []
+        extension = os.path.splitext(name)[1].lower()
+        return [rule for rule in self.rules_by_dir.get(os.path.dirname(path), [])
+                if extension in rule.get("extensions", ())]
+
+    def note(self, path, closed=False):
+        """Record activity on `path`; closed means the writer has finished with it"""
+        if not self._rules_for(path):
+            return
+        entry = self.pending.setdefault(path, {"closed": False})
+        entry["closed"] = closed
+        entry["deadline"] = time.monotonic() + (self.debounce if closed else min(self.debounce, self.stable_seconds))
+        if self._wake is not None:
+            self._wake.set()
+
+    def rescan(self):
+        """Note every file the cursor has not seen in its current form"""
+        self.stats["rescans"] += 1
+        known = self.cursor["files"]
+        for directory in self.rules_by_dir:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file() or entry.path in self.pending:
+                    continue
+                seen = known.get(entry.path)
+                if seen is None or seen["signature"] != self._signature(entry.stat()):
+                    self.note(entry.path)
+        # Forget files that are gone so the cursor does not grow without bound
+        for path in [path for path in known if not os.path.exists(path)]:
+            del known[path]
+
+    def _on_inotify(self):
+        for directory, name, mask in self.inotify.read_events():
+            self.stats["events"] += 1
+            if mask & IN_Q_OVERFLOW:
+                self.rescan()  # The kernel dropped events; fall back to comparing with the cursor
+                continue
+            if directory is None or mask & IN_ISDIR:
+                continue
+            self.note(os.path.join(directory, name), closed=bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO)))
+
+    def _due(self):
+        """Pending paths whose debounce has passed and whose writer is done"""
+        now, ready = time.monotonic(), []
+        for path, entry in list(self.pending.items()):
+            if entry["deadline"] > now:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            quiet = time.time() - stat.st_mtime
+            if entry["closed"] or quiet >= self.stable_seconds:
+                del self.pending[path]
+                ready.append((path, stat))
+            else:
+                entry["deadline"] = now + self.stable_seconds - quiet
+        return ready
+
+    # ---- ingestion -----------------------------------------------------
+
+    def ingest(self, ready):
+        """Enqueue tasks for finished files, one transaction per queue"""
+        batches, arrivals = {}, []
+        # A file enters the cursor only once every queue it feeds has accepted its tasks,
+        # so a failed enqueue is retried after a restart instead of being marked done
+        entries_by_path, queues_left = {}, {}
+        for path, stat in ready:
+            signature = self._signature(stat)
+            seen = self.cursor["files"].get(path)
+            if seen is not None and seen["signature"] == signature:
+                continue  # Same bytes as last time (e.g. a second close of an unchanged file)
+            entries_by_path[path] = {"signature": signature, "task_ids": [], "enqueued_at": time.time()}
+            queues_left[path] = set()
+            for rule in self._rules_for(path):
+                items = [{"job_type": rule["job_type"], "payload": payload, "priority": rule.get("priority", 0)}
+                         for payload in TASK_BUILDERS[rule["job_type"]](rule, path)]
+                batches.setdefault(rule["queue"], []).append((path, rule, items))
+                queues_left[path].add(rule["queue"])
+            if not queues_left[path]:
+                self.cursor["files"][path] = entries_by_path[path]
+            arrivals.append(path)
+        if not arrivals:
+            return []
+
+        for queue, entries in batches.items():
+            task_ids = iter(self.task_queue.enqueue_batch(queue, [item for _, _, items in entries for item in items]))
+            for path, rule, items in entries:
+                ids = [next(task_ids) for _ in items]
+                entries_by_path[path]["task_ids"].extend(ids)
+                queues_left[path].discard(queue)
+                if not queues_left[path]:
+                    self.cursor["files"][path] = entries_by_path[path]
+                self.stats["tasks"] += len(ids)
+                if self.scheduler is not None:
+                    self.scheduler.publish(FILE_ARRIVED, {"path": path, "agent": rule["agent"], "task_ids": ids},
+                                           source="watch_folder")
+            if self.scheduler is not None:
+                # Wakes idle TaskConsumers immediately instead of at their next poll
+                self.scheduler.publish(NEW_TASK, {"agent": queue, "task": "watch_folder", "queue": queue},
+                                       source="watch_folder")
+        self._save_cursor()
+        self.stats["ingested"] += len(arrivals)
+        for path in arrivals:
+            print(f"📥 Watch folder: queued {os.path.basename(path)}")
+        return arrivals
+
+    # ---- main loop -----------------------------------------------------
+
+    def _start_inotify(self, loop):
+        try:
+            self.inotify = Inotify()
+            for directory in self.rules_by_dir:
+                os.makedirs(directory, exist_ok=True)
+                self.inotify.add_watch(directory)
+        except OSError as e:
+            print(f"⚠️ inotify unavailable ({e}); polling every {self.poll_interval}s")
+            if self.inotify is not None:
+                self.inotify.close()
+            self.inotify = None
+            return False
+        loop.add_reader(self.inotify.fd, self._on_inotify)
+        return True
+
+    async def run(self):
+        """Watch until cancelled"""
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        watching = self.use_inotify and self._start_inotify(loop)
+        self.stats["mode"] = "inotify" if watching else "polling"
+        # Watches are in place before the rescan, so nothing lands unseen in between
+        self.rescan()
+        last_poll = time.monotonic()
+        try:
+            while True:
+                self.ingest(self._due())
+                timeout = None
+                if self.pending:
+                    timeout = max(min(entry["deadline"] for entry in self.pending.values()) - time.monotonic(), 0)
+                if not watching:
+                    poll_in = max(last_poll + self.poll_interval - time.monotonic(), 0)
+                    timeout = poll_in if timeout is None else min(timeout, poll_in)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                if not watching and time.monotonic() - last_poll >= self.poll_interval:
+                    self.rescan()
+                    last_poll = time.monotonic()
+        finally:
+            if self.inotify is not None:
+                loop.remove_reader(self.inotify.fd)
+                self.inotify.close()
+                self.inotify = None
+            self._save_cursor()
+
+
+def parse_watch(spec):
+    """agent=directory from the command line"""
+    agent, _, path = spec.partition("=")
+    if not path:
+        raise argparse.ArgumentTypeError(f"Expected agent=directory, got {spec!r}")
+    return agent, path
+
+
+async def run_daemon(rules, db_path, cursor_path, consume=False, **options):
+    """Watch folders and, with `consume`, process their queues in the same event loop"""
+    from agents.event_scheduler import AgentEventScheduler
+    from agents.task_queue import SQLiteTaskQueue, TaskConsumer
+
+    scheduler = AgentEventScheduler()
+    scheduler.loop = asyncio.get_running_loop()
+    task_queue = SQLiteTaskQueue(db_path)
+    service = WatchFolderService(rules, task_queue, cursor_path, scheduler=scheduler, **options)
+    tasks = [asyncio.create_task(service.run())]
+    if consume:
+        for queue in sorted({rule["queue"] for rule in rules}):
+            consumer = TaskConsumer(task_queue, queue, agent_name=queue, scheduler=scheduler)
+            tasks.append(asyncio.create_task(consumer.run()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        scheduler.shutdown()
+        task_queue.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch-folder ingestion for the media agents")
+    parser.add_argument("--watch", type=parse_watch, action="append", required=True,
+                        help="agent=directory, e.g. image_editor=/data/inbox/images (repeatable)")
+    parser.add_argument("--db", default="agent_tasks.db")
+    parser.add_argument("--cursor", default="watch_folder_cursor.json")
+    parser.add_argument("--output-dir", help="Where processed files go (default: <dir>/processed)")
+    parser.add_argument("--operations", help="Comma-separated image/video operations")
+    parser.add_argument("--target-formats", help="Comma-separated video target formats, e.g. web,social")
+    parser.add_argument("--stable-seconds", type=float, default=2.0)
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--consume", action="store_true", help="Also run the agents' task consumers here")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.output_dir:
+        overrides["output_dir"] = args.output_dir
+    if args.operations:
+        overrides["operations"] = args.operations.split(",")
+    if args.target_formats:
+        overrides["target_formats"] = args.target_formats.split(",")
+    watch_rules = [make_rule(agent, path, **overrides) for agent, path in args.watch]
+
+    print("👀 Watching " + ", ".join(f"{rule['path']} → {rule['agent']}" for rule in watch_rules))
+    try:
+        asyncio.run(run_daemon(watch_rules, args.db, args.cursor, consume=args.consume,
+                               stable_seconds=args.stable_seconds, use_inotify=not args.poll))
+    except KeyboardInterrupt:
+        print("🛑 Watch folder stopped")
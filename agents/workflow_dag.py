@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Workflow DAG - Declarative multi-agent pipelines over the agent job handlers
+Nodes name an agent job (or a registered function) and reference upstream
+outputs with ${node.key}; independent branches run in parallel, `foreach`
+nodes stream each item to the next stage as soon as it finishes, and every
+completed node or item is checkpointed so a rerun skips finished work.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+from agents.agent_metrics import record_job
+from integrations.google_quota_manager import acting_as
+from integrations.tracing import span
+
+REFERENCE = re.compile(r"\$\{([^}]+)\}")
+# Names bound per run or per item rather than by upstream nodes
+BUILTIN_SCOPES = ("inputs", "item", "index")
+NODE_KEYS = {"agent", "job", "function", "params", "foreach", "after", "retries", "concurrency"}
+DEFAULT_MAX_PARALLEL = 8
+_END = object()
+
+
+class WorkflowError(ValueError):
+    """The workflow spec is invalid (unknown node, cycle, bad reference)"""
+
+
+def _lookup(path, scope):
+    head, *rest = path.split(".")
+    if head not in scope:
+        raise WorkflowError(f"Unknown reference ${{{path}}}")
+    value = scope[head]
+    for part in rest:
+        try:
+            value = value[int(part)] if isinstance(value, list) else value[part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise WorkflowError(f"${{{path}}} has no '{part}'") from None
+    return value
+
+
+def resolve(value, scope):
+    """Substitute ${...} references; a bare reference keeps the referenced value's type"""
+    if isinstance(value, str):
+        match = REFERENCE.fullmatch(value)
+        if match:
+            return _lookup(match.group(1), scope)
+        return REFERENCE.sub(lambda m: str(_lookup(m.group(1), scope)), value)
+    if isinstance(value, dict):
+        return {key: resolve(item, scope) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, scope) for item in value]
+    return value
+
+
+def references(value):
+    """Node names referenced anywhere inside a params structure"""
+    if isinstance(value, str):
+        return {ref.split(".")[0] for ref in REFERENCE.findall(value)}
+    if isinstance(value, dict):
+        return set().union(*(references(item) for item in value.values()))
+    if isinstance(value, list):
+        return set().union(*(references(item) for item in value))
+    return set()
+
+
+def fingerprint(node, params):
+    """Checkpoint key: what the node runs and with which resolved params"""
+    payload = {key: node.get(key) for key in ("agent", "job", "function")}
+    payload["params"] = params
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def load_workflow(spec):
+    """A workflow dict, or the path of a JSON file holding one"""
+    if isinstance(spec, str):
+        with open(spec) as f:
+            return json.load(f)
+    return spec
+
+
+class JobRunner:
+    """Runs nodes through the same handlers and processors the agent job servers use"""
+
+    def __init__(self, clients=None, functions=None):
+        self.clients = clients
+        self.functions = dict(functions or {})
+        self.contexts = {}
+
+    def context(self, agent):
+        from agents.agent_job_server import JobContext
+        if agent not in self.contexts:
+            self.contexts[agent] = JobContext(agent, clients=self.clients)
+        return self.contexts[agent]
+
+    def check(self, name, node):
+        if "function" in node:
+            if node["function"] not in self.functions:
+                raise WorkflowError(f"Node '{name}': unknown function '{node['function']}'")
+        elif node.get("job") not in self.context(node.get("agent")).handlers:
+            raise WorkflowError(f"Node '{name}': agent '{node.get('agent')}' has no job '{node.get('job')}'")
+
+    async def __call__(self, node, params):
+        if "function" in node:
+            func, args = self.functions[node["function"]], (params,)
+        else:
+            context = self.context(node["agent"])
+            func, args = context.handlers[node["job"]], (context, params)
+        if inspect.iscoroutinefunction(func):
+            result = await func(*args)
+        else:
+            # to_thread copies the context, so spans and acting_as follow the call
+            result = await asyncio.to_thread(func, *args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+class WorkflowDAG:
+    """One declarative workflow, validated up front and runnable any number of times"""
+
+    def __init__(self, spec, checkpoint_path=None, runner=None, functions=None, clients=None,
+                 max_parallel=DEFAULT_MAX_PARALLEL):
+        spec = load_workflow(spec)
+        self.name = spec.get("name", "workflow")
+        self.nodes = spec["nodes"]
+        self.checkpoint_path = checkpoint_path
+        self.runner = runner or JobRunner(clients=clients, functions=functions)
+        self.max_parallel = max_parallel
+        self.dependencies = {}
+        self.stream_sources = {}
+        self._validate()
+
+    def _validate(self):
+        for name, node in self.nodes.items():
+            if name in BUILTIN_SCOPES:
+                raise WorkflowError(f"'{name}' is reserved and cannot name a node")
+            unknown = set(node) - NODE_KEYS
+            if unknown:
+                raise WorkflowError(f"Node '{name}': unknown keys {sorted(unknown)}")
+            if ("job" in node) == ("function" in node):
+                raise WorkflowError(f"Node '{name}' needs exactly one of 'job' or 'function'")
+            if "job" in node and "agent" not in node:
+                raise WorkflowError(f"Node '{name}' runs a job but names no agent")
+            if hasattr(self.runner, "check"):
+                self.runner.check(name, node)
+
+            deps = references(node.get("params", {})) | references(node.get("foreach", "")) | set(node.get("after", []))
+            deps -= set(BUILTIN_SCOPES)
+            missing = deps - set(self.nodes)
+            if missing:
+                raise WorkflowError(f"Node '{name}' depends on unknown nodes {sorted(missing)}")
+            self.dependencies[name] = deps
+
+            # foreach over a whole upstream foreach node consumes its items as they finish
+            foreach = node.get("foreach")
+            match = REFERENCE.fullmatch(foreach) if isinstance(foreach, str) else None
+            if match and match.group(1) in self.nodes and "foreach" in self.nodes[match.group(1)]:
+                self.stream_sources[name] = match.group(1)
+
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        indegree = {name: len(deps) for name, deps in self.dependencies.items()}
+        ready = [name for name in self.nodes if indegree[name] == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in self.dependencies.items():
+                if name in deps:
+                    indegree[other] -= 1
+                    if indegree[other] == 0:
+                        ready.append(other)
+        if len(order) != len(self.nodes):
+            cycle = sorted(set(self.nodes) - set(order))
+            raise WorkflowError(f"Workflow '{self.name}' has a dependency cycle through {cycle}")
+        return order
+
+    # Checkpoints
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path) as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get("workflow") == self.name:
+                    checkpoint.setdefault("nodes", {})
+                    checkpoint.setdefault("items", {})
+                    return checkpoint
+            except (OSError, ValueError):
+                pass  # A corrupt checkpoint only costs a full rerun
+        return {"workflow": self.name, "nodes": {}, "items": {}}
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        self.checkpoint["updated_at"] = datetime.now().isoformat()
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.checkpoint, f, indent=2, default=str)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _cached(self, entry, key):
+        if entry and entry.get("fingerprint") == key and entry["result"].get("success", True):
+            self.reused += 1
+            return entry["result"]
+        return None
+
+    # Execution
+
+    async def run(self, inputs=None):
+        """Run every node; returns per-node status and results in repo result-dict form"""
+        started = time.perf_counter()
+        self.checkpoint = self._load_checkpoint()
+        self.scope = {"inputs": inputs or {}}
+        self.status = {}
+        self.reused = 0
+        self.done = {name: asyncio.Event() for name in self.nodes}
+        self.subscribers = {name: [] for name in self.nodes}
+        self.queues = {}
+        for consumer, source in self.stream_sources.items():
+            self.queues[consumer] = asyncio.Queue()
+            self.subscribers[source].append(self.queues[consumer])
+        self.gate = asyncio.Semaphore(self.max_parallel)
+
+        with span(f"workflow.{self.name}", nodes=len(self.nodes)):
+            await asyncio.gather(*(self._run_node(name) for name in self.order))
+        self._save_checkpoint()
+
+        failed = [name for name, status in self.status.items() if status != "completed"]
+        return {
+            "success": not failed,
+            "workflow": self.name,
+            "status": self.status,
+            "results": {name: self.scope.get(name) for name in self.order},
+            "failed_nodes": failed,
+            "reused_from_checkpoint": self.reused,
+            "seconds": round(time.perf_counter() - started, 3),
+            "error": f"Nodes did not complete: {', '.join(failed)}" if failed else None
+        }
+
+    async def _run_node(self, name):
+        node = self.nodes[name]
+        source, queue = self.stream_sources.get(name), self.queues.get(name)
+        try:
+            # A streaming consumer starts as soon as its source emits, not when it finishes
+            for dep in self.dependencies[name] - {source}:
+                await self.done[dep].wait()
+            blocked = [dep for dep in self.dependencies[name] - {source} if self.status[dep] != "completed"]
+            if blocked:
+                self._finish(name, "skipped", {"success": False, "error": f"Upstream failed: {', '.join(sorted(blocked))}"})
+            elif "foreach" in node:
+                await self._run_foreach(name, node, source, queue)
+            else:
+                result = await self._run_call(name, node, self.nodes[name].get("params", {}), dict(self.scope))
+                self._finish(name, "completed" if result.get("success", True) else "failed", result)
+        except Exception as e:
+            self._finish(name, "failed", {"success": False, "error": str(e)})
+
+    async def _run_foreach(self, name, node, source, queue):
+        concurrency = asyncio.Semaphore(node.get("concurrency", self.max_parallel))
+        self.checkpoint["items"].setdefault(name, {})
+
+        async def run_item(index, item):
+            async with concurrency:
+                if isinstance(item, dict) and item.get("success") is False:
+                    result = {"success": False, "error": f"Upstream item {index} failed"}
+                else:
+                    scope = dict(self.scope, item=item, index=index)
+                    result = await self._run_call(name, node, node.get("params", {}), scope, index)
+            self._emit(name, index, result)
+            return index, result
+
+        tasks = []
+        if source is not None:
+            while True:
+                entry = await queue.get()
+                if entry is _END:
+                    break
+                tasks.append(asyncio.create_task(run_item(*entry)))
+        else:
+            items = resolve(node["foreach"], self.scope)
+            if not isinstance(items, list):
+                raise WorkflowError(f"Node '{name}': foreach must resolve to a list, got {type(items).__name__}")
+            tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(items)]
+
+        results = dict(await asyncio.gather(*tasks))
+        ordered = [results[index] for index in sorted(results)]
+        # A source that failed outright streams nothing; don't let all([]) pass as success
+        if source is not None and self.status.get(source) != "completed":
+            self._finish(name, "skipped", {"success": False, "error": f"Upstream failed: {source}"})
+            return
+        ok = all(result.get("success", True) for result in ordered)
+        self._finish(name, "completed" if ok else "failed", ordered)
+
+    async def _run_call(self, name, node, params, scope, index=None):
+        params = resolve(params, scope)
+        key = fingerprint(node, params)
+        if index is None:
+            entry = self.checkpoint["nodes"].get(name)
+        else:
+            entry = self.checkpoint["items"][name].get(str(index))
+        cached = self._cached(entry, key)
+        if cached is not None:
+            return cached
+
+        agent = node.get("agent", "workflow")
+        job_type = node.get("job") or node["function"]
+        for attempt in range(node.get("retries", 0) + 1):
+            started = time.perf_counter()
+            async with self.gate:
+                try:
+                    with span(f"workflow.node.{name}", agent=agent, job=job_type, index=index, attempt=attempt) as node_span, \
+                            acting_as(agent):
+                        result = await self.runner(node, params)
+                        node_span.record_result(result)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+            if not isinstance(result, dict):
+                result = {"success": True, "value": result}
+            record_job(agent, job_type, result, time.perf_counter() - started, params)
+            if result.get("success", True):
+                break
+
+        if result.get("success", True):
+            record = {"fingerprint": key, "result": result, "finished_at": datetime.now().isoformat()}
+            if index is None:
+                self.checkpoint["nodes"][name] = record
+            else:
+                self.checkpoint["items"][name][str(index)] = record
+            self._save_checkpoint()
+        return result
+
+    def _emit(self, name, index, result):
+        for queue in self.subscribers[name]:
+            queue.put_nowait((index, result))
+
+    def _finish(self, name, status, result):
+        self.status[name] = status
+        self.scope[name] = result
+        for queue in self.subscribers[name]:
+            queue.put_nowait(_END)
+        self.done[name].set()
+        icon = {"completed": "✅", "failed": "❌", "skipped": "⏭️"}[status]
+        print(f"{icon} {self.name}.{name}: {status}")
+
+
+def run_workflow(spec, inputs=None, checkpoint_path=None, **kwargs):
+    """Synchronous entry point for scripts"""
+    return asyncio.run(WorkflowDAG(spec, checkpoint_path=checkpoint_path, **kwargs).run(inputs))
+
+
+# The end-to-end creative pipeline; upload and report need Google credentials
+CREATIVE_PIPELINE = {
+    "name": "creative_pipeline",
+    "nodes": {
+        "templates": {
+            "agent": "image_editor", "job": "create_design_template",
+            "foreach": "${inputs.templates}",
+            "params": {"template_type": "${item}", "output_path": "${inputs.work_dir}/template_${index}.png"}
+        },
+        "frames": {
+            "agent": "image_editor", "job": "process_image",
+            "foreach": "${templates}",
+            "params": {"input_path": "${item.template_created}",
+                       "output_path": "${inputs.work_dir}/frame_${index}.png",
+                       "operations": ["auto_level", "sharpen"]}
+        },
+        "video": {
+            "agent": "video_processor", "job": "create_video_from_images",
+            "after": ["frames"],
+            "params": {"image_pattern": "${inputs.work_dir}/frame_%d.png",
+                       "output_path": "${inputs.work_dir}/promo.mp4", "fps": 1}
+        },
+        "upload": {
+            "agent": "report_generator", "job": "upload_file",
+            "params": {"file_path": "${video.video_created}"}
+        },
+        "report": {
+            "agent": "report_generator", "job": "create_document",
+            "params": {"title": "Promo video delivered",
+                       "content": "Video ${video.video_created} uploaded as Drive file ${upload.file_id}"}
+        }
+    }
+}
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    work_dir = tempfile.mkdtemp(prefix="workflow_")
+    checkpoint = os.path.join(work_dir, "checkpoint.json")
+    inputs = {"templates": ["social_media", "social_media", "social_media"], "work_dir": work_dir}
+
+    print("🔗 Running creative pipeline")
+    result = run_workflow(CREATIVE_PIPELINE, inputs, checkpoint_path=checkpoint)
+    print(f"📊 {result['status']} in {result['seconds']}s")
+    print("🔁 Rerunning from checkpoint")
+    rerun = run_workflow(CREATIVE_PIPELINE, inputs, checkpoint_path=checkpoint)
+    print(f"📊 Reused {rerun['reused_from_checkpoint']} finished steps in {rerun['seconds']}s")
+    sys.exit(0 if result["status"].get("video") == "completed" else 1)
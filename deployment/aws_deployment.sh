@@ -66,8 +66,8 @@ chmod +x start_virtual_display.sh
 
 # Download integration files from GitHub
 echo "📋 Downloading agent integration files..."
+# Keep the package layout: integrations import agents.* (metrics, scheduler)
 git clone https://github.com/swanhtet01/ai-agent-autonomous-work.git agent_code
-cp agent_code/integrations/* .
 
 # Create agent startup script
 cat > start_agents.sh << 'EOF'
@@ -87,7 +87,8 @@ echo "✅ FFmpeg: Ready for video processing"
 
 # Test integrations
 echo "🗺️ Testing integrations..."
-python3 agent_claude_integration.py
+cd /home/ubuntu/agentforce_integrations/agent_code
+python3 -m integrations.agent_claude_integration
 EOF
 
 chmod +x start_agents.sh
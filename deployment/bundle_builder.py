@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Deployment Bundle Builder - Content-hashed delta deploys for the agent tree
+Hashes every deployable file, ships only what changed since the target's
+last manifest as one compressed tarball, swaps the new release in with an
+atomic symlink rename, and restarts only the agents whose code changed
+
+Run directly for the CLI: manifest, build, apply and deploy. The applier
+only needs the standard library, so CommandTarget streams this file to the
+host (docker exec, ssh) and runs it there with the bundle on stdin.
+"""
+
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from fnmatch import fnmatch
+
+DEPLOYABLE = ["agents", "integrations", "deployment", "AGENT_DEPLOYMENT_REAL_INTEGRATIONS.py"]
+EXCLUDE = ["__pycache__", "*.pyc", "*.db", "*.db-*", "*.prof", "*.jsonl", "*_cache.json",
+           "encoder_speeds.json", "drive_sync_manifest.json", "google_service_account.json"]
+MANIFEST_NAME = ".deploy_manifest.json"
+DELTA_NAME = ".deploy_delta.json"
+KEEP_RELEASES = 3
+RESTART_FAILED_EXIT = 3  # deploy CLI: the release is live but some agent restarts failed
+
+# Modules every agent process loads; a change here restarts everything
+CORE_MODULES = ["agents.agent_supervisor", "agents.agent_job_server", "agents.task_queue",
+                "AGENT_DEPLOYMENT_REAL_INTEGRATIONS"]
+
+# Modules each agent loads lazily through its job handlers (agent_job_server.JOB_HANDLERS)
+# and dedicated runners (agent_supervisor.AGENT_RUNNERS)
+AGENT_ENTRY_MODULES = {
+    "image_editor": ["integrations.gimp_agent_processor"],
+    "video_processor": ["integrations.ffmpeg_agent_processor"],
+    "design_agent": ["integrations.ffmpeg_agent_processor", "integrations.agent_claude_integration",
+                     "agents.creative_platform_builder"],
+    "analytics_agent": ["integrations.real_google_workspace_agent"],
+    "report_generator": ["integrations.real_google_workspace_agent"],
+    "project_manager": ["integrations.real_google_workspace_agent", "integrations.agent_claude_integration"],
+    "resource_optimizer": [],
+    "ai_architect": ["integrations.agent_claude_integration", "agents.ai_workos_architect"],
+    "code_generator": ["integrations.agent_claude_integration"],
+    "deployment_agent": []
+}
+
+
+def _excluded(rel_path):
+    return any(fnmatch(part, pattern) for part in rel_path.split("/") for pattern in EXCLUDE)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(root=".", include=None):
+    """Content hash of every deployable file, plus one hash for the whole tree"""
+    files = {}
+    for entry in include or DEPLOYABLE:
+        path = os.path.join(root, entry)
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(d for d in dirnames if not _excluded(d))
+                candidates.extend(os.path.join(dirpath, name) for name in sorted(filenames))
+        for candidate in candidates:
+            rel = os.path.relpath(candidate, root).replace(os.sep, "/")
+            if _excluded(rel) or os.path.islink(candidate):
+                continue
+            stat = os.stat(candidate)
+            files[rel] = {"sha256": file_sha256(candidate), "size": stat.st_size,
+                          "mode": stat.st_mode & 0o777}
+
+    tree = hashlib.sha256()
+    for rel in sorted(files):
+        tree.update(f"{rel}\0{files[rel]['sha256']}\0{files[rel]['mode']:o}\n".encode())
+    return {"tree_hash": tree.hexdigest(), "created_at": time.time(), "files": files}
+
+
+def diff_manifests(old, new):
+    old_files = (old or {}).get("files", {})
+    new_files = new["files"]
+    added = sorted(set(new_files) - set(old_files))
+    removed = sorted(set(old_files) - set(new_files))
+    modified = sorted(rel for rel in set(new_files) & set(old_files)
+                      if (old_files[rel]["sha256"], old_files[rel]["mode"]) != (new_files[rel]["sha256"], new_files[rel]["mode"]))
+    return {"added": added, "modified": modified, "removed": removed}
+
+
+# ---- which agents need a restart ------------------------------------------
+
+def _module_path(root, module):
+    base = os.path.join(root, *module.split("."))
+    for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def module_imports(path, nested=True):
+    """Project-local modules imported by a file; nested=False skips imports inside functions"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    nodes = ast.walk(tree) if nested else tree.body
+    found = set()
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            found.add(node.module)
+            found.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return found
+
+
+def import_closure(root, modules, nested=True):
+    """Files reachable from `modules` through project-local imports"""
+    seen, files = set(), set()
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        path = _module_path(root, module)
+        if path is None:
+            continue
+        files.add(os.path.relpath(path, root).replace(os.sep, "/"))
+        pending.extend(module_imports(path, nested))
+    return files
+
+
+def affected_agents(root, changed_files, agents=None):
+    """Agents whose loaded code includes any changed file"""
+    agents = agents or AGENT_ENTRY_MODULES
+    changed = {rel for rel in changed_files if rel.endswith(".py")}
+    if not changed:
+        return []
+    # Core processes import their lazy per-agent modules only inside functions
+    if changed & import_closure(root, CORE_MODULES, nested=False):
+        return sorted(agents)
+    return sorted(agent for agent, modules in agents.items()
+                  if changed & import_closure(root, modules, nested=True))
+
+
+# ---- bundles -------------------------------------------------------------
+
+def build_delta(root, base_manifest=None):
+    """Gzipped tarball of new/modified files plus a delta descriptor; None when nothing changed"""
+    manifest = build_manifest(root)
+    changes = diff_manifests(base_manifest, manifest)
+    if not any(changes.values()) and base_manifest:
+        return None, manifest, changes
+
+    # Removed modules may have been imported from the old tree; check both sides
+    restart = affected_agents(root, changes["added"] + changes["modified"] + changes["removed"])
+    delta = dict(changes, base_tree_hash=(base_manifest or {}).get("tree_hash"),
+                 target_tree_hash=manifest["tree_hash"], restart=restart, manifest=manifest)
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz", compresslevel=9) as tar:
+        descriptor = json.dumps(delta).encode()
+        info = tarfile.TarInfo(DELTA_NAME)
+        info.size = len(descriptor)
+        tar.addfile(info, io.BytesIO(descriptor))
+        for rel in changes["added"] + changes["modified"]:
+            tar.add(os.path.join(root, rel), arcname=rel, recursive=False)
+    return buffer.getvalue(), manifest, dict(changes, restart=restart)
+
+
+def _read_manifest(deploy_root):
+    path = os.path.join(deploy_root, "current", MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def apply_bundle(deploy_root, bundle_bytes, restart_command=None):
+    """Stage a release from the current one plus the delta, verify it, then swap `current` atomically"""
+    releases = os.path.join(deploy_root, "releases")
+    os.makedirs(releases, exist_ok=True)
+    current = os.path.join(deploy_root, "current")
+
+    with tarfile.open(fileobj=io.BytesIO(bundle_bytes), mode="r:gz") as tar:
+        delta = json.load(tar.extractfile(DELTA_NAME))
+        base = _read_manifest(deploy_root)
+        if delta["base_tree_hash"] and (base or {}).get("tree_hash") != delta["base_tree_hash"]:
+            raise RuntimeError("Target changed since the delta was built; rebuild against its manifest")
+
+        manifest = delta["manifest"]
+        release = os.path.join(releases, manifest["tree_hash"][:16])
+        staging = f"{release}.staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        # Unchanged files: hard links into the live release (files are replaced, never edited)
+        replaced = set(delta["added"]) | set(delta["modified"])
+        for rel in manifest["files"]:
+            if rel in replaced:
+                continue
+            source = os.path.join(current, rel)
+            target = os.path.join(staging, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+        for member in tar.getmembers():
+            if member.name == DELTA_NAME:
+                continue
+            if member.name not in replaced or not member.isfile():
+                raise RuntimeError(f"Unexpected bundle member: {member.name}")
+            target = os.path.join(staging, member.name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with tar.extractfile(member) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.chmod(target, manifest["files"][member.name]["mode"])
+
+    for rel, info in manifest["files"].items():
+        if file_sha256(os.path.join(staging, rel)) != info["sha256"]:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise RuntimeError(f"Hash mismatch after staging: {rel}")
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(release, ignore_errors=True)
+    os.rename(staging, release)
+    link = f"{current}.next"
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.relpath(release, deploy_root), link)
+    os.replace(link, current)  # rename(2) over the old symlink: readers see old or new, never a mix
+
+    # The new release is live from here on: restart failures are reported, not raised,
+    # so the caller still learns which release is current and pruning still runs
+    restarted, restart_failed = [], {}
+    for agent in delta["restart"]:
+        if restart_command:
+            try:
+                result = subprocess.run(restart_command.format(agent=agent), shell=True,
+                                        capture_output=True, text=True, timeout=120)
+            except subprocess.TimeoutExpired:
+                restart_failed[agent] = "restart command timed out"
+                continue
+            if result.returncode != 0:
+                restart_failed[agent] = result.stderr.strip() or f"exit status {result.returncode}"
+                continue
+        restarted.append(agent)
+
+    _prune_releases(releases, keep=os.path.basename(release))
+    return {"release": release, "tree_hash": manifest["tree_hash"], "restarted": restarted,
+            "restart_failed": restart_failed, "restart_command_run": bool(restart_command)}
+
+
+def _prune_releases(releases, keep):
+    entries = sorted((os.path.getmtime(os.path.join(releases, name)), name) for name in os.listdir(releases))
+    old = [name for _, name in entries if name != keep and not name.endswith(".staging")]
+    for name in old[:max(0, len(old) - (KEEP_RELEASES - 1))]:
+        shutil.rmtree(os.path.join(releases, name), ignore_errors=True)
+
+
+# ---- targets -------------------------------------------------------------
+
+class LocalTarget:
+    """A deploy root on this machine, e.g. for staging or tests"""
+
+    def __init__(self, deploy_root, restart_command=None):
+        self.deploy_root = deploy_root
+        self.restart_command = restart_command
+
+    def manifest(self):
+        return _read_manifest(self.deploy_root)
+
+    def apply(self, bundle_bytes):
+        return apply_bundle(self.deploy_root, bundle_bytes, self.restart_command)
+
+
+class CommandTarget:
+    """A deploy root reached through a command prefix: ["docker", "exec", "-i", "agents"] or ["ssh", host]"""
+
+    def __init__(self, prefix, deploy_root, restart_command=None, remote_shell=False, python="python3"):
+        self.prefix = list(prefix)
+        self.deploy_root = deploy_root
+        self.restart_command = restart_command
+        self.remote_shell = remote_shell  # ssh joins arguments into one shell string
+        self.python = python
+
+    def _run(self, args, data=None):
+        command = self.prefix + ([shlex.join(args)] if self.remote_shell else args)
+        result = subprocess.run(command, input=data, capture_output=True, timeout=600)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode(errors="replace").strip() or f"{command[0]} failed")
+        return result.stdout
+
+    def manifest(self):
+        output = self._run([self.python, "-c", _APPLIER_SOURCE, "manifest-of", "--deploy-root", self.deploy_root])
+        return json.loads(output) if output.strip() else None
+
+    def apply(self, bundle_bytes):
+        args = [self.python, "-c", _APPLIER_SOURCE, "apply", "--deploy-root", self.deploy_root]
+        if self.restart_command:
+            args += ["--restart-command", self.restart_command]
+        return json.loads(self._run(args + ["-"], data=bundle_bytes))
+
+
+def deploy(root, target):
+    """Build a delta against the target's manifest, apply it and report what moved"""
+    started = time.monotonic()
+    bundle, manifest, changes = build_delta(root, target.manifest())
+    if bundle is None:
+        return {"success": True, "changed": False, "tree_hash": manifest["tree_hash"], "restarted": []}
+    applied = target.apply(bundle)
+    failed = applied.get("restart_failed") or {}
+    if failed:
+        applied["error"] = f"Release is live but {len(failed)} agent restart(s) failed: {', '.join(sorted(failed))}"
+    return dict(applied, success=not failed, changed=True, bundle_bytes=len(bundle),
+                tree_bytes=sum(f["size"] for f in manifest["files"].values()),
+                added=len(changes["added"]), modified=len(changes["modified"]), removed=len(changes["removed"]),
+                seconds=round(time.monotonic() - started, 2))
+
+
+def _cli(argv=None):
+    parser = argparse.ArgumentParser(description="Content-hashed delta deployment")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("manifest", help="Print the manifest of a source tree")
+    p.add_argument("--root", default=".")
+    p = sub.add_parser("manifest-of", help="Print the live manifest of a deploy root")
+    p.add_argument("--deploy-root", required=True)
+    p = sub.add_parser("build", help="Write a delta bundle against a base manifest")
+    p.add_argument("--root", default=".")
+    p.add_argument("--base", help="Manifest JSON of the target (omit for a full bundle)")
+    p.add_argument("--out", required=True)
+    p = sub.add_parser("apply", help="Apply a bundle to a deploy root")
+    p.add_argument("--deploy-root", required=True)
+    p.add_argument("--restart-command", help="Shell template run per changed agent, e.g. 'sudo systemctl restart agentforce@{agent}' "
+                        "(template unit: deployment/agentforce@.service)")
+    p.add_argument("bundle", help="Bundle path, or - for stdin")
+    p = sub.add_parser("deploy", help="Build and apply a delta in one step")
+    p.add_argument("--root", default=".")
+    p.add_argument("--deploy-root", required=True)
+    p.add_argument("--ssh", help="user@host; default deploys to a local directory")
+    p.add_argument("--docker", help="Container name")
+    p.add_argument("--restart-command")
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        print(json.dumps(build_manifest(args.root), indent=1))
+    elif args.command == "manifest-of":
+        manifest = _read_manifest(args.deploy_root)
+        print(json.dumps(manifest) if manifest else "")
+    elif args.command == "build":
+        base = None
+        if args.base:
+            with open(args.base) as f:
+                base = json.load(f)
+        bundle, _, changes = build_delta(args.root, base)
+        if bundle is not None:
+            with open(args.out, "wb") as f:
+                f.write(bundle)
+        print(json.dumps(dict(changes, bundle_bytes=len(bundle or b""))))
+    elif args.command == "apply":
+        data = sys.stdin.buffer.read() if args.bundle == "-" else open(args.bundle, "rb").read()
+        print(json.dumps(apply_bundle(args.deploy_root, data, args.restart_command)))
+    elif args.command == "deploy":
+        if args.ssh:
+            target = CommandTarget(["ssh", args.ssh], args.deploy_root, args.restart_command, remote_shell=True)
+        elif args.docker:
+            target = CommandTarget(["docker", "exec", "-i", args.docker], args.deploy_root, args.restart_command)
+        else:
+            target = LocalTarget(args.deploy_root, args.restart_command)
+        result = deploy(args.root, target)
+        print(json.dumps(result, indent=2))
+        if not result["success"]:
+            sys.exit(RESTART_FAILED_EXIT)
+
+
+try:
+    with open(os.path.abspath(__file__)) as _f:
+        _APPLIER_SOURCE = _f.read()
+except (NameError, OSError):
+    _APPLIER_SOURCE = None  # Running from `python -c` on a target; only the applier side is needed
+
+
+if __name__ == "__main__":
+    _cli()
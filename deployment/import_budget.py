@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Import Budget - Cold-start import time of every agent entry point
+Runs each entry module under `python -X importtime` in a fresh interpreter,
+compares the cumulative time with the recorded baseline and fails when a
+module regresses past the tolerance or pulls a heavy dependency in at
+import time. Run before deploying; --update records a new baseline.
+
+Budgets are stored as multiples of the start-up time of `python -c pass`,
+measured in the same run, so a baseline recorded on one machine still holds
+on a faster or slower one.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from deployment.bundle_builder import AGENT_ENTRY_MODULES, CORE_MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "deployment", "import_budget.json")
+
+# Must only load on first use (see integrations/lazy_imports.py)
+HEAVY_MODULES = ("cv2", "numpy", "anthropic", "google", "googleapiclient", "httpx")
+DEFAULT_CEILING = 8.0  # Budget for modules missing from the baseline, in interpreter start-ups
+
+# Records every top-level import attempted, so a heavy import is caught even
+# when the package is not installed here (the import fails and never reaches
+# sys.modules) or is swallowed by a try/except ImportError
+PROBE = """
+import json, sys
+attempted = set()
+class ImportRecorder:
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        attempted.add(name.split(".")[0])
+sys.meta_path.insert(0, ImportRecorder)
+import {module}
+loaded = {{name.split(".")[0] for name in sys.modules}}
+print(json.dumps(sorted(attempted | loaded)))
+"""
+
+
+def entry_modules():
+    modules = list(CORE_MODULES)
+    for agent_modules in AGENT_ENTRY_MODULES.values():
+        modules.extend(m for m in agent_modules if m not in modules)
+    return modules
+
+
+def startup_ms(repeats=5, python=sys.executable):
+    """Best-of-`repeats` wall time of `python -c pass`, the unit budgets are recorded in"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([python, "-c", "pass"], cwd=ROOT, check=True, timeout=60)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(module, repeats=5, python=sys.executable):
+    """Best-of-`repeats` cumulative import time, the heavy modules loaded, and the slowest imports"""
+    best, heavy, offenders = None, set(), {}
+    for _ in range(repeats):
+        result = subprocess.run([python, "-X", "importtime", "-c", PROBE.format(module=module)], cwd=ROOT,
+                                env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1]}
+        heavy.update(name for name in json.loads(result.stdout.strip().splitlines()[-1]) if name in HEAVY_MODULES)
+        total = None
+        own = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            parts = line[len("import time:"):].split("|")
+            try:
+                self_us, cumulative_us = int(parts[0]), int(parts[1])
+            except ValueError:
+                continue  # Header row
+            name = parts[2].strip()
+            own[name] = self_us
+            if name == module:
+                total = cumulative_us
+        if total is not None and (best is None or total < best):
+            best, offenders = total, own
+    slowest = sorted(offenders.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {"module": module, "ms": round(best / 1000, 1) if best is not None else None,
+            "heavy": sorted(heavy), "slowest": [(name, round(us / 1000, 1)) for name, us in slowest]}
+
+
+def check(results, baseline, reference_ms, tolerance=0.5, slack_ms=15.0):
+    """Regressions: import errors, heavy modules, or time over baseline * reference * (1 + tolerance) + slack"""
+    failures = []
+    for result in results:
+        module = result["module"]
+        if "error" in result:
+            failures.append(f"{module}: import failed ({result['error']})")
+            continue
+        if result["heavy"]:
+            failures.append(f"{module}: imports {', '.join(result['heavy'])} at import time")
+        ratio = baseline.get(module)
+        limit = ratio * reference_ms * (1 + tolerance) + slack_ms if ratio is not None else DEFAULT_CEILING * reference_ms
+        result["limit_ms"] = round(limit, 1)
+        if result["ms"] is not None and result["ms"] > limit:
+            failures.append(f"{module}: {result['ms']} ms exceeds budget {limit:.1f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent entry-point import time budget")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed fractional growth over baseline")
+    parser.add_argument("--slack-ms", type=float, default=15.0, help="Absolute noise allowance per module")
+    parser.add_argument("--update", action="store_true", help="Record current times as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    reference_ms = startup_ms(args.repeats)
+    results = [measure(module, args.repeats) for module in entry_modules()]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("modules", {})
+
+    if args.update:
+        recorded = {r["module"]: round(r["ms"] / reference_ms, 2) for r in results if r.get("ms") is not None}
+        with open(args.baseline, "w") as f:
+            json.dump({"unit": "python -c pass", "modules": recorded}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"📝 Recorded import baseline for {len(recorded)} modules in {args.baseline} "
+              f"(interpreter start-up {reference_ms:.1f} ms)")
+        return 0
+
+    failures = check(results, baseline, reference_ms, args.tolerance, args.slack_ms)
+    print(f"⏱️ Interpreter start-up (python -c pass): {reference_ms:.1f} ms")
+    for result in results:
+        if "error" in result:
+            print(f"❌ {result['module']}: {result['error']}")
+            continue
+        status = "❌" if any(f.startswith(result["module"] + ":") for f in failures) else "✅"
+        slowest = ", ".join(f"{name} {ms}ms" for name, ms in result["slowest"][:3])
+        print(f"{status} {result['module']:<45} {result['ms']:>7} ms (budget {result['limit_ms']} ms)  [{slowest}]")
+
+    if failures:
+        print("\n🚨 Import budget exceeded:")
+        for failure in failures:
+            print(f"   • {failure}")
+        return 1
+    print(f"\n✅ All {len(results)} entry points within import budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
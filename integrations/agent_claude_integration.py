@@ -4,37 +4,83 @@ Claude Integration for AgentForce - Direct API Access
 Each agent can now communicate directly with Claude for assistance
 """
 
-import anthropic
 import asyncio
 import json
 import os
 from datetime import datetime
 
+from agents.agent_metrics import record_cache
+from integrations.semantic_answer_index import (
+    REUSE_SCORE, CONTEXT_SCORE, get_shared_semantic_index, prior_answers_context, query_text
+)
+from integrations.tracing import instrument
+
 class AgentClaudeIntegration:
-    def __init__(self, agent_name):
+    def __init__(self, agent_name, client=None, semantic_index=None):
         self.agent_name = agent_name
         self.api_key = os.environ.get('ANTHROPIC_API_KEY')
+        # Past answers; paraphrased questions reuse or cite them instead of a fresh call
+        self.semantic_index = semantic_index if semantic_index is not None else get_shared_semantic_index()
+        if client is not None:
+            # Shared client from the agent supervisor's pool
+            self.client = client
+            return
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        import anthropic  # Deferred: the SDK is slow to import and most agents never call Claude
         self.client = anthropic.Anthropic(api_key=self.api_key)
+    
+    def _recall(self, kind, question, context=""):
+        """(earlier answer close enough to reuse, earlier answers worth citing as context)"""
+        if self.semantic_index is None:
+            return None, ""
+        hits = self.semantic_index.search(query_text(question, context), k=3, kind=kind, min_score=CONTEXT_SCORE)
+        reuse = hits[0] if hits and hits[0]["score"] >= REUSE_SCORE else None
+        record_cache(self.agent_name, "claude_semantic", reuse is not None)
+        if reuse is not None:
+            self.semantic_index.record_hit(reuse["entry_id"])
+            return reuse, ""
+        return None, prior_answers_context(hits) if hits else ""
+    
+    def _remember(self, kind, question, answer, context=""):
+        if self.semantic_index is not None:
+            self.semantic_index.add(question, answer, kind, self.agent_name, context)
+    
+    @staticmethod
+    def _semantic_hit(hit):
+        return {"question": hit["question"], "score": hit["score"], "answered_by": hit["agent"]}
         
     async def ask_claude(self, question, context=""):
         """Agent asks Claude for help"""
+        # The SDK client and the index are blocking; keep callers' event loops free
+        reuse, prior = await asyncio.to_thread(self._recall, "ask", question, context)
+        if reuse is not None:
+            return {
+                "success": True,
+                "response": reuse["answer"],
+                "agent": self.agent_name,
+                "timestamp": datetime.now().isoformat(),
+                "semantic_hit": self._semantic_hit(reuse)
+            }
+        
         prompt = f"""
 Agent: {self.agent_name}
 Question: {question}
 Context: {context}
+{prior}
 
 Please provide specific, actionable guidance for this agent.
 """
         
         try:
-            response = self.client.messages.create(
+            response = await asyncio.to_thread(
+                self.client.messages.create,
                 model="claude-3-5-sonnet-latest",
                 max_tokens=2000,
                 messages=[{"role": "user", "content": prompt}]
             )
             
+            await asyncio.to_thread(self._remember, "ask", question, response.content[0].text, context)
             return {
                 "success": True,
                 "response": response.content[0].text,
@@ -72,16 +118,23 @@ Please provide specific, actionable guidance for this agent.
     
     def claude_problem_solve(self, problem):
         """Claude helps solve agent problems"""
+        reuse, prior = self._recall("solve", problem)
+        if reuse is not None:
+            return {"success": True, "solution": reuse["answer"], "agent": self.agent_name,
+                    "semantic_hit": self._semantic_hit(reuse)}
+        
         try:
+            prior = f"{prior}\n\n" if prior else ""
             response = self.client.messages.create(
                 model="claude-3-5-sonnet-latest", 
                 max_tokens=1500,
                 messages=[{
                     "role": "user",
-                    "content": f"Agent {self.agent_name} needs help with: {problem}\n\nProvide step-by-step solution."
+                    "content": f"Agent {self.agent_name} needs help with: {problem}\n\n{prior}Provide step-by-step solution."
                 }]
             )
             
+            self._remember("solve", problem, response.content[0].text)
             return {
                 "success": True,
                 "solution": response.content[0].text,
@@ -91,6 +144,8 @@ Please provide specific, actionable guidance for this agent.
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+instrument(AgentClaudeIntegration)
+
 # Example usage for agents
 if __name__ == "__main__":
     # Each agent creates its own Claude integration
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Audio Processor - Container-aware extraction and EBU R128 loudness normalization
+Copies the audio stream when the target container accepts its codec,
+transcodes only when it does not, and caches loudness measurements
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Codecs each output container can hold without re-encoding
+CONTAINER_CODECS = {
+    ".mp3": {"mp3"},
+    ".m4a": {"aac", "alac"},
+    ".aac": {"aac"},
+    ".ogg": {"vorbis", "opus", "flac"},
+    ".opus": {"opus"},
+    ".flac": {"flac"},
+    ".wav": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"},
+    ".mp4": {"aac", "alac", "mp3", "ac3", "eac3", "opus", "flac"},
+    ".mov": {"aac", "alac", "mp3", "ac3", "pcm_s16le", "pcm_s24le"},
+    ".webm": {"opus", "vorbis"},
+    ".mka": None,  # Matroska accepts anything
+    ".mkv": None
+}
+
+# Encoder used when a stream copy is not possible
+TRANSCODE_ARGS = {
+    ".mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    ".m4a": ["-c:a", "aac", "-b:a", "192k"],
+    ".aac": ["-c:a", "aac", "-b:a", "192k"],
+    ".ogg": ["-c:a", "libvorbis", "-q:a", "5"],
+    ".opus": ["-c:a", "libopus", "-b:a", "128k"],
+    ".flac": ["-c:a", "flac"],
+    ".wav": ["-c:a", "pcm_s16le"],
+    ".mp4": ["-c:a", "aac", "-b:a", "192k"],
+    ".mov": ["-c:a", "aac", "-b:a", "192k"],
+    ".webm": ["-c:a", "libopus", "-b:a", "128k"],
+    ".mka": ["-c:a", "flac"],
+    ".mkv": ["-c:a", "flac"]
+}
+
+# EBU R128 broadcast defaults; streaming platforms usually want around -14 LUFS
+DEFAULT_LOUDNESS = {"integrated": -23.0, "true_peak": -1.0, "range": 7.0}
+
+
+class AudioProcessor:
+    def __init__(self, ffmpeg="ffmpeg", ffprobe="ffprobe", cache_path="loudness_cache.json", workers=None):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.cache_path = cache_path
+        self.workers = workers or os.cpu_count() or 2
+        self.cache_lock = threading.Lock()
+        self.cache = self._load_cache()
+
+    # ---- probing -------------------------------------------------------
+
+    def probe_audio(self, path):
+        """Codec, sample rate and channels of the first audio stream (None if there is none)"""
+        result = subprocess.run(
+            [self.ffprobe, "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=codec_name,sample_rate,channels", "-of", "json", path],
+            capture_output=True, text=True, timeout=30
+        )
+        if result.returncode != 0:
+            raise ValueError(f"Could not probe audio: {result.stderr.strip()}")
+        streams = json.loads(result.stdout).get("streams", [])
+        if not streams:
+            return None
+        stream = streams[0]
+        return {
+            "codec": stream.get("codec_name"),
+            "sample_rate": int(stream.get("sample_rate", 0) or 0),
+            "channels": stream.get("channels")
+        }
+
+    @staticmethod
+    def can_copy(codec, output_path):
+        """True/False for containers in CONTAINER_CODECS; None when only ffmpeg's muxer can tell"""
+        suffix = Path(output_path).suffix.lower()
+        if suffix not in CONTAINER_CODECS:
+            return None
+        allowed = CONTAINER_CODECS[suffix]
+        return allowed is None or codec in allowed
+
+    # ---- loudness measurement cache ------------------------------------
+
+    def _load_cache(self):
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cache, f, indent=1)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def _cache_key(path, targets):
+        # Size and mtime invalidate the entry when the source file changes
+        stat = os.stat(path)
+        return "|".join([os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns),
+                         str(targets["integrated"]), str(targets["true_peak"]), str(targets["range"])])
+
+    @staticmethod
+    def _loudnorm_filter(targets, measured=None):
+        parts = [f"I={targets['integrated']}", f"TP={targets['true_peak']}", f"LRA={targets['range']}"]
+        if measured:
+            parts += [f"measured_I={measured['input_i']}", f"measured_TP={measured['input_tp']}",
+                      f"measured_LRA={measured['input_lra']}", f"measured_thresh={measured['input_thresh']}",
+                      f"offset={measured['target_offset']}", "linear=true"]
+        return "loudnorm=" + ":".join(parts) + ":print_format=json"
+
+    def measure_loudness(self, path, targets=None):
+        """First loudnorm pass; results are reused until the file changes"""
+        targets = dict(DEFAULT_LOUDNESS, **(targets or {}))
+        key = self._cache_key(path, targets)
+        with self.cache_lock:
+            if key in self.cache:
+                return dict(self.cache[key], cached=True)
+
+        result = subprocess.run(
+            [self.ffmpeg, "-hide_banner", "-nostats", "-i", path, "-vn",
+             "-af", self._loudnorm_filter(targets), "-f", "null", "-"],
+            capture_output=True, text=True, timeout=1800
+        )
+        if result.returncode != 0:
+            raise ValueError(f"Loudness measurement failed: {result.stderr.strip()[-500:]}")
+        # loudnorm prints its JSON report as the last brace block on stderr
+        blocks = re.findall(r"\{[^{}]*\}", result.stderr)
+        if not blocks:
+            raise ValueError("Loudness measurement produced no report")
+        measured = json.loads(blocks[-1])
+
+        with self.cache_lock:
+            self.cache[key] = measured
+            self._save_cache()
+        return dict(measured, cached=False)
+
+    # ---- extraction ----------------------------------------------------
+
+    def extract(self, video_path, audio_path, normalize=False, targets=None):
+        """Extract the audio track, copying the stream when the container allows it"""
+        try:
+            stream = self.probe_audio(video_path)
+            if stream is None:
+                return {"success": False, "error": f"No audio stream in {video_path}"}
+
+            suffix = Path(audio_path).suffix.lower()
+            measured = None
+            result = None
+            cmd = [self.ffmpeg, "-v", "error", "-i", video_path, "-vn", "-map", "0:a:0"]
+
+            if normalize:
+                targets = dict(DEFAULT_LOUDNESS, **(targets or {}))
+                measured = self.measure_loudness(video_path, targets)
+                # loudnorm resamples to 192 kHz internally; keep the source rate
+                cmd += ["-af", self._loudnorm_filter(targets, measured),
+                        "-ar", str(stream["sample_rate"] or 48000)]
+                cmd += TRANSCODE_ARGS.get(suffix, [])
+                method = "normalize"
+            else:
+                copy = self.can_copy(stream["codec"], audio_path)
+                if copy is None:
+                    # Unlisted container: try the copy and transcode only if the muxer refuses the codec
+                    result = subprocess.run(cmd + ["-c:a", "copy", "-y", audio_path],
+                                            capture_output=True, text=True, timeout=600)
+                    copy = result.returncode == 0
+                    if not copy:
+                        result = None
+                if copy:
+                    cmd += ["-c:a", "copy"]
+                    method = "copy"
+                else:
+                    cmd += TRANSCODE_ARGS.get(suffix, [])
+                    method = "transcode"
+
+            cmd += ["-y", audio_path]
+            if result is None:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+
+            output = {
+                "success": result.returncode == 0,
+                "audio_extracted": audio_path,
+                "source_video": video_path,
+                "source_codec": stream["codec"],
+                "method": method,
+                "error": result.stderr if result.returncode != 0 else None
+            }
+            if measured:
+                output["loudness"] = {
+                    "input_lufs": float(measured["input_i"]),
+                    "target_lufs": targets["integrated"],
+                    "measurement_cached": measured["cached"]
+                }
+            return output
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def extract_batch(self, jobs, normalize=False, targets=None):
+        """Extract many (video_path, audio_path) pairs concurrently; ffmpeg does the work off the GIL"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda job: self.extract(job[0], job[1], normalize, targets), jobs))
+        methods = {}
+        for r in results:
+            if r["success"]:
+                methods[r["method"]] = methods.get(r["method"], 0) + 1
+        return {
+            "success": all(r["success"] for r in results),
+            "extracted_count": sum(1 for r in results if r["success"]),
+            "methods": methods,
+            "results": results
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    processor = AudioProcessor(cache_path=None)
+    print("🎧 Audio Processor Ready")
+    for suffix in sorted(CONTAINER_CODECS):
+        print(f"   {suffix}: copies {', '.join(sorted(CONTAINER_CODECS[suffix] or ['any codec']))}")
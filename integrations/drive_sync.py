@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Drive Sync - Incremental folder sync to Google Drive
+Keeps a local manifest of path, size, mtime, MD5 and Drive file ID, follows
+the Drive changes feed with a saved page token to notice remote edits, and
+uploads only new or modified files, updating existing file IDs in place
+"""
+
+import hashlib
+import itertools
+import json
+import mimetypes
+import os
+import threading
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+HASH_CHUNK = 1024 * 1024
+CHANGE_FIELDS = "nextPageToken,newStartPageToken,changes(fileId,removed,file(id,name,md5Checksum,trashed,parents))"
+
+
+def file_md5(path):
+    """Hex MD5, the same digest Drive reports as md5Checksum"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalFileMedia:
+    """Minimal stand-in for MediaFileUpload (size/getbytes) when googleapiclient is absent"""
+
+    def __init__(self, filename, mimetype=None, resumable=True):
+        self._filename = filename
+        self._mimetype = mimetype or "application/octet-stream"
+        self.resumable = resumable
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return os.path.getsize(self._filename)
+
+    def getbytes(self, begin, length):
+        with open(self._filename, "rb") as f:
+            f.seek(begin)
+            return f.read(length)
+
+
+def default_media_factory(path, mimetype):
+    try:
+        from googleapiclient.http import MediaFileUpload
+    except ImportError:
+        return LocalFileMedia(path, mimetype)
+    return MediaFileUpload(path, mimetype=mimetype, resumable=True)
+
+
+class DriveSyncEngine:
+    def __init__(self, drive_service, manifest_path="drive_sync_manifest.json", media_factory=None, execute=None):
+        self.drive = drive_service
+        # Hook for quota/retry wrappers: execute(request, idempotent=True)
+        self.execute = execute or (lambda request, idempotent=True: request.execute())
+        self.manifest_path = manifest_path
+        self.media_factory = media_factory or default_media_factory
+        self.lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    # ---- manifest --------------------------------------------------------
+
+    def _load_manifest(self):
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"page_token": None, "roots": {}}
+
+    def _save_manifest(self):
+        if not self.manifest_path:
+            return
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _root(self, folder_id):
+        return self.manifest["roots"].setdefault(folder_id, {"files": {}, "folders": {"": folder_id}})
+
+    # ---- changes feed ----------------------------------------------------
+
+    def poll_changes(self):
+        """Apply remote changes since the saved page token to the manifest.
+
+        Files deleted or trashed in Drive are forgotten, so they are uploaded
+        again; files edited remotely lose their recorded hash, so the local
+        copy is pushed back over them in place. Our own uploads come back
+        through the feed with a matching MD5 and are ignored.
+        """
+        token = self.manifest.get("page_token")
+        if not token:
+            self.manifest["page_token"] = self.execute(self.drive.changes().getStartPageToken())["startPageToken"]
+            return 0
+
+        by_id = {
+            entry["file_id"]: (root, rel)
+            for root, tree in self.manifest["roots"].items()
+            for rel, entry in tree["files"].items()
+        }
+        applied = 0
+        while token:
+            page = self.execute(self.drive.changes().list(pageToken=token, spaces="drive", includeRemoved=True,
+                                                          fields=CHANGE_FIELDS))
+            for change in page.get("changes", []):
+                location = by_id.get(change.get("fileId"))
+                if location is None:
+                    continue
+                entry = self.manifest["roots"][location[0]]["files"].get(location[1])
+                if entry is None:
+                    continue
+                remote = change.get("file") or {}
+                if change.get("removed") or remote.get("trashed"):
+                    del self.manifest["roots"][location[0]]["files"][location[1]]
+                    applied += 1
+                elif remote.get("md5Checksum") and remote["md5Checksum"] != entry["md5"]:
+                    entry["md5"] = None
+                    applied += 1
+            token = page.get("nextPageToken")
+            if not token:
+                self.manifest["page_token"] = page.get("newStartPageToken", self.manifest["page_token"])
+        return applied
+
+    # ---- remote helpers --------------------------------------------------
+
+    def _list_children(self, folder_id):
+        children = {}
+        page_token = None
+        while True:
+            page = self.execute(self.drive.files().list(
+                q=f"'{folder_id}' in parents and trashed=false", spaces="drive",
+                fields="nextPageToken,files(id,name,md5Checksum,mimeType)", pageToken=page_token
+            ))
+            for item in page.get("files", []):
+                children.setdefault(item["name"], item)
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return children
+
+    def _ensure_folder(self, tree, rel_dir, remote_children):
+        """Drive folder ID for a local sub-directory, creating or adopting it once"""
+        if rel_dir in tree["folders"]:
+            return tree["folders"][rel_dir]
+        parent_rel = os.path.dirname(rel_dir)
+        parent_id = self._ensure_folder(tree, parent_rel, remote_children)
+        name = os.path.basename(rel_dir)
+        existing = self._children(parent_id, remote_children).get(name)
+        if existing and existing.get("mimeType") == FOLDER_MIME:
+            folder_id = existing["id"]
+        else:
+            folder_id = self.execute(self.drive.files().create(
+                body={"name": name, "mimeType": FOLDER_MIME, "parents": [parent_id]}, fields="id"
+            ), idempotent=False)["id"]
+            remote_children[folder_id] = {}
+        tree["folders"][rel_dir] = folder_id
+        return folder_id
+
+    def _children(self, folder_id, remote_children):
+        # Listed once per folder per sync, only when the manifest cannot answer
+        if folder_id not in remote_children:
+            remote_children[folder_id] = self._list_children(folder_id)
+        return remote_children[folder_id]
+
+    # ---- sync ------------------------------------------------------------
+
+    def sync_folder(self, local_dir, folder_id, delete_missing=False):
+        """Mirror `local_dir` into Drive folder `folder_id`, transferring only what changed"""
+        # A missing or unmounted directory walks as empty and would trash the whole remote folder
+        if not os.path.isdir(local_dir):
+            return {"success": False, "error": f"Local directory not found: {local_dir}"}
+
+        def walk_error(error):
+            raise error
+
+        with self.lock:
+            try:
+                remote_changes = self.poll_changes()
+                tree = self._root(folder_id)
+                remote_children = {}
+                stats = {"uploaded": 0, "updated": 0, "unchanged": 0, "adopted": 0, "deleted": 0,
+                         "bytes_uploaded": 0, "bytes_skipped": 0}
+                seen = set()
+
+                for dirpath, dirnames, filenames in os.walk(local_dir, onerror=walk_error):
+                    dirnames.sort()
+                    for filename in sorted(filenames):
+                        path = os.path.join(dirpath, filename)
+                        rel = os.path.relpath(path, local_dir).replace(os.sep, "/")
+                        seen.add(rel)
+                        self._sync_file(tree, rel, path, remote_children, stats)
+
+                if delete_missing and not seen and tree["files"]:
+                    raise RuntimeError(f"Refusing to delete {len(tree['files'])} remote files: "
+                                       f"{local_dir} is empty")
+                if delete_missing:
+                    for rel in sorted(set(tree["files"]) - seen):
+                        self.execute(self.drive.files().update(fileId=tree["files"][rel]["file_id"],
+                                                               body={"trashed": True}))
+                        del tree["files"][rel]
+                        stats["deleted"] += 1
+
+                # Our own writes are in the feed now; skip past them on the next poll
+                self.poll_changes()
+                self._save_manifest()
+                return dict(stats, success=True, folder_id=folder_id, local_dir=local_dir,
+                            remote_changes=remote_changes, files=len(seen))
+
+            except Exception as e:
+                self._save_manifest()
+                return {"success": False, "error": str(e)}
+
+    def _sync_file(self, tree, rel, path, remote_children, stats):
+        stat = os.stat(path)
+        entry = tree["files"].get(rel)
+        if (entry and entry["md5"] and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns):
+            stats["unchanged"] += 1
+            stats["bytes_skipped"] += stat.st_size
+            return
+
+        md5 = file_md5(path)
+        if entry and entry["md5"] == md5:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)  # Touched, not modified
+            stats["unchanged"] += 1
+            stats["bytes_skipped"] += stat.st_size
+            return
+
+        parent_id = self._ensure_folder(tree, os.path.dirname(rel), remote_children)
+        file_id = entry["file_id"] if entry else None
+        if file_id is None:
+            # First sync against a populated folder: reuse files already there by name
+            existing = self._children(parent_id, remote_children).get(os.path.basename(rel))
+            if existing and existing.get("mimeType") != FOLDER_MIME:
+                file_id = existing["id"]
+                if existing.get("md5Checksum") == md5:
+                    tree["files"][rel] = {"file_id": file_id, "md5": md5, "size": stat.st_size,
+                                          "mtime_ns": stat.st_mtime_ns}
+                    stats["adopted"] += 1
+                    stats["bytes_skipped"] += stat.st_size
+                    return
+
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        media = self.media_factory(path, mimetype)
+        if file_id:
+            # New revision of the same file: links and permissions survive
+            result = self.execute(self.drive.files().update(fileId=file_id, media_body=media,
+                                                            fields="id,md5Checksum"))
+            stats["updated"] += 1
+        else:
+            body = {"name": os.path.basename(rel), "parents": [parent_id]}
+            result = self.execute(self.drive.files().create(body=body, media_body=media,
+                                                            fields="id,md5Checksum"), idempotent=False)
+            stats["uploaded"] += 1
+        stats["bytes_uploaded"] += stat.st_size
+        tree["files"][rel] = {"file_id": result["id"], "md5": result.get("md5Checksum") or md5,
+                              "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# ---- local fake Drive ----------------------------------------------------
+
+class _Request:
+    def __init__(self, func):
+        self.func = func
+
+    def execute(self):
+        return self.func()
+
+
+class FakeDriveService:
+    """In-memory Drive v3 subset (files, changes) for exercising sync without network access"""
+
+    def __init__(self):
+        self.files_by_id = {}
+        self.change_log = []      # (fileId, removed) in order; page tokens index into it
+        self.ids = itertools.count(1)
+        self.calls = {"create": 0, "update": 0, "list": 0, "changes": 0}
+        self.bytes_received = 0
+
+    def _read_media(self, media):
+        data = media.getbytes(0, media.size())
+        self.bytes_received += len(data)
+        return data
+
+    def _record(self, file_id, removed=False):
+        self.change_log.append((file_id, removed))
+
+    def _public(self, item):
+        return {k: v for k, v in item.items() if k != "content"}
+
+    # files() -------------------------------------------------------------
+
+    def files(self):
+        return self
+
+    def create(self, body, media_body=None, fields=None):
+        def run():
+            self.calls["create"] += 1
+            file_id = f"fake{next(self.ids)}"
+            item = {"id": file_id, "name": body["name"], "parents": body.get("parents", []),
+                    "mimeType": body.get("mimeType", "application/octet-stream"), "trashed": False}
+            if media_body is not None:
+                item["content"] = self._read_media(media_body)
+                item["md5Checksum"] = hashlib.md5(item["content"]).hexdigest()
+            self.files_by_id[file_id] = item
+            self._record(file_id)
+            return self._public(item)
+        return _Request(run)
+
+    def update(self, fileId, body=None, media_body=None, fields=None):
+        def run():
+            self.calls["update"] += 1
+            item = self.files_by_id[fileId]
+            item.update(body or {})
+            if media_body is not None:
+                item["content"] = self._read_media(media_body)
+                item["md5Checksum"] = hashlib.md5(item["content"]).hexdigest()
+            self._record(fileId)
+            return self._public(item)
+        return _Request(run)
+
+    def delete(self, fileId):
+        def run():
+            self.files_by_id.pop(fileId)
+            self._record(fileId, removed=True)
+            return {}
+        return _Request(run)
+
+    def list(self, q=None, pageToken=None, pageSize=100, spaces=None, fields=None):
+        def run():
+            self.calls["list"] += 1
+            parent = q.split("'")[1] if q else None
+            matches = [self._public(item) for item in self.files_by_id.values()
+                       if not item["trashed"] and (parent is None or parent in item["parents"])]
+            start = int(pageToken or 0)
+            page = {"files": matches[start:start + pageSize]}
+            if start + pageSize < len(matches):
+                page["nextPageToken"] = str(start + pageSize)
+            return page
+        return _Request(run)
+
+    # changes() -----------------------------------------------------------
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def getStartPageToken(self):
+        return _Request(lambda: {"startPageToken": str(len(self.change_log))})
+
+    def _list_changes(self, page_token, page_size):
+        def run():
+            self.calls["changes"] += 1
+            start = int(page_token)
+            batch = self.change_log[start:start + page_size]
+            changes = []
+            for file_id, removed in batch:
+                item = self.files_by_id.get(file_id)
+                change = {"fileId": file_id, "removed": removed or item is None}
+                if item is not None:
+                    change["file"] = self._public(item)
+                changes.append(change)
+            page = {"changes": changes}
+            if start + page_size < len(self.change_log):
+                page["nextPageToken"] = str(start + page_size)
+            else:
+                page["newStartPageToken"] = str(len(self.change_log))
+            return page
+        return _Request(run)
+
+    # test helpers --------------------------------------------------------
+
+    def edit_remote(self, file_id, content):
+        """Simulate someone editing a file directly in Drive"""
+        item = self.files_by_id[file_id]
+        item["content"] = content
+        item["md5Checksum"] = hashlib.md5(content).hexdigest()
+        self._record(file_id)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self):
+        return self.drive.getStartPageToken()
+
+    def list(self, pageToken, pageSize=100, spaces=None, includeRemoved=True, fields=None):
+        return self.drive._list_changes(pageToken, pageSize)
+
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as local_dir:
+        for i in range(20):
+            os.makedirs(os.path.join(local_dir, "renders"), exist_ok=True)
+            with open(os.path.join(local_dir, "renders", f"frame_{i:02d}.bin"), "wb") as f:
+                f.write(os.urandom(64 * 1024))
+
+        drive = FakeDriveService()
+        engine = DriveSyncEngine(drive, manifest_path=None, media_factory=LocalFileMedia)
+        first = engine.sync_folder(local_dir, "root")
+        with open(os.path.join(local_dir, "renders", "frame_03.bin"), "wb") as f:
+            f.write(os.urandom(64 * 1024))
+        second = engine.sync_folder(local_dir, "root")
+
+        print("☁️ Drive Sync Ready")
+        print(f"📤 First sync: {first['uploaded']} uploaded, {first['bytes_uploaded']} bytes")
+        print(f"🔁 Second sync: {second['updated']} updated, {second['unchanged']} unchanged, "
+              f"{second['bytes_uploaded']} bytes")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Encoder Preset Tuner - Deadline- and backlog-aware x264 preset selection
+Learns encode throughput per preset, resolution and host from past runs
+and picks the slowest (best compressing) preset that still finishes in time
+"""
+
+import json
+import os
+import socket
+import threading
+
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast",
+           "medium", "slow", "slower", "veryslow"]
+
+# Throughput relative to medium until real runs are recorded
+PRIOR_RELATIVE_SPEED = {
+    "ultrafast": 8.0, "superfast": 6.0, "veryfast": 4.0, "faster": 2.2, "fast": 1.6,
+    "medium": 1.0, "slow": 0.55, "slower": 0.25, "veryslow": 0.1
+}
+PRIOR_MEDIUM_MPX_PER_S = 60.0  # Roughly 1080p30 in real time on a few cores
+
+
+def resolution_bucket(width, height):
+    pixels = width * height
+    if pixels <= 640 * 480:
+        return "sd"
+    if pixels <= 1280 * 720:
+        return "720p"
+    if pixels <= 1920 * 1080:
+        return "1080p"
+    return "4k"
+
+
+class EncoderPresetTuner:
+    def __init__(self, path="encoder_speeds.json", host=None, alpha=0.3, safety=1.25,
+                 backlog_target_s=900):
+        self.path = path
+        self.host = host or socket.gethostname()
+        self.alpha = alpha                        # EWMA weight of the newest run
+        self.safety = safety                      # Headroom on predicted encode time
+        self.backlog_target_s = backlog_target_s  # Aim to drain the queue within this
+        self.lock = threading.Lock()
+        self.speeds = self._load()
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.speeds, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _learned(self, preset, bucket):
+        return self.speeds.get(self.host, {}).get(f"{preset}|{bucket}")
+
+    def estimate(self, preset, width, height):
+        """Expected throughput in megapixels per second"""
+        bucket = resolution_bucket(width, height)
+        learned = self._learned(preset, bucket)
+        if learned:
+            return learned["mpx_per_s"]
+        # Scale the prior from any preset we have measured at this resolution on this host
+        for known in PRESETS:
+            sample = self._learned(known, bucket)
+            if sample:
+                return sample["mpx_per_s"] * PRIOR_RELATIVE_SPEED[preset] / PRIOR_RELATIVE_SPEED[known]
+        return PRIOR_MEDIUM_MPX_PER_S * PRIOR_RELATIVE_SPEED[preset]
+
+    def predict_seconds(self, preset, width, height, frames):
+        return width * height * frames / 1e6 / self.estimate(preset, width, height)
+
+    def budget(self, deadline_s=None, queue_depth=0):
+        """Seconds this job may take: its own deadline, or its share of draining the backlog"""
+        budgets = []
+        if deadline_s:
+            budgets.append(deadline_s)
+        if queue_depth:
+            budgets.append(self.backlog_target_s / (queue_depth + 1))
+        return min(budgets) if budgets else None
+
+    def choose(self, width, height, frames, deadline_s=None, queue_depth=0, baseline="medium"):
+        """Slowest preset up to `baseline` whose predicted time fits the budget"""
+        budget = self.budget(deadline_s, queue_depth)
+        if budget is None:
+            return {"preset": baseline, "reason": "no deadline or backlog"}
+
+        candidates = PRESETS[:PRESETS.index(baseline) + 1]
+        for preset in reversed(candidates):
+            predicted = self.predict_seconds(preset, width, height, frames)
+            if predicted * self.safety <= budget:
+                return {"preset": preset, "predicted_seconds": round(predicted, 1),
+                        "budget_seconds": round(budget, 1), "reason": "fits budget"}
+        predicted = self.predict_seconds(candidates[0], width, height, frames)
+        return {"preset": candidates[0], "predicted_seconds": round(predicted, 1),
+                "budget_seconds": round(budget, 1), "reason": "fastest preset; budget cannot be met"}
+
+    def record(self, preset, width, height, frames, seconds):
+        """Fold a finished encode into the per-host EWMA"""
+        if seconds <= 0 or frames <= 0:
+            return
+        key = f"{preset}|{resolution_bucket(width, height)}"
+        speed = width * height * frames / 1e6 / seconds
+        with self.lock:
+            host_speeds = self.speeds.setdefault(self.host, {})
+            sample = host_speeds.get(key)
+            if sample:
+                sample["mpx_per_s"] = (1 - self.alpha) * sample["mpx_per_s"] + self.alpha * speed
+                sample["samples"] += 1
+            else:
+                host_speeds[key] = {"mpx_per_s": speed, "samples": 1}
+            self._save()
+
+
+_shared_tuner = None
+_shared_tuner_lock = threading.Lock()
+
+
+def get_shared_tuner():
+    """Process-wide tuner backed by AGENT_ENCODER_SPEEDS (default encoder_speeds.json)"""
+    global _shared_tuner
+    with _shared_tuner_lock:
+        if _shared_tuner is None:
+            _shared_tuner = EncoderPresetTuner(os.environ.get("AGENT_ENCODER_SPEEDS", "encoder_speeds.json"))
+        return _shared_tuner
+
+
+# Example usage
+if __name__ == "__main__":
+    tuner = EncoderPresetTuner(path=None)
+    tuner.record("medium", 1920, 1080, 1800, 45.0)
+    frames = 30 * 120  # Two minutes of 1080p30
+    print("🎛️ Adaptive preset by queue depth (2 min 1080p clip)")
+    for depth in (0, 2, 10, 50):
+        choice = tuner.choose(1920, 1080, frames, queue_depth=depth)
+        print(f"   queue {depth:>3}: {json.dumps(choice)}")
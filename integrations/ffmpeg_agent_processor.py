@@ -7,70 +7,114 @@ Agents control FFmpeg for video editing, conversion, and enhancement
 import subprocess
 import json
 import os
+import shutil
+import tempfile
+import time
 from pathlib import Path
 
+from integrations.tracing import instrument
+
+def _frame_rate(rate):
+    """ffprobe rates come as fractions such as "30000/1001"; "0/0" means unknown"""
+    try:
+        numerator, _, denominator = (rate or "").partition("/")
+        return round(float(numerator) / float(denominator or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _read_metadata_log(path, key):
+    """Parse a metadata=print file into [(pts_time, value)] for one key"""
+    entries = []
+    pts_time = None
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            if line.startswith("frame:"):
+                fields = dict(part.split(":", 1) for part in line.split() if ":" in part)
+                pts_time = float(fields.get("pts_time", "nan"))
+            elif line.startswith(key + "=") and pts_time is not None:
+                entries.append((pts_time, float(line.split("=", 1)[1])))
+    return entries
+
+
 class FFmpegAgentProcessor:
     def __init__(self):
         self.ffmpeg = "ffmpeg"
         self.ffprobe = "ffprobe"
+        self._audio = None  # Audio subsystem, created on first use
+        self.preset_tuner = None  # Learned encode speeds, created on first adaptive encode
+        self.load_probe = None  # Callable returning the number of jobs waiting behind this one
         
-    def process_video(self, input_path, output_path, operations):
-        """Agent processes video with specified operations"""
-        
-        # Build FFmpeg command based on operations
-        cmd = [self.ffmpeg, "-i", input_path]
-        
-        # Video operations
-        video_filters = []
-        
-        if "resize_1080p" in operations:
-            video_filters.append("scale=1920:1080")
-        elif "resize_720p" in operations:
-            video_filters.append("scale=1280:720")
-        elif "resize_4k" in operations:
-            video_filters.append("scale=3840:2160")
+    def tuner(self):
+        if self.preset_tuner is None:
+            from integrations.encoder_preset_tuner import get_shared_tuner
+            self.preset_tuner = get_shared_tuner()
+        return self.preset_tuner
+    
+    def select_preset(self, width, height, frames, deadline_s=None, baseline="medium"):
+        """Slowest preset that meets the deadline or keeps up with the current backlog"""
+        queue_depth = self.load_probe() if self.load_probe else 0
+        if not (width and height and frames):
+            return {"preset": baseline, "reason": "unknown source geometry"}
+        choice = self.tuner().choose(width, height, frames, deadline_s, queue_depth, baseline)
+        choice["queue_depth"] = queue_depth
+        return choice
+    
+    def _run_encode(self, cmd, preset_choice, width, height, frames, timeout):
+        """Run an encode and feed its wall time back into the preset tuner"""
+        started = time.monotonic()
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        elapsed = time.monotonic() - started
+        if result.returncode == 0 and width and height and frames:
+            self.tuner().record(preset_choice["preset"], width, height, frames, elapsed)
+        return result, elapsed
+    
+    def process_video(self, input_path, output_path, operations, explain=False, preset=None, deadline_s=None):
+        """Agent processes video with specified operations
         
-        if "enhance" in operations:
-            video_filters.append("eq=brightness=0.1:contrast=1.2")
-            
-        if "stabilize" in operations:
-            video_filters.append("vidstabdetect=shakiness=5:accuracy=9")
+        With preset=None the x264 preset adapts to deadline_s and the job backlog.
+        """
+        from integrations.ffmpeg_filtergraph import FilterGraphCompiler, FilterGraphError
         
-        if "speed_2x" in operations:
-            video_filters.append("setpts=0.5*PTS")
-        elif "speed_half" in operations:
-            video_filters.append("setpts=2.0*PTS")
-            
-        if "blur_background" in operations:
-            video_filters.append("gblur=sigma=10")
-            
-        # Apply video filters
-        if video_filters:
-            cmd.extend(["-vf", ",".join(video_filters)])
+        # Source geometry lets the compiler run per-pixel filters at the smaller resolution
+        info = self.get_video_info(input_path)
+        source = {k: info.get(k) for k in ("width", "height", "fps")} if info["success"] else None
+        compiler = FilterGraphCompiler(source)
+        try:
+            plan = compiler.compile(operations)
+        except FilterGraphError as e:
+            return {"success": False, "error": str(e), "operations": operations}
+        if explain:
+            print(compiler.explain(operations))
         
-        # Audio operations
-        audio_filters = []
+        width, height = plan["output_width"], plan["output_height"]
+        frames = int(info.get("duration", 0) * (info.get("fps") or 0) * plan["frame_fraction"]) if info["success"] else 0
+        preset_choice = {"preset": preset, "reason": "requested"} if preset else \
+            self.select_preset(width, height, frames, deadline_s)
         
-        if "audio_enhance" in operations:
-            audio_filters.append("volume=1.2,highpass=f=200")
+        cmd = [self.ffmpeg, "-i", input_path]
+        if plan["video_filter"]:
+            cmd.extend(["-vf", plan["video_filter"]])
         
-        if "remove_audio" in operations:
+        if plan["remove_audio"]:
             cmd.extend(["-an"])  # No audio
-        elif audio_filters:
-            cmd.extend(["-af", ",".join(audio_filters)])
+        elif plan["audio_filter"]:
+            cmd.extend(["-af", plan["audio_filter"]])
         
         # Output settings
         cmd.extend([
             "-c:v", "libx264",  # Video codec
-            "-preset", "medium", # Encoding preset
-            "-crf", "23",       # Quality (lower = better quality)
+            "-preset", preset_choice["preset"], # Encoding preset
+            "-crf", str(plan["crf"]),  # Quality (lower = better quality)
             "-y",               # Overwrite output
             output_path
         ])
         
         try:
             print(f"🎬 Processing video: {' '.join(cmd[:10])}...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            result, elapsed = self._run_encode(cmd, preset_choice, width, height, frames, timeout=300)
             
             return {
                 "success": result.returncode == 0,
@@ -78,7 +122,10 @@ class FFmpegAgentProcessor:
                 "output": result.stdout,
                 "error": result.stderr if result.returncode != 0 else None,
                 "processed_file": output_path,
-                "operations": operations
+                "operations": operations,
+                "estimated_cost_mpx": plan["estimated_cost_mpx"],
+                "preset": preset_choice,
+                "encode_seconds": round(elapsed, 2)
             }
             
         except Exception as e:
@@ -109,28 +156,19 @@ class FFmpegAgentProcessor:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def extract_audio(self, video_path, audio_path):
-        """Agent extracts audio from video"""
-        cmd = [
-            self.ffmpeg,
-            "-i", video_path,
-            "-vn",  # No video
-            "-acodec", "copy",  # Copy audio codec
-            "-y", audio_path
-        ]
-        
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            
-            return {
-                "success": result.returncode == 0,
-                "audio_extracted": audio_path,
-                "source_video": video_path,
-                "error": result.stderr if result.returncode != 0 else None
-            }
-            
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    def extract_audio(self, video_path, audio_path, normalize=False, loudness_targets=None):
+        """Agent extracts audio from video, copying the stream when the container allows it"""
+        return self.audio_processor().extract(video_path, audio_path, normalize, loudness_targets)
+    
+    def extract_audio_batch(self, jobs, normalize=False, loudness_targets=None):
+        """Agent extracts audio from many (video_path, audio_path) pairs concurrently"""
+        return self.audio_processor().extract_batch(jobs, normalize, loudness_targets)
+    
+    def audio_processor(self):
+        if self._audio is None:
+            from integrations.audio_processor import AudioProcessor
+            self._audio = AudioProcessor(self.ffmpeg, self.ffprobe)
+        return self._audio
     
     def get_video_info(self, video_path):
         """Get detailed video information for agent analysis"""
@@ -162,6 +200,9 @@ class FFmpegAgentProcessor:
                     "video_streams": len(video_streams),
                     "audio_streams": len(audio_streams),
                     "resolution": f"{video_streams[0].get('width', 0)}x{video_streams[0].get('height', 0)}" if video_streams else "unknown",
+                    "width": video_streams[0].get("width", 0) if video_streams else 0,
+                    "height": video_streams[0].get("height", 0) if video_streams else 0,
+                    "fps": _frame_rate(video_streams[0].get("avg_frame_rate")) if video_streams else None,
                     "video_codec": video_streams[0].get("codec_name", "unknown") if video_streams else None,
                     "audio_codec": audio_streams[0].get("codec_name", "unknown") if audio_streams else None
                 }
@@ -171,41 +212,153 @@ class FFmpegAgentProcessor:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def compress_video(self, input_path, output_path, target_size_mb=None):
-        """Agent compresses video to target size or quality"""
+    def analyze_video(self, video_path, output_dir, scene_threshold=0.3, sample_interval=None,
+                      thumb_width=320, sheet_columns=4, sheet_rows=4, max_thumbnails=64):
+        """Agent analyzes a clip in one decode: scene cuts, thumbnails, contact sheet, luma stats
+        
+        Everything hangs off a single filter graph on a downscaled stream. With
+        sample_interval (seconds) only keyframes are decoded and one frame per
+        interval is analyzed, which keeps very long inputs cheap.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Header-only probe; it tells us how to space contact-sheet frames
+        info = self.get_video_info(video_path)
+        if not info["success"]:
+            return info
+        duration = info["duration"]
+        tiles = sheet_columns * sheet_rows
+        
+        with tempfile.TemporaryDirectory() as scratch:
+            luma_log = os.path.join(scratch, "luma.log")
+            scene_log = os.path.join(scratch, "scenes.log")
+            
+            sampling = ""
+            input_options = []
+            if sample_interval:
+                input_options = ["-skip_frame", "nokey"]
+                sampling = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{sample_interval})',"
+            sheet_step = duration / tiles if duration else 1
+            
+            filter_graph = (
+                f"[0:v]{sampling}scale={thumb_width}:-2,signalstats,"
+                f"metadata=print:key=lavfi.signalstats.YAVG:file={luma_log},split=2[cuts][sheet];"
+                f"[cuts]select='eq(n,0)+gt(scene,{scene_threshold})',"
+                f"metadata=print:key=lavfi.scene_score:file={scene_log}[thumbs];"
+                f"[sheet]select='isnan(prev_selected_t)+gte(t-prev_selected_t,{sheet_step})',"
+                f"tile={sheet_columns}x{sheet_rows}[contact]"
+            )
+            contact_sheet = str(output_dir / "contact_sheet.jpg")
+            thumbnail_pattern = str(output_dir / "scene_%04d.jpg")
+            
+            cmd = [
+                self.ffmpeg, "-v", "error", *input_options, "-i", video_path,
+                "-filter_complex", filter_graph,
+                "-map", "[thumbs]", "-vsync", "vfr", "-frames:v", str(max_thumbnails), "-y", thumbnail_pattern,
+                "-map", "[contact]", "-frames:v", "1", "-y", contact_sheet
+            ]
+            
+            try:
+                print(f"🔍 Analyzing video in one pass: {video_path}")
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+                if result.returncode != 0:
+                    return {"success": False, "error": result.stderr, "command": " ".join(cmd)}
+                
+                luma = _read_metadata_log(luma_log, "lavfi.signalstats.YAVG")
+                cuts = _read_metadata_log(scene_log, "lavfi.scene_score")
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+        
+        scenes = [{
+            "start": round(pts_time, 3),
+            "score": round(score, 4),
+            "thumbnail": thumbnail_pattern % (number + 1)
+        } for number, (pts_time, score) in enumerate(cuts[:max_thumbnails])]
+        luma_values = [value for _, value in luma]
+        
+        return {
+            "success": True,
+            "duration": duration,
+            "scene_count": len(scenes),
+            "scenes": scenes,
+            "scene_threshold": scene_threshold,
+            "contact_sheet": contact_sheet if os.path.exists(contact_sheet) else None,
+            "frames_analyzed": len(luma_values),
+            "sample_interval": sample_interval,
+            "luma": {
+                "mean": round(sum(luma_values) / len(luma_values), 2),
+                "min": round(min(luma_values), 2),
+                "max": round(max(luma_values), 2),
+                # Near-black or blown-out clips are worth flagging to the design agent
+                "dark_frames": sum(1 for v in luma_values if v < 32),
+                "bright_frames": sum(1 for v in luma_values if v > 224)
+            } if luma_values else None,
+            "command": " ".join(cmd)
+        }
+    
+    def package_stream(self, input_path, output_dir, formats=("hls", "dash"), ladder=None,
+                       segment_seconds=4, on_segment=None):
+        """Agent encodes a bitrate ladder straight into HLS/DASH segments and manifests"""
+        from integrations.stream_packager import StreamPackager
+        
+        info = self.get_video_info(input_path)
+        packager = StreamPackager(self.ffmpeg, segment_seconds, ladder)
+        return packager.package(
+            input_path, output_dir, formats,
+            source_height=info.get("height") if info["success"] else None,
+            has_audio=info["audio_streams"] > 0 if info["success"] else True,
+            on_segment=on_segment
+        )
+    
+    def compress_video(self, input_path, output_path, target_size_mb=None, preset=None, deadline_s=None):
+        """Agent compresses video to target size or quality
+        
+        With preset=None the x264 preset adapts to deadline_s and the job backlog,
+        never going slower than "slow".
+        """
+        info = self.get_video_info(input_path)
+        if target_size_mb and not info["success"]:
+            return info  # Return error from get_video_info
+        
+        width, height = (info.get("width"), info.get("height")) if info["success"] else (0, 0)
+        frames = int(info.get("duration", 0) * (info.get("fps") or 0)) if info["success"] else 0
+        preset_choice = {"preset": preset, "reason": "requested"} if preset else \
+            self.select_preset(width, height, frames, deadline_s, baseline="slow")
+        
         if target_size_mb:
             # Calculate bitrate for target size
-            info = self.get_video_info(input_path)
-            if info["success"]:
-                duration = info["duration"]
-                target_bitrate = int((target_size_mb * 8 * 1024 * 1024) / duration)
-                
-                cmd = [
-                    self.ffmpeg, "-i", input_path,
-                    "-b:v", f"{target_bitrate}",
-                    "-maxrate", f"{target_bitrate * 1.5}",
-                    "-bufsize", f"{target_bitrate}",
-                    "-y", output_path
-                ]
-            else:
-                return info  # Return error from get_video_info
+            duration = info["duration"]
+            target_bitrate = int((target_size_mb * 8 * 1024 * 1024) / duration)
+            
+            cmd = [
+                self.ffmpeg, "-i", input_path,
+                "-c:v", "libx264",
+                "-preset", preset_choice["preset"],
+                "-b:v", f"{target_bitrate}",
+                "-maxrate", f"{target_bitrate * 1.5}",
+                "-bufsize", f"{target_bitrate}",
+                "-y", output_path
+            ]
         else:
             # Use CRF for quality-based compression
             cmd = [
                 self.ffmpeg, "-i", input_path,
                 "-c:v", "libx264",
                 "-crf", "28",  # Higher CRF = more compression
-                "-preset", "slow",
+                "-preset", preset_choice["preset"],
                 "-y", output_path
             ]
             
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            result, elapsed = self._run_encode(cmd, preset_choice, width, height, frames, timeout=600)
             
             return {
                 "success": result.returncode == 0,
                 "compressed_file": output_path,
                 "target_size_mb": target_size_mb,
+                "preset": preset_choice,
+                "encode_seconds": round(elapsed, 2),
                 "error": result.stderr if result.returncode != 0 else None
             }
             
@@ -218,11 +371,63 @@ class VideoProcessingAgent:
         self.agent_name = agent_name
         self.processor = FFmpegAgentProcessor()
         
-    def autonomous_video_processing(self, input_video, target_format="web"):
-        """Agent processes video autonomously based on target format"""
+    def find_processed_duplicate(self, input_video, dedupe_index, target_format, radius=8):
+        """Return (keyframe hashes, earlier entry) for a near-duplicate clip already processed"""
+        from integrations.perceptual_hash_index import video_keyframe_hashes
+        keyframes = video_keyframe_hashes(input_video, method=dedupe_index.method, ffmpeg=self.processor.ffmpeg)
+        if not keyframes:
+            return keyframes, None
+        match = dedupe_index.find_duplicate(keyframes, radius, variant=target_format)
+        if match and match["output"] and os.path.exists(match["output"]):
+            return keyframes, match
+        return keyframes, None
+        
+    def autonomous_video_processing(self, input_video, target_format="web", dedupe_index=None, on_duplicate="reuse",
+                                    on_segment=None, output_dir=None):
+        """Agent processes video autonomously based on target format
+        
+        target_format="stream" writes an HLS/DASH package directory instead of
+        one MP4; on_segment is called with each segment as it is written.
+        Outputs go to output_dir (default: the working directory).
+        """
         
         print(f"🤖 {self.agent_name}: Processing {input_video}")
         
+        if target_format == "stream":
+            output_path = f"processed_stream_{Path(input_video).stem}"
+        else:
+            output_path = f"processed_{target_format}_{Path(input_video).name}"
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, output_path)
+        
+        # Skip re-encoding re-uploads and re-exports of clips we already processed
+        keyframes = None
+        if dedupe_index is not None:
+            try:
+                keyframes, match = self.find_processed_duplicate(input_video, dedupe_index, target_format)
+            except (OSError, ValueError, subprocess.SubprocessError) as e:
+                # Dedupe is an optimisation; an unhashable clip still gets the normal path
+                print(f"⚠️ {self.agent_name}: Could not fingerprint {input_video}: {e}")
+                keyframes, match = None, None
+            if match and on_duplicate == "reuse":
+                try:
+                    if os.path.isdir(match["output"]):
+                        shutil.copytree(match["output"], output_path, dirs_exist_ok=True)
+                    else:
+                        shutil.copyfile(match["output"], output_path)
+                except OSError:
+                    match = None  # Earlier output vanished since the lookup; process normally
+            if match:
+                print(f"♻️ {self.agent_name}: Near-duplicate of {match['key']}, {on_duplicate} existing output")
+                return {
+                    "success": True,
+                    "duplicate_of": match["key"],
+                    "reused_output": match["output"],
+                    "processed_file": output_path if on_duplicate == "reuse" else None,
+                    "skipped": on_duplicate != "reuse"
+                }
+        
         # Analyze video first
         info = self.processor.get_video_info(input_video)
         
@@ -253,15 +458,22 @@ class VideoProcessingAgent:
             operations = ["resize_720p", "compress"]
             
         # Process video
-        output_path = f"processed_{target_format}_{Path(input_video).name}"
-        
-        result = self.processor.process_video(input_video, output_path, operations)
+        if target_format == "stream":
+            result = self.processor.package_stream(input_video, output_path, on_segment=on_segment)
+        else:
+            result = self.processor.process_video(input_video, output_path, operations)
         
         if result["success"]:
             print(f"✅ {self.agent_name}: Video processed for {target_format}")
             
+            if keyframes:
+                dedupe_index.add(str(input_video), keyframes, output=output_path,
+                                 variant=target_format, kind="video")
+                if dedupe_index.path:
+                    dedupe_index.save()
+            
             # Get final video info
-            final_info = self.processor.get_video_info(output_path)
+            final_info = self.processor.get_video_info(output_path) if target_format != "stream" else {"success": False}
             if final_info["success"]:
                 final_size = final_info["size"] / (1024 * 1024)
                 print(f"   Final size: {final_size:.1f} MB")
@@ -272,6 +484,9 @@ class VideoProcessingAgent:
             
         return result
 
+instrument(FFmpegAgentProcessor)
+instrument(VideoProcessingAgent)
+
 # Example usage
 if __name__ == "__main__":
     processor = FFmpegAgentProcessor()
@@ -279,4 +494,5 @@ if __name__ == "__main__":
     
     print("🎬 FFmpeg Agent Integration Ready")
     print("✅ Available operations: resize, enhance, stabilize, compress, speed control")
-    print("✅ Autonomous processing for web, social, presentation, mobile formats")
\ No newline at end of file
+    print("✅ Autonomous processing for web, social, presentation, mobile, stream (HLS/DASH) formats")
+    print("✅ One-pass analysis: scene cuts, thumbnails, contact sheet, luma statistics")
\ No newline at end of file
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+FFmpeg Filter Graph Compiler - Validated, cost-ordered filters for agent operations
+Turns an agent's operation list into one filtergraph: frames are dropped
+before any work is done on them and per-pixel filters run at the lower
+of the source and output resolutions
+"""
+
+import json
+
+DEFAULT_SOURCE = {"width": 1920, "height": 1080, "fps": 30.0}
+
+RESOLUTIONS = {
+    "resize_720p": (1280, 720),
+    "resize_1080p": (1920, 1080),
+    "resize_4k": (3840, 2160)
+}
+
+SPEEDS = {
+    "speed_2x": 2.0,
+    "speed_half": 0.5
+}
+
+# Relative cost per pixel of each filter, measured against eq (=1)
+FILTER_COST = {
+    "scale": 2.0,
+    "eq": 1.0,
+    "gblur": 6.0,
+    "deshake": 15.0,
+    "setpts": 0.0,
+    "fps": 0.0
+}
+
+# Operations that may not be combined; the old command builder silently kept the first
+EXCLUSIVE_GROUPS = [
+    ("resize", set(RESOLUTIONS)),
+    ("speed", set(SPEEDS)),
+    ("audio", {"remove_audio", "audio_enhance"})
+]
+
+KNOWN_OPERATIONS = set(RESOLUTIONS) | set(SPEEDS) | {
+    "enhance", "stabilize", "blur_background", "audio_enhance", "remove_audio", "compress"
+}
+
+BLUR_SIGMA = 10  # At output resolution
+
+
+class FilterGraphError(ValueError):
+    pass
+
+
+class FilterGraphCompiler:
+    def __init__(self, source=None):
+        self.source = dict(DEFAULT_SOURCE, **{k: v for k, v in (source or {}).items() if v})
+
+    def validate(self, operations):
+        unknown = [op for op in operations if op not in KNOWN_OPERATIONS]
+        if unknown:
+            raise FilterGraphError(f"Unknown operations {unknown}; valid: {sorted(KNOWN_OPERATIONS)}")
+        for group, members in EXCLUSIVE_GROUPS:
+            chosen = [op for op in operations if op in members]
+            if len(chosen) > 1:
+                raise FilterGraphError(f"Conflicting {group} operations: {', '.join(chosen)}")
+
+    def _stages(self, operations):
+        """Ordered (filter name, expression) pairs for the video chain"""
+        source_w, source_h = self.source["width"], self.source["height"]
+        target = next((RESOLUTIONS[op] for op in operations if op in RESOLUTIONS), None)
+        output_w = target[0] if target else source_w
+        upscale = target is not None and target[0] * target[1] > source_w * source_h
+
+        stages = []
+        speed = next((SPEEDS[op] for op in operations if op in SPEEDS), None)
+        if speed:
+            stages.append(("setpts", f"setpts={1 / speed:g}*PTS"))
+            if speed > 1:
+                # Drop the surplus frames first so no later filter or the encoder sees them
+                stages.append(("fps", f"fps={self.source['fps']:g}"))
+
+        scale = ("scale", f"scale={target[0]}:{target[1]}") if target else None
+        if scale and not upscale:
+            stages.append(scale)
+
+        # Per-pixel work happens at whichever resolution is smaller
+        work_w = source_w if upscale or not target else output_w
+        if "stabilize" in operations:
+            stages.append(("deshake", "deshake"))
+        if "enhance" in operations:
+            stages.append(("eq", "eq=brightness=0.1:contrast=1.2"))
+        if "blur_background" in operations:
+            # Keep the look of sigma=10 at output size when blurring a smaller frame
+            stages.append(("gblur", f"gblur=sigma={round(BLUR_SIGMA * work_w / output_w, 2):g}"))
+
+        if scale and upscale:
+            stages.append(scale)
+        return stages
+
+    def _cost(self, stages):
+        """Cost per source frame, in eq-pixel units, with the resolution and frame rate at each stage"""
+        width, height = self.source["width"], self.source["height"]
+        frames = 1.0
+        report = []
+        for name, expression in stages:
+            if name == "fps":
+                frames /= 2.0  # Only emitted after a 2x setpts
+            cost = FILTER_COST[name] * width * height * frames
+            report.append({"filter": expression, "resolution": f"{width}x{height}",
+                           "frames_per_source_frame": frames, "cost_mpx": round(cost / 1e6, 2)})
+            if name == "scale":
+                width, height = (int(v) for v in expression.split("=", 1)[1].split(":"))
+        return report
+
+    def _naive_stages(self, operations):
+        """The fixed order process_video used before, for the explain comparison"""
+        stages = []
+        target = next((RESOLUTIONS[op] for op in operations if op in RESOLUTIONS), None)
+        if target:
+            stages.append(("scale", f"scale={target[0]}:{target[1]}"))
+        if "enhance" in operations:
+            stages.append(("eq", "eq=brightness=0.1:contrast=1.2"))
+        if "stabilize" in operations:
+            stages.append(("deshake", "deshake"))
+        speed = next((SPEEDS[op] for op in operations if op in SPEEDS), None)
+        if speed:
+            stages.append(("setpts", f"setpts={1 / speed:g}*PTS"))
+        if "blur_background" in operations:
+            stages.append(("gblur", f"gblur=sigma={BLUR_SIGMA}"))
+        return stages
+
+    def compile(self, operations):
+        """Validate `operations` and return the filters and encoder arguments to run"""
+        self.validate(operations)
+        stages = self._stages(operations)
+        report = self._cost(stages)
+
+        audio_filters = []
+        speed = next((SPEEDS[op] for op in operations if op in SPEEDS), None)
+        if speed:
+            audio_filters.append(f"atempo={speed:g}")  # Keep audio in sync with the new timing
+        if "audio_enhance" in operations:
+            audio_filters.append("volume=1.2,highpass=f=200")
+
+        naive_cost = sum(s["cost_mpx"] for s in self._cost(self._naive_stages(operations)))
+        total = sum(s["cost_mpx"] for s in report)
+        target = next((RESOLUTIONS[op] for op in operations if op in RESOLUTIONS), None)
+        output_w, output_h = target or (self.source["width"], self.source["height"])
+        return {
+            "video_filter": ",".join(expression for _, expression in stages) or None,
+            "audio_filter": ",".join(audio_filters) or None,
+            "remove_audio": "remove_audio" in operations,
+            "crf": 28 if "compress" in operations else 23,
+            "stages": report,
+            "estimated_cost_mpx": round(total, 2),
+            "naive_cost_mpx": round(naive_cost, 2),
+            # What the encoder sees, for preset selection
+            "output_width": output_w,
+            "output_height": output_h,
+            "frame_fraction": 1 / speed if speed and speed > 1 else 1.0
+        }
+
+    def explain(self, operations):
+        """Human-readable plan with estimated per-frame cost"""
+        plan = self.compile(operations)
+        lines = [f"Source {self.source['width']}x{self.source['height']} @ {self.source['fps']:g} fps",
+                 f"{'filter':<36} {'resolution':>11} {'frames':>7} {'cost (Mpx)':>11}"]
+        for stage in plan["stages"]:
+            lines.append(f"{stage['filter']:<36} {stage['resolution']:>11} "
+                         f"{stage['frames_per_source_frame']:>7.2f} {stage['cost_mpx']:>11.2f}")
+        lines.append(f"Estimated filter cost per source frame: {plan['estimated_cost_mpx']} Mpx "
+                     f"(fixed order: {plan['naive_cost_mpx']} Mpx)")
+        if plan["audio_filter"]:
+            lines.append(f"Audio: {plan['audio_filter']}")
+        return "\n".join(lines)
+
+
+# Example usage
+if __name__ == "__main__":
+    compiler = FilterGraphCompiler({"width": 1280, "height": 720, "fps": 30})
+    operations = ["resize_4k", "enhance", "blur_background", "speed_2x"]
+    print("🧮 Filter graph plan")
+    print(compiler.explain(operations))
+    print(json.dumps({k: v for k, v in compiler.compile(operations).items() if k != "stages"}, indent=2))
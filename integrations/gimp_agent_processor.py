@@ -4,42 +4,109 @@ GIMP Integration for Agents - Professional Image Processing
 Agents control GIMP for complex image editing tasks
 """
 
+import contextlib
+import shutil
 import subprocess
 import os
 import tempfile
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from integrations.xvfb_display_pool import get_shared_pool
+from integrations.tracing import instrument
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif"}
+GIMP_PYTHON_PATHS = ["/usr/lib/gimp/2.0/python", "/usr/lib/x86_64-linux-gnu/gimp/2.0/python"]
+
+_gimp_python = None
+
+
+def gimp_python_available():
+    """Whether GIMP's Python-Fu modules import; probed once per process, not per image"""
+    global _gimp_python
+    if _gimp_python is None:
+        probe = f"import sys; sys.path.extend({GIMP_PYTHON_PATHS!r}); import gimpfu"
+        try:
+            _gimp_python = subprocess.run(["python3", "-c", probe], capture_output=True, timeout=30).returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            _gimp_python = False
+    return _gimp_python
+
 class GimpAgentProcessor:
-    def __init__(self):
+    def __init__(self, display_pool=None, memory_budget_mb=None):
         self.gimp_command = "gimp"
-        self.display = ":99"  # Virtual display for headless operation
+        self.display_pool = display_pool  # Virtual displays for headless operation
+        self.memory_budget_mb = memory_budget_mb  # Tile images whose pixels exceed this
         
     def setup_virtual_display(self):
-        """Set up virtual display for headless GIMP operation"""
-        os.environ['DISPLAY'] = self.display
+        """Start the shared virtual display pool once; None when Xvfb is unavailable"""
+        if self.display_pool is None:
+            self.display_pool = get_shared_pool()
+        return self.display_pool
+    
+    def needs_tiling(self, input_path):
+        """True when the decoded image would not fit the memory budget"""
+        if not self.memory_budget_mb:
+            return False
+        from integrations.tiled_image_processor import image_dimensions
+        try:
+            width, height = image_dimensions(input_path)
+        except Exception:
+            return False
+        return width * height * 3 > self.memory_budget_mb * 1024 * 1024
+    
+    def process_image_tiled(self, input_path, output_path, operations):
+        """Process in overlapping tiles so peak memory stays within the budget"""
+        from integrations.tiled_image_processor import TiledImageProcessor
+        return TiledImageProcessor(self.memory_budget_mb or 256).process_image(input_path, output_path, operations)
+    
+    def process_and_encode(self, input_path, output_path, operations, encode_options, tiled=None):
+        """Process to a lossless intermediate, then run the size-targeted encoder"""
+        from integrations.image_encoder import SizeTargetedEncoder
         
-        # Start Xvfb if not running
         try:
-            subprocess.run(f"pgrep Xvfb || Xvfb {self.display} -screen 0 1024x768x24 &", 
-                         shell=True, check=True)
-            print(f"✅ Virtual display setup: {self.display}")
-        except:
-            print("Virtual display setup - may already be running")
+            encoder = SizeTargetedEncoder.from_options(encode_options)
+        except (TypeError, ValueError) as e:
+            return {"success": False, "error": f"Invalid encode_options: {e}"}
+        
+        with tempfile.TemporaryDirectory() as scratch:
+            intermediate = os.path.join(scratch, Path(output_path).stem + ".png")
+            result = self.process_image(input_path, intermediate, operations, tiled)
+            if not result["success"]:
+                return result
+            encoding = encoder.encode_file(
+                intermediate, output_path, baseline_extension=Path(output_path).suffix or ".png"
+            )
+        
+        result["success"] = encoding["success"]
+        result["processed_file"] = encoding.get("encoded_file")
+        result["encoding"] = encoding
+        if not encoding["success"]:
+            result["error"] = encoding["error"]
+        return result
     
-    def process_image(self, input_path, output_path, operations):
+    def process_image(self, input_path, output_path, operations, tiled=None, encode_options=None):
         """Agent processes image using GIMP with specified operations"""
         
+        if encode_options:
+            return self.process_and_encode(input_path, output_path, operations, encode_options, tiled)
+        
+        # Gigapixel inputs skip GIMP and the whole-image OpenCV fallback
+        if tiled or (tiled is None and self.needs_tiling(input_path)):
+            return self.process_image_tiled(input_path, output_path, operations)
+        
+        # Without GIMP, process here instead of paying a Python + cv2 start-up per image
+        if not gimp_python_available():
+            return self.process_image_opencv(input_path, output_path, operations)
+        
         # GIMP script template
         gimp_script = f'''
 import os
 import sys
 
 # Add GIMP Python path
-gimp_python_paths = [
-    "/usr/lib/gimp/2.0/python",
-    "/usr/lib/x86_64-linux-gnu/gimp/2.0/python"
-]
+gimp_python_paths = {GIMP_PYTHON_PATHS!r}
 
 for path in gimp_python_paths:
     if os.path.exists(path) and path not in sys.path:
@@ -76,10 +143,10 @@ except ImportError as e:
     img = cv2.imread("{input_path}")
     
     if "auto_level" in {operations}:
-        img = cv2.convertScaleAbs(img, alpha=1.2, beta=10)
+        img = cv2.convertScaleAbs(img, dst=img, alpha=1.2, beta=10)
     
     if "enhance_color" in {operations}:
-        img = cv2.convertScaleAbs(img, alpha=1.1, beta=0)
+        img = cv2.convertScaleAbs(img, dst=img, alpha=1.1, beta=0)
         
     if "sharpen" in {operations}:
         kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
@@ -95,11 +162,14 @@ except ImportError as e:
             script_path = f.name
             
         try:
-            self.setup_virtual_display()
+            pool = self.setup_virtual_display()
+            display_slot = pool.acquire() if pool else contextlib.nullcontext(os.environ.get("DISPLAY"))
             
-            # Execute the processing script
+            # Execute the processing script on a display no other job is using
             cmd = ["python3", script_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            with display_slot as display:
+                env = dict(os.environ, DISPLAY=display) if display else None
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, env=env)
             
             # Clean up
             os.unlink(script_path)
@@ -110,7 +180,7 @@ except ImportError as e:
                 "error": result.stderr if result.returncode != 0 else None,
                 "processed_file": output_path,
                 "operations_applied": operations,
-                "processor": "GIMP" if "GIMP" in result.stdout else "OpenCV"
+                "processor": "GIMP" if "processed successfully with GIMP" in result.stdout else "OpenCV"
             }
             
         except Exception as e:
@@ -118,7 +188,26 @@ except ImportError as e:
                 os.unlink(script_path)
             return {"success": False, "error": str(e)}
     
-    def create_design_template(self, template_type, output_path):
+    def process_image_opencv(self, input_path, output_path, operations):
+        """In-process OpenCV equivalents of the GIMP operations"""
+        from integrations.tiled_image_processor import apply_operations, cv2
+        try:
+            img = cv2.imread(str(input_path))
+            if img is None:
+                return {"success": False, "error": f"Could not read image: {input_path}"}
+            ok = cv2.imwrite(str(output_path), apply_operations(img, operations))
+            return {
+                "success": bool(ok),
+                "output": "Image processed with OpenCV",
+                "error": None if ok else f"Could not write image: {output_path}",
+                "processed_file": output_path,
+                "operations_applied": operations,
+                "processor": "OpenCV"
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def create_design_template(self, template_type, output_path, encode_options=None):
         """Agent creates design templates using OpenCV (more reliable than GIMP for templates)"""
         templates = {
             "social_media": {"width": 1080, "height": 1080, "bg": "#f8f9fa"},
@@ -152,48 +241,176 @@ except ImportError as e:
             cv2.rectangle(img, (100, 100), (width-100, height-100), text_area_color, -1)
             
             # Save template
-            cv2.imwrite(output_path, img)
+            encoding = None
+            if encode_options:
+                from integrations.image_encoder import SizeTargetedEncoder
+                encoding = SizeTargetedEncoder.from_options(encode_options).write(img, output_path)
+                if not encoding["success"]:
+                    return {"success": False, "error": encoding["error"]}
+                output_path = encoding["encoded_file"]
+            else:
+                cv2.imwrite(output_path, img)
             
             return {
                 "success": True,
                 "template_created": output_path,
                 "type": template_type,
                 "dimensions": f"{width}x{height}",
-                "background": config["bg"]
+                "background": config["bg"],
+                "encoding": encoding
             }
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def batch_process_images(self, input_dir, output_dir, operations):
-        """Agent processes multiple images in batch"""
+    def find_processed_duplicate(self, image_file, dedupe_index, variant, radius=6):
+        """Return (hash, earlier entry) for a near-duplicate already processed the same way"""
+        from integrations.perceptual_hash_index import image_hash
+        image_fingerprint = image_hash(image_file, dedupe_index.method)
+        match = dedupe_index.find_duplicate(image_fingerprint, radius, variant=variant)
+        if match and match["output"] and os.path.exists(match["output"]):
+            return image_fingerprint, match
+        return image_fingerprint, None
+    
+    def process_batch_shared_memory(self, jobs, operations, encode_options=None, workers=None):
+        """Process (input, output) pairs in worker processes fed through a shared-memory frame ring"""
+        from integrations.shared_frame_ring import OVERSIZED_ERROR, process_batch_shared_memory
+        
+        write_output = None
+        if encode_options:
+            from integrations.image_encoder import SizeTargetedEncoder
+            encoder = SizeTargetedEncoder.from_options(encode_options)
+            
+            def write_output(frame, output_file):
+                # Encode straight from the shared-memory view; no intermediate file
+                encoding = encoder.write(frame, output_file)
+                return {"success": encoding["success"], "processed_file": encoding.get("encoded_file"),
+                        "encoding": encoding, "error": encoding.get("error")}
+        
+        # Images over the memory budget are never decoded whole; they take the tiled path
+        tiled = {index for index, (input_file, _) in enumerate(jobs) if self.needs_tiling(input_file)}
+        shm_jobs = [job for index, job in enumerate(jobs) if index not in tiled]
+        shm_results = iter(process_batch_shared_memory(shm_jobs, operations, workers=workers,
+                                                       write_output=write_output))
+        
         results = []
+        for index, (input_file, output_file) in enumerate(jobs):
+            result = None if index in tiled else next(shm_results)
+            if result is None or result.get("error") == OVERSIZED_ERROR:
+                result = self.process_image(str(input_file), str(output_file), operations,
+                                            encode_options=encode_options)
+            results.append(result)
+        return results
+    
+    def batch_process_images(self, input_dir, output_dir, operations, encode_options=None, workers=None,
+                             dedupe_index=None, on_duplicate="reuse", transport="files"):
+        """Agent processes multiple images in batch
+        
+        transport="files" runs one GIMP job per image; transport="shm" decodes once
+        and moves pixels to OpenCV worker processes through shared memory.
+        """
+        # Bad options would otherwise fail every image, or abort the pool mid-batch
+        if encode_options:
+            from integrations.image_encoder import SizeTargetedEncoder
+            try:
+                SizeTargetedEncoder.from_options(encode_options)
+            except (TypeError, ValueError) as e:
+                return {"success": False, "error": f"Invalid encode_options: {e}"}
         
         input_path = Path(input_dir)
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        # Process all images in directory
-        for image_file in input_path.glob("*.{jpg,jpeg,png,gif}"):
+        image_files = sorted(p for p in input_path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        
+        # Near-duplicates only count if they were processed with the same settings
+        variant = json.dumps({"operations": sorted(operations), "encode": encode_options}, sort_keys=True)
+        
+        results = [None] * len(image_files)
+        pending = []  # (position, image_file, output_file, fingerprint)
+        
+        # The encoder and the reuse path swap the suffix, so a.jpg and a.png would both
+        # land on out/a.<ext>; keep the source extension in the stem for shared stems
+        stem_counts = {}
+        for image_file in image_files:
+            stem_counts[image_file.stem.lower()] = stem_counts.get(image_file.stem.lower(), 0) + 1
+        
+        for position, image_file in enumerate(image_files):
             output_file = output_path / image_file.name
+            if stem_counts[image_file.stem.lower()] > 1:
+                output_file = output_path / f"{image_file.stem}_{image_file.suffix.lstrip('.').lower()}{image_file.suffix}"
             
-            result = self.process_image(
-                str(image_file), 
-                str(output_file), 
-                operations
-            )
-            
-            results.append({
+            fingerprint = None
+            if dedupe_index is not None:
+                # One unreadable file fails its own entry, not the whole batch
+                try:
+                    fingerprint, match = self.find_processed_duplicate(image_file, dedupe_index, variant)
+                except (OSError, ValueError) as e:
+                    results[position] = {"input": str(image_file), "output": None,
+                                         "result": {"success": False, "error": str(e)}}
+                    continue
+                reused = None
+                if match and on_duplicate == "reuse":
+                    reused = str(output_file.with_suffix(Path(match["output"]).suffix))
+                    try:
+                        shutil.copyfile(match["output"], reused)
+                    except OSError:
+                        match = None  # Earlier output vanished since the lookup; process normally
+                if match:
+                    results[position] = {
+                        "input": str(image_file),
+                        "output": reused,
+                        "result": {"success": True, "duplicate_of": match["key"], "skipped": reused is None,
+                                   "reused_output": match["output"], "hamming_distance": match["mean_distance"]}
+                    }
+                    continue
+            pending.append((position, image_file, output_file, fingerprint))
+        
+        processed = None
+        if transport == "shm" and pending:
+            from integrations.shared_frame_ring import SharedMemoryUnavailable
+            jobs = [(str(image_file), str(output_file)) for _, image_file, output_file, _ in pending]
+            try:
+                processed = self.process_batch_shared_memory(jobs, operations, encode_options, workers)
+            except SharedMemoryUnavailable as e:
+                print(f"⚠️ {e}; falling back to transport='files'")
+                transport = "files"
+        if processed is None:
+            # Each job runs in its own subprocess on its own display, so threads suffice
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as pool:
+                processed = list(pool.map(
+                    lambda job: self.process_image(str(job[1]), str(job[2]), operations,
+                                                   encode_options=encode_options),
+                    pending
+                ))
+        
+        for (position, image_file, output_file, fingerprint), result in zip(pending, processed):
+            if fingerprint is not None and result["success"]:
+                dedupe_index.add(str(image_file), fingerprint, output=result.get("processed_file") or str(output_file),
+                                 variant=variant)
+            results[position] = {
                 "input": str(image_file),
-                "output": str(output_file),
+                "output": result.get("processed_file") or str(output_file),
                 "result": result
-            })
+            }
             
-        return {
+        summary = {
             "success": True,
             "processed_count": len(results),
+            "transport": transport,
             "results": results
         }
+        if dedupe_index is not None:
+            summary["duplicates_found"] = sum(1 for r in results if r["result"].get("duplicate_of"))
+            if dedupe_index.path:
+                dedupe_index.save()
+        if encode_options:
+            summary["bytes_saved"] = sum(
+                (r["result"].get("encoding") or {}).get("bytes_saved") or 0 for r in results
+            )
+        return summary
+
+instrument(GimpAgentProcessor)
 
 # Example usage
 if __name__ == "__main__":
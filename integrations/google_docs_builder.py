@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Google Docs Builder - Structured documents in a few size-bounded batchUpdates
+Headings, paragraphs, bullet lists, tables, images and page breaks are laid
+out with locally computed indexes: content is only ever appended, so every
+index stays valid and all formatting is sent after the text it applies to
+"""
+
+import json
+
+# Docs has no published per-call request cap; these keep each call well under
+# the payload limit and its latency predictable
+MAX_BATCH_REQUESTS = 500
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+MAX_INSERT_CHARS = 100_000
+
+BULLET_PRESETS = {False: "BULLET_DISC_CIRCLE_SQUARE", True: "NUMBERED_DECIMAL_ALPHA_ROMAN"}
+TEXT_STYLE_KEYS = ("bold", "italic", "underline", "link")
+
+
+def _units(text):
+    """Docs indexes count UTF-16 code units, so astral characters take two"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _clean(text):
+    return str(text).replace("\r\n", "\n").replace("\r", "\n")
+
+
+class DocumentBuilder:
+    """Lay out structured content and turn it into batchUpdate requests.
+
+    Blocks are dicts such as {"type": "heading", "text": ..., "level": 1},
+    {"type": "paragraph", "text": ...} (text may be a list of runs like
+    {"text": ..., "bold": True, "link": url}), {"type": "bullets", "items": [...],
+    "numbered": False}, {"type": "table", "rows": [[...]], "header": True},
+    {"type": "image", "uri": ..., "width": pt, "height": pt} and
+    {"type": "page_break"}. A bare string is a paragraph.
+    """
+
+    def __init__(self, start_index=1, max_batch_requests=MAX_BATCH_REQUESTS,
+                 max_batch_bytes=MAX_BATCH_BYTES, max_insert_chars=MAX_INSERT_CHARS):
+        self.index = start_index          # Where the next content goes, before the body's final newline
+        self.max_batch_requests = max_batch_requests
+        self.max_batch_bytes = max_batch_bytes
+        self.max_insert_chars = max_insert_chars
+        self.content = []                 # Inserts, in document order
+        self.styles = []                  # Formatting, sent once all text exists
+        self.pending = []                 # Text waiting to be inserted as one run
+        self.pending_start = start_index
+        self.bullet_run = None            # (numbered, start, end) of consecutive list items
+
+    # ---- blocks ----------------------------------------------------------
+
+    def add(self, block):
+        if isinstance(block, str):
+            return self.paragraph(block)
+        kind = block.get("type", "paragraph")
+        if kind == "heading":
+            return self.heading(block["text"], block.get("level", 1))
+        if kind == "paragraph":
+            return self.paragraph(block.get("text", ""))
+        if kind == "bullets":
+            return self.bullets(block.get("items", []), block.get("numbered", False))
+        if kind == "table":
+            return self.table(block.get("rows", []), block.get("header", True))
+        if kind == "image":
+            return self.image(block["uri"], block.get("width"), block.get("height"))
+        if kind == "page_break":
+            return self.page_break()
+        raise ValueError(f"Unknown block type: {kind}")
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.add(block)
+        return self
+
+    def heading(self, text, level=1):
+        start, end = self._paragraph_text(text)
+        style = "TITLE" if level == 0 else f"HEADING_{min(max(int(level), 1), 6)}"
+        self.styles.append({"updateParagraphStyle": {
+            "range": {"startIndex": start, "endIndex": end},
+            "paragraphStyle": {"namedStyleType": style},
+            "fields": "namedStyleType"
+        }})
+        return self
+
+    def paragraph(self, text):
+        if isinstance(text, list):
+            self._paragraph_text(text)
+        else:
+            for line in _clean(text).split("\n"):
+                self._paragraph_text(line)
+        return self
+
+    def bullets(self, items, numbered=False):
+        for item in items:
+            start, end = self._paragraph_text(item)
+            if self.bullet_run and self.bullet_run[0] == numbered and self.bullet_run[2] == start:
+                self.bullet_run[2] = end
+            else:
+                self._close_bullets()
+                self.bullet_run = [numbered, start, end]
+        self._close_bullets()
+        return self
+
+    def table(self, rows, header=True):
+        rows = [[_clean(cell) for cell in row] for row in rows if row]
+        if not rows:
+            return self
+        columns = max(len(row) for row in rows)
+        rows = [row + [""] * (columns - len(row)) for row in rows]
+        self._flush_text()
+
+        # insertTable adds a newline first, so the table element starts one past the location
+        table_start = self.index + 1
+        self.content.append({"insertTable": {"rows": len(rows), "columns": columns,
+                                              "location": {"index": self.index}}})
+        row_size = 2 * columns + 1
+
+        def cell_index(i, j):
+            return table_start + 3 + i * row_size + 2 * j
+
+        # Filling from the last cell backwards keeps every earlier index valid
+        for i in reversed(range(len(rows))):
+            for j in reversed(range(columns)):
+                if rows[i][j]:
+                    self.content.append({"insertText": {"location": {"index": cell_index(i, j)},
+                                                        "text": rows[i][j]}})
+
+        # Final positions once every cell before this one has been filled
+        shift = 0
+        for i, row in enumerate(rows):
+            for j, text in enumerate(row):
+                length = _units(text)
+                if header and i == 0 and length:
+                    start = cell_index(i, j) + shift
+                    self.styles.append(self._text_style(start, start + length, {"bold": True}))
+                shift += length
+
+        self.index = table_start + 1 + len(rows) * row_size + shift
+        self.pending_start = self.index
+        return self
+
+    def image(self, uri, width=None, height=None):
+        self._flush_text()
+        request = {"location": {"index": self.index}, "uri": uri}
+        if width and height:
+            request["objectSize"] = {"width": {"magnitude": width, "unit": "PT"},
+                                     "height": {"magnitude": height, "unit": "PT"}}
+        self.content.append({"insertInlineImage": request})
+        self.index += 1
+        self.pending_start = self.index
+        self._paragraph_text("")  # End the image's paragraph
+        return self
+
+    def page_break(self):
+        self._flush_text()
+        self.content.append({"insertPageBreak": {"location": {"index": self.index}}})
+        self.index += 2  # The break plus the newline Docs adds after it
+        self.pending_start = self.index
+        return self
+
+    # ---- text layout -----------------------------------------------------
+
+    def _paragraph_text(self, text):
+        """Queue one paragraph; returns its [start, end) range including the newline"""
+        runs = text if isinstance(text, list) else [{"text": text}]
+        start = self.index
+        for run in runs:
+            if isinstance(run, str):
+                run = {"text": run}
+            chunk = _clean(run.get("text", "")).replace("\n", " ")
+            length = _units(chunk)
+            style = {key: run[key] for key in TEXT_STYLE_KEYS if run.get(key)}
+            if style and length:
+                self.styles.append(self._text_style(self.index, self.index + length, style))
+            self.pending.append(chunk)
+            self.index += length
+        self.pending.append("\n")
+        self.index += 1
+        return start, self.index
+
+    def _close_bullets(self):
+        if self.bullet_run:
+            numbered, start, end = self.bullet_run
+            self.styles.append({"createParagraphBullets": {
+                "range": {"startIndex": start, "endIndex": end},
+                "bulletPreset": BULLET_PRESETS[numbered]
+            }})
+            self.bullet_run = None
+
+    def _flush_text(self):
+        """Insert queued paragraphs as as few insertText requests as the size cap allows"""
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        position = self.pending_start
+        for offset in range(0, len(text), self.max_insert_chars):
+            chunk = text[offset:offset + self.max_insert_chars]  # Code points, so pairs never split
+            self.content.append({"insertText": {"location": {"index": position}, "text": chunk}})
+            position += _units(chunk)
+        self.pending_start = self.index
+
+    @staticmethod
+    def _text_style(start, end, style):
+        text_style = {}
+        for key in ("bold", "italic", "underline"):
+            if key in style:
+                text_style[key] = bool(style[key])
+        if style.get("link"):
+            text_style["link"] = {"url": style["link"]}
+        return {"updateTextStyle": {
+            "range": {"startIndex": start, "endIndex": end},
+            "textStyle": text_style,
+            "fields": ",".join(sorted(text_style))
+        }}
+
+    # ---- output ----------------------------------------------------------
+
+    def requests(self):
+        self._flush_text()
+        self._close_bullets()
+        return self.content + self.styles
+
+    def batches(self):
+        """Split requests into ordered batchUpdate bodies under the count and byte caps"""
+        batches, current, size = [], [], 0
+        for request in self.requests():
+            request_size = len(json.dumps(request))
+            if current and (len(current) >= self.max_batch_requests or size + request_size > self.max_batch_bytes):
+                batches.append(current)
+                current, size = [], 0
+            current.append(request)
+            size += request_size
+        if current:
+            batches.append(current)
+        return batches
+
+    def apply(self, docs_service, document_id, execute=None):
+        """Send every batch in order; `execute(request, idempotent)` wraps each API call (e.g. for retries)"""
+        execute = execute or (lambda request, idempotent=True: request.execute())
+        batches = self.batches()
+        for batch in batches:
+            # Inserts are positional: a batch applied twice duplicates its text
+            execute(docs_service.documents().batchUpdate(documentId=document_id, body={"requests": batch}),
+                    idempotent=False)
+        return {"batch_calls": len(batches), "requests_sent": sum(len(b) for b in batches),
+                "end_index": self.index}
+
+
+def build_document_requests(blocks, **limits):
+    """Batches for structured `blocks` appended to an empty document"""
+    return DocumentBuilder(**limits).extend(blocks).batches()
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    blocks = [{"type": "heading", "text": "Quarterly Agent Report", "level": 0}]
+    for page in range(200):
+        blocks += [
+            {"type": "heading", "text": f"Section {page + 1}", "level": 1},
+            {"type": "paragraph", "text": [{"text": "Summary: ", "bold": True},
+                                           {"text": "Agents processed assets without incident. " * 20}]},
+            {"type": "bullets", "items": ["Videos encoded", "Images processed", "Reports published"]},
+            {"type": "table", "rows": [["Agent", "Jobs", "Failures"], ["video_processor", "120", "2"],
+                                       ["image_editor", "340", "0"]]},
+            {"type": "page_break"}
+        ]
+
+    start = time.perf_counter()
+    builder = DocumentBuilder().extend(blocks)
+    batches = builder.batches()
+    print("📄 Google Docs Builder Ready")
+    print(f"📦 200 pages -> {sum(len(b) for b in batches)} requests in {len(batches)} batchUpdate calls "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms to lay out)")
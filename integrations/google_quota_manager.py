@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Google Quota Manager - Host-wide request budgets and retries for Google APIs
+Token buckets in a shared SQLite file keep every agent process on this host
+inside each API's per-user quota, waiting callers are served round-robin by
+agent, and transient errors (429, 5xx, rate-limit 403s) are retried with
+jittered exponential backoff. Time spent throttled is reported per agent.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from agents.agent_metrics import REGISTRY
+
+# Requests per second and burst per API, under Google's default per-user quotas
+# (Docs and Sheets: 60 write requests per minute; Drive is far more generous)
+DEFAULT_BUDGETS = {
+    "docs": {"rate": 1.0, "burst": 10},
+    "sheets": {"rate": 1.0, "burst": 10},
+    "drive": {"rate": 10.0, "burst": 20}
+}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    api TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+THROTTLE_SECONDS = REGISTRY.counter("google_api_throttle_seconds_total",
+                                    "Seconds Google API calls waited for quota or backoff", ("agent", "api"))
+API_RETRIES = REGISTRY.counter("google_api_retries_total", "Google API calls retried after transient errors",
+                               ("agent", "api", "status"))
+
+_calling_agent = contextvars.ContextVar("google_quota_agent", default=None)
+
+
+@contextlib.contextmanager
+def acting_as(agent):
+    """Attribute Google API calls made inside the block to `agent`"""
+    token = _calling_agent.set(agent)
+    try:
+        yield
+    finally:
+        _calling_agent.reset(token)
+
+
+def error_status(error):
+    """(HTTP status, reason) from a googleapiclient HttpError, or (None, None)"""
+    resp = getattr(error, "resp", None)
+    status = getattr(resp, "status", None) or getattr(error, "status_code", None)
+    reason = None
+    content = getattr(error, "content", None)
+    if content:
+        try:
+            details = json.loads(content.decode() if isinstance(content, bytes) else content)["error"]
+            reason = (details.get("errors") or [{}])[0].get("reason") or details.get("status")
+        except (ValueError, KeyError, TypeError, AttributeError, IndexError):
+            pass
+    return (int(status) if status else None), reason
+
+
+def is_retryable(error, idempotent=True):
+    """Whether to resend a failed call. Non-idempotent calls (creates, inserts) are only
+    retried on rate-limit rejections, which the server guarantees were not applied"""
+    status, reason = error_status(error)
+    rate_limited = status == 429 or (status == 403 and reason in RATE_LIMIT_REASONS)
+    if not idempotent:
+        return rate_limited
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return status in RETRYABLE_STATUS or rate_limited
+
+
+def _retry_after(error):
+    resp = getattr(error, "resp", None)
+    try:
+        return float(resp.get("retry-after")) if resp is not None and resp.get("retry-after") else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class TokenBucketStore:
+    """Token buckets shared by every process that opens the same database file"""
+
+    def __init__(self, db_path, budgets):
+        self.budgets = budgets
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False, timeout=30.0)
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def take(self, api, cost=1.0):
+        """Take `cost` tokens if available; otherwise return seconds until they will be"""
+        budget = self.budgets.get(api)
+        if budget is None:
+            return 0.0
+        rate, burst = budget["rate"], budget["burst"]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self.conn.execute("SELECT tokens, updated_at FROM buckets WHERE api = ?", (api,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                wait = 0.0
+                if tokens >= cost:
+                    tokens -= cost
+                else:
+                    wait = (cost - tokens) / rate
+                self.conn.execute("INSERT OR REPLACE INTO buckets (api, tokens, updated_at) VALUES (?, ?, ?)",
+                                  (api, tokens, now))
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return wait
+
+    def drain(self, api):
+        """Empty a bucket after the server says we are over quota"""
+        with self.lock:
+            self.conn.execute("UPDATE buckets SET tokens = 0, updated_at = ? WHERE api = ?", (time.time(), api))
+
+
+class _FairGate:
+    """Round-robin turns across agents; one caller per API waits on the bucket at a time"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.waiting = {}        # agent -> deque of tickets
+        self.turns = deque()     # agents with waiting tickets, in service order
+        self.busy = False
+
+    def enter(self, agent):
+        ticket = object()
+        with self.cond:
+            if agent not in self.waiting:
+                self.waiting[agent] = deque()
+                self.turns.append(agent)
+            self.waiting[agent].append(ticket)
+            while self.busy or self.waiting[self.turns[0]][0] is not ticket:
+                self.cond.wait()
+            self.busy = True
+
+    def leave(self, agent):
+        with self.cond:
+            queue = self.waiting[agent]
+            queue.popleft()
+            self.turns.remove(agent)
+            if queue:
+                self.turns.append(agent)  # Back of the line behind other agents
+            else:
+                del self.waiting[agent]
+            self.busy = False
+            self.cond.notify_all()
+
+
+class GoogleQuotaManager:
+    def __init__(self, db_path="google_quota.db", budgets=None, max_retries=6, base_delay=0.5,
+                 max_delay=32.0, sleep=time.sleep):
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.buckets = TokenBucketStore(db_path, self.budgets)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.gates = {api: _FairGate() for api in self.budgets}
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+
+    def _stat(self, agent, **increments):
+        with self.stats_lock:
+            entry = self.stats.setdefault(agent, {"calls": 0, "retries": 0, "failures": 0,
+                                                  "throttled_seconds": 0.0})
+            for key, value in increments.items():
+                entry[key] += value
+
+    def acquire(self, api, agent):
+        """Block until `agent` may send one request to `api`; returns seconds waited"""
+        gate = self.gates.get(api)
+        if gate is None:
+            return 0.0
+        started = time.monotonic()
+        gate.enter(agent)
+        try:
+            while True:
+                wait = self.buckets.take(api)
+                if wait <= 0:
+                    break
+                self.sleep(wait)
+        finally:
+            gate.leave(agent)
+        return time.monotonic() - started
+
+    def backoff(self, attempt, error=None):
+        """Full-jitter exponential backoff, never shorter than a server Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = _retry_after(error) if error is not None else None
+        return max(delay, retry_after or 0.0)
+
+    def execute(self, request, api, agent=None, idempotent=True):
+        """Run `request.execute()` inside the API's budget, retrying transient failures.
+
+        Pass idempotent=False for calls that must not be applied twice (creates,
+        text inserts); those are only retried when rate-limited.
+        """
+        agent = agent or _calling_agent.get() or "default"
+        throttled = 0.0
+        attempt = 0
+        try:
+            while True:
+                throttled += self.acquire(api, agent)
+                try:
+                    result = request.execute()
+                    self._stat(agent, calls=1)
+                    return result
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e, idempotent):
+                        self._stat(agent, calls=1, failures=1)
+                        raise
+                    status, _ = error_status(e)
+                    if status in (429, 403):
+                        self.buckets.drain(api)  # Other agents on this host back off too
+                    delay = self.backoff(attempt, e)
+                    self._stat(agent, retries=1)
+                    API_RETRIES.inc(agent=agent, api=api, status=status or "network")
+                    self.sleep(delay)
+                    throttled += delay
+                    attempt += 1
+        finally:
+            if throttled:
+                self._stat(agent, throttled_seconds=throttled)
+                THROTTLE_SECONDS.inc(throttled, agent=agent, api=api)
+
+    def throttle_stats(self):
+        with self.stats_lock:
+            return {agent: dict(entry, throttled_seconds=round(entry["throttled_seconds"], 3))
+                    for agent, entry in self.stats.items()}
+
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_quota_manager():
+    """Process-wide manager backed by AGENT_GOOGLE_QUOTA_DB (default google_quota.db)"""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = GoogleQuotaManager(os.environ.get("AGENT_GOOGLE_QUOTA_DB", "google_quota.db"))
+        return _shared_manager
+
+
+# ---- local fakes ---------------------------------------------------------
+
+class FakeResponse(dict):
+    """Header mapping with a .status, shaped like httplib2.Response"""
+
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    """Same resp/content shape as googleapiclient.errors.HttpError"""
+
+    def __init__(self, status, reason=None, retry_after=None):
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.resp = FakeResponse(status, headers)
+        self.content = json.dumps({"error": {"code": status, "errors": [{"reason": reason or "backendError"}]}}).encode()
+        super().__init__(f"HTTP {status} {reason or ''}".strip())
+
+
+class FakeFlakyRequest:
+    """Raises the given HTTP statuses in order, then returns `result`"""
+
+    def __init__(self, result=None, failures=(429, 503)):
+        self.result = result if result is not None else {"ok": True}
+        self.failures = list(failures)
+        self.attempts = 0
+
+    def execute(self):
+        self.attempts += 1
+        if self.failures:
+            status = self.failures.pop(0)
+            raise FakeHttpError(status, "rateLimitExceeded" if status in (403, 429) else None)
+        return self.result
+
+
+# Example usage
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    manager = GoogleQuotaManager(":memory:", budgets={"sheets": {"rate": 20.0, "burst": 5}}, base_delay=0.05)
+
+    def agent_calls(agent, count):
+        with acting_as(agent):
+            for _ in range(count):
+                manager.execute(FakeFlakyRequest(failures=(429,) if random.random() < 0.2 else ()), "sheets")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(4) as pool:
+        for agent, count in (("analytics_agent", 30), ("report_generator", 10)):
+            pool.submit(agent_calls, agent, count)
+    print("🎛️ Google Quota Manager Ready")
+    print(f"⏱️ 40 calls at 20/s with retries took {time.perf_counter() - start:.2f}s")
+    print(json.dumps(manager.throttle_stats(), indent=2))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Integration Health Checks - Concurrent probes for Claude, Google, GIMP and FFmpeg
+Liveness mode is cheap enough to call every few seconds; readiness mode
+contacts the real services without spending API tokens
+"""
+
+import asyncio
+import functools
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+LIVENESS = "liveness"
+READINESS = "readiness"
+
+SERVICE_ACCOUNT_FILE = "google_service_account.json"
+READINESS_TTL = 300.0
+READINESS_FAILURE_TTL = 10.0  # failures are re-checked soon so a recovered service shows up quickly
+
+_readiness_cache = {}
+_readiness_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def binary_path(name):
+    """`which <name>`, cached for the process lifetime"""
+    return shutil.which(name)
+
+
+@functools.lru_cache(maxsize=None)
+def binary_version(name):
+    """First line of `<name> -version`, cached for the process lifetime"""
+    if not binary_path(name):
+        return None
+    try:
+        result = subprocess.run([name, "-version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+@functools.lru_cache(maxsize=None)
+def module_available(name):
+    """Whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def _cached_readiness(key, check, ttl=READINESS_TTL, failure_ttl=READINESS_FAILURE_TTL):
+    """Reuse a deep check result for `ttl` seconds (failures for `failure_ttl`) so callers can poll freely"""
+    with _readiness_lock:
+        cached = _readiness_cache.get(key)
+        if cached and time.monotonic() - cached[0] < (ttl if cached[1].get("success") else failure_ttl):
+            return dict(cached[1], cached=True)
+    result = check()
+    with _readiness_lock:
+        _readiness_cache[key] = (time.monotonic(), result)
+    return result
+
+
+def probe_claude(mode=LIVENESS):
+    """Claude API: key and SDK present; readiness lists models (no tokens spent)"""
+    service = "Claude API"
+    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    if not api_key:
+        return {"success": False, "error": "ANTHROPIC_API_KEY not set", "service": service}
+    if not module_available("anthropic"):
+        return {"success": False, "error": "anthropic package not installed", "service": service}
+    if mode == LIVENESS:
+        return {"success": True, "service": service, "mode": mode}
+
+    def check():
+        try:
+            import anthropic
+            client = anthropic.Anthropic(api_key=api_key)
+            models = client.models.list(limit=1)
+            return {"success": True, "service": service, "mode": mode,
+                    "models_visible": len(models.data)}
+        except Exception as e:
+            return {"success": False, "error": str(e), "service": service, "mode": mode}
+
+    return _cached_readiness("claude", check)
+
+
+def probe_google_workspace(mode=LIVENESS, service_account_file=SERVICE_ACCOUNT_FILE):
+    """Google Workspace: credentials file present; readiness fetches an access token"""
+    service = "Google Workspace"
+    if not os.path.exists(service_account_file):
+        return {"success": False, "error": "Service account file not found", "service": service}
+    if not module_available("google.oauth2"):
+        return {"success": False, "error": "google-auth package not installed", "service": service}
+    if mode == LIVENESS:
+        return {"success": True, "service": service, "mode": mode, "credentials_file": service_account_file}
+
+    def check():
+        try:
+            from google.auth.transport.requests import Request
+            from google.oauth2.service_account import Credentials
+            creds = Credentials.from_service_account_file(
+                service_account_file, scopes=['https://www.googleapis.com/auth/drive.readonly']
+            )
+            creds.refresh(Request())
+            return {"success": True, "service": service, "mode": mode,
+                    "credentials_loaded": True, "apis_ready": creds.valid}
+        except Exception as e:
+            return {"success": False, "error": str(e), "service": service, "mode": mode}
+
+    return _cached_readiness(f"google:{service_account_file}", check)
+
+
+def probe_gimp(mode=LIVENESS):
+    """GIMP and Xvfb binaries for headless image processing"""
+    gimp_installed = binary_path("gimp") is not None
+    xvfb_installed = binary_path("Xvfb") is not None
+    result = {
+        "success": gimp_installed and xvfb_installed,
+        "service": "GIMP Image Processing",
+        "mode": mode,
+        "gimp_installed": gimp_installed,
+        "xvfb_installed": xvfb_installed,
+        "ready_for_agents": gimp_installed and xvfb_installed
+    }
+    if not result["success"]:
+        missing = [name for name, ok in (("gimp", gimp_installed), ("Xvfb", xvfb_installed)) if not ok]
+        result["error"] = f"Missing binaries: {', '.join(missing)}"
+    return result
+
+
+def probe_ffmpeg(mode=LIVENESS):
+    """FFmpeg and FFprobe binaries; readiness also confirms they execute"""
+    if mode == LIVENESS:
+        ffmpeg_installed = binary_path("ffmpeg") is not None
+        ffprobe_installed = binary_path("ffprobe") is not None
+    else:
+        ffmpeg_installed = binary_version("ffmpeg") is not None
+        ffprobe_installed = binary_version("ffprobe") is not None
+    result = {
+        "success": ffmpeg_installed and ffprobe_installed,
+        "service": "FFmpeg Video Processing",
+        "mode": mode,
+        "ffmpeg_installed": ffmpeg_installed,
+        "ffprobe_installed": ffprobe_installed,
+        "ready_for_agents": ffmpeg_installed and ffprobe_installed
+    }
+    if mode == READINESS and ffmpeg_installed:
+        result["version"] = binary_version("ffmpeg")
+    if not result["success"]:
+        result["error"] = "ffmpeg/ffprobe not available"
+    return result
+
+
+DEFAULT_PROBES = {
+    "claude": probe_claude,
+    "google_workspace": probe_google_workspace,
+    "gimp": probe_gimp,
+    "ffmpeg": probe_ffmpeg
+}
+
+
+async def run_health_checks(mode=LIVENESS, timeout=5.0, probes=None):
+    """Run every probe concurrently, each bounded by `timeout` seconds"""
+    probes = probes or DEFAULT_PROBES
+
+    async def run_probe(name, probe):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(probe, mode), timeout)
+        except asyncio.TimeoutError:
+            result = {"success": False, "error": f"Timed out after {timeout}s", "service": name}
+        except Exception as e:
+            result = {"success": False, "error": str(e), "service": name}
+        result["probe"] = name
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["timestamp"] = datetime.now().isoformat()
+        return result
+
+    return await asyncio.gather(*(run_probe(name, probe) for name, probe in probes.items()))
+
+
+def check_health(mode=LIVENESS, timeout=5.0, probes=None):
+    """Synchronous wrapper for callers without an event loop"""
+    return asyncio.run(run_health_checks(mode, timeout, probes))
+
+
+def summarize(results):
+    passed = sum(1 for r in results if r["success"])
+    return {"healthy": passed == len(results), "passed": passed, "total": len(results)}
+
+
+if __name__ == "__main__":
+    import sys
+    mode = READINESS if "--ready" in sys.argv else LIVENESS
+    results = check_health(mode)
+    for result in results:
+        status = "✅" if result["success"] else "❌"
+        print(f"{status} {result['service']} ({result['duration_ms']} ms) {result.get('error', '')}")
+    print(json.dumps(summarize(results)))
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Size-Targeted Image Encoder - Pick format and quality for web/social output
+Bisects quality on in-memory encodes to hit a byte budget or an SSIM floor
+and reports the bytes saved against cv2.imwrite defaults
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from integrations.lazy_imports import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Quality flags by name, so OpenCV loads on the first encode rather than on import
+LOSSY_FORMATS = {
+    "jpeg": (".jpg", "IMWRITE_JPEG_QUALITY"),
+    "webp": (".webp", "IMWRITE_WEBP_QUALITY"),
+    "avif": (".avif", "IMWRITE_AVIF_QUALITY")
+}
+LOSSLESS_FORMATS = {
+    "png": (".png", "IMWRITE_PNG_COMPRESSION")
+}
+DEFAULT_FORMATS = ("webp", "avif", "jpeg", "png")
+
+# SSIM is computed on a downscaled copy; the score barely moves and it is far cheaper
+SSIM_MAX_SIDE = 1024
+
+
+def _can_encode(extension):
+    try:
+        ok, _ = cv2.imencode(extension, np.zeros((8, 8, 3), dtype=np.uint8))
+        return ok
+    except cv2.error:
+        return False
+
+
+def available_formats(formats=DEFAULT_FORMATS):
+    """Formats this OpenCV build can actually encode"""
+    usable = []
+    for name in formats:
+        extension, flag = {**LOSSY_FORMATS, **LOSSLESS_FORMATS}[name]
+        if hasattr(cv2, flag) and _can_encode(extension):
+            usable.append(name)
+    return usable
+
+
+def _ssim_view(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    scale = SSIM_MAX_SIDE / max(gray.shape)
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray.astype(np.float32)
+
+
+def ssim(reference, candidate):
+    """Mean structural similarity of two images (grayscale, Gaussian window)"""
+    a, b = _ssim_view(reference), _ssim_view(candidate)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    blur = lambda x: cv2.GaussianBlur(x, (11, 11), 1.5)
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a * mu_a
+    var_b = blur(b * b) - mu_b * mu_b
+    cov = blur(a * b) - mu_a * mu_b
+    score = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(score.mean())
+
+
+class SizeTargetedEncoder:
+    def __init__(self, formats=DEFAULT_FORMATS, max_bytes=None, min_ssim=None,
+                 min_quality=5, max_quality=95, workers=None):
+        self.formats = available_formats(formats)
+        self.max_bytes = max_bytes
+        self.min_ssim = min_ssim
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.workers = workers or os.cpu_count() or 2
+
+    OPTION_KEYS = ("formats", "max_bytes", "min_ssim", "min_quality", "max_quality", "workers")
+
+    @classmethod
+    def from_options(cls, options):
+        """Build from a JSON-friendly dict such as an agent job's encode_options.
+
+        Raises ValueError for unknown keys, unknown formats or out-of-range values.
+        """
+        if not isinstance(options or {}, dict):
+            raise ValueError(f"encode_options must be an object, got {type(options).__name__}")
+        options = dict(options or {})
+        unknown = sorted(set(options) - set(cls.OPTION_KEYS))
+        if unknown:
+            raise ValueError(f"Unknown encode option(s): {', '.join(unknown)}")
+        if "formats" in options:
+            formats = options["formats"]
+            formats = [formats] if isinstance(formats, str) else list(formats)
+            bad = [name for name in formats if name not in LOSSY_FORMATS and name not in LOSSLESS_FORMATS]
+            if bad or not formats:
+                raise ValueError(f"Unsupported format(s): {', '.join(map(str, bad)) or 'none given'}")
+            options["formats"] = tuple(formats)
+        if options.get("max_bytes") is not None and not options["max_bytes"] > 0:
+            raise ValueError("max_bytes must be positive")
+        if options.get("min_ssim") is not None and not 0 < options["min_ssim"] <= 1:
+            raise ValueError("min_ssim must be in (0, 1]")
+        if not 0 <= options.get("min_quality", 5) <= options.get("max_quality", 95) <= 100:
+            raise ValueError("Expected 0 <= min_quality <= max_quality <= 100")
+        return cls(**options)
+
+    def _encode(self, img, name, quality):
+        extension, flag = {**LOSSY_FORMATS, **LOSSLESS_FORMATS}[name]
+        ok, buffer = cv2.imencode(extension, img, [getattr(cv2, flag), quality])
+        if not ok:
+            raise ValueError(f"OpenCV could not encode {name}")
+        return buffer.tobytes()
+
+    def _score(self, img, data):
+        return ssim(img, cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED))
+
+    def _search_quality(self, img, name, max_bytes, min_ssim):
+        """Bisect for the lowest quality meeting the SSIM floor, or the highest within budget"""
+        low, high = self.min_quality, self.max_quality
+        attempts = 0
+        best = None
+
+        if min_ssim is not None:
+            # SSIM rises with quality: find the lowest passing quality
+            while low <= high:
+                quality = (low + high) // 2
+                data = self._encode(img, name, quality)
+                attempts += 1
+                score = self._score(img, data)
+                if score >= min_ssim:
+                    best = (quality, data, score)
+                    high = quality - 1
+                else:
+                    low = quality + 1
+            if best and (max_bytes is None or len(best[1]) <= max_bytes):
+                return best + (True, attempts)
+            # Floor unreachable (or over budget); fall back to best quality within budget
+            low, high = self.min_quality, self.max_quality
+
+        best = None
+        while low <= high:
+            quality = (low + high) // 2
+            data = self._encode(img, name, quality)
+            attempts += 1
+            if max_bytes is None or len(data) <= max_bytes:
+                best = (quality, data)
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is None:
+            return None
+        score = self._score(img, best[1])
+        return best + (score, min_ssim is None or score >= min_ssim, attempts)
+
+    def encode(self, img, baseline_extension=".png", max_bytes=None, min_ssim=None):
+        """Encode `img` in the smallest format/quality meeting the constraints"""
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        min_ssim = min_ssim if min_ssim is not None else self.min_ssim
+
+        ok, baseline = cv2.imencode(baseline_extension, img)
+        baseline_bytes = len(baseline) if ok else None
+        has_alpha = img.ndim == 3 and img.shape[2] == 4
+
+        candidates = []
+        for name in self.formats:
+            if name == "jpeg" and has_alpha:
+                continue
+            if name in LOSSLESS_FORMATS:
+                data = self._encode(img, name, 9)
+                if max_bytes is None or len(data) <= max_bytes:
+                    candidates.append((name, None, data, 1.0, True, 1))
+                continue
+            found = self._search_quality(img, name, max_bytes, min_ssim)
+            if found:
+                candidates.append((name,) + found)
+
+        if not candidates:
+            return {"success": False, "error": f"No format fits within {max_bytes} bytes",
+                    "baseline_bytes": baseline_bytes}
+
+        # Prefer results that meet the quality floor, then the smallest payload
+        name, quality, data, score, floor_met, attempts = min(
+            candidates, key=lambda c: (not c[4], len(c[2]))
+        )
+        return {
+            "success": True,
+            "format": name,
+            "extension": {**LOSSY_FORMATS, **LOSSLESS_FORMATS}[name][0],
+            "quality": quality,
+            "bytes": len(data),
+            "baseline_bytes": baseline_bytes,
+            "bytes_saved": baseline_bytes - len(data) if baseline_bytes else None,
+            "ssim": round(score, 4),
+            "quality_floor_met": floor_met,
+            "encodes_tried": sum(c[5] for c in candidates),
+            "data": data
+        }
+
+    def encode_file(self, input_path, output_path, max_bytes=None, min_ssim=None,
+                    baseline_extension=None):
+        """Re-encode an image file; the output extension follows the chosen format"""
+        try:
+            img = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
+            if img is None:
+                return {"success": False, "error": f"Could not read image: {input_path}"}
+            return self.write(img, output_path, max_bytes, min_ssim, baseline_extension)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def write(self, img, output_path, max_bytes=None, min_ssim=None, baseline_extension=None):
+        """Encode an in-memory image and write it next to `output_path`"""
+        baseline_extension = baseline_extension or Path(output_path).suffix or ".png"
+        result = self.encode(img, baseline_extension, max_bytes, min_ssim)
+        if not result["success"]:
+            return result
+        final_path = str(Path(output_path).with_suffix(result["extension"]))
+        with open(final_path, "wb") as f:
+            f.write(result.pop("data"))
+        result["encoded_file"] = final_path
+        return result
+
+    def encode_batch(self, jobs):
+        """Encode many (input_path, output_path) pairs in parallel; OpenCV releases the GIL"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda job: self.encode_file(*job), jobs))
+        saved = sum(r.get("bytes_saved") or 0 for r in results if r["success"])
+        return {
+            "success": all(r["success"] for r in results),
+            "encoded_count": sum(1 for r in results if r["success"]),
+            "bytes_saved": saved,
+            "results": results
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    x = np.linspace(0, 255, 1080, dtype=np.float32)
+    img = np.dstack([np.add.outer(x, x) / 2, np.outer(np.ones(1080), x), np.add.outer(x, -x) % 255]).astype(np.uint8)
+
+    encoder = SizeTargetedEncoder(min_ssim=0.97)
+    result = encoder.encode(img, ".png")
+    result.pop("data", None)
+    print(f"🖼️ Encoder formats available: {', '.join(encoder.formats)}")
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Lazy Imports - Defer heavy dependencies until first use
+Agents restart often; cv2, numpy, anthropic and the Google client libraries
+cost hundreds of milliseconds to import and most code paths never touch
+them, so modules bind them as proxies that import on first attribute access
+"""
+
+import importlib
+import sys
+import threading
+
+_load_lock = threading.Lock()
+
+
+class LazyModule:
+    """Module stand-in; the real import (and any ImportError) happens on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _load_lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_lazy_name"])
+                    # Later lookups hit the instance dict directly instead of __getattr__
+                    self.__dict__.update(vars(module))
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """The module itself if something already imported it, otherwise a LazyModule proxy"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def is_loaded(module):
+    return not isinstance(module, LazyModule) or module.__dict__["_lazy_module"] is not None
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    np = lazy_import("numpy")
+    bind_ms = (time.perf_counter() - start) * 1000
+    print(f"💤 Bound {np!r} in {bind_ms:.3f} ms")
+    start = time.perf_counter()
+    total = np.arange(10).sum()
+    print(f"⚡ First use imported numpy in {(time.perf_counter() - start) * 1000:.1f} ms (sum={total})")
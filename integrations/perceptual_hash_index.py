@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Perceptual Hash Index - Near-duplicate detection for image and video assets
+64-bit dHash/pHash fingerprints with multi-index hashing for fast Hamming
+lookups, persisted to disk so batch jobs can skip or reuse earlier work
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+from integrations.lazy_imports import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+CHUNKS = 4          # 64-bit hash split into four 16-bit lookup keys
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+MERGE_THRESHOLD = 16384  # Unsorted rows scanned linearly before a merge
+MIN_CAPACITY = 1024
+
+_byte_popcount = None
+_flip_masks = {}
+
+
+def popcount64(values):
+    """Vectorised popcount of a uint64 array"""
+    global _byte_popcount
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    if _byte_popcount is None:
+        _byte_popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return _byte_popcount[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _bits_to_int(bits):
+    return int(np.packbits(bits.astype(np.uint8).ravel()).view(">u8")[0])
+
+
+def dhash(gray):
+    """Difference hash: compare horizontally adjacent pixels of a 9x8 thumbnail"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA) if gray.shape != (8, 9) else gray
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray):
+    """DCT hash: low-frequency 8x8 block of a 32x32 thumbnail against its median"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    block = cv2.dct(small)[:8, :8]
+    return _bits_to_int(block > np.median(block.ravel()[1:]))
+
+
+HASHERS = {"dhash": dhash, "phash": phash}
+
+
+def image_hash(path, method="dhash"):
+    # Reduced decode: the hash only needs a thumbnail
+    gray = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        raise ValueError(f"Could not read image: {path}")
+    return HASHERS[method](gray)
+
+
+def video_keyframe_hashes(path, max_frames=16, method="dhash", ffmpeg="ffmpeg"):
+    """Hash evenly spaced keyframes; only keyframes are decoded"""
+    width, height = (9, 8) if method == "dhash" else (32, 32)
+    cmd = [ffmpeg, "-v", "error", "-skip_frame", "nokey", "-i", str(path),
+           "-vf", f"scale={width}:{height}:flags=area,format=gray",
+           "-vsync", "passthrough", "-f", "rawvideo", "-"]
+    result = subprocess.run(cmd, capture_output=True, timeout=600)
+    if result.returncode != 0:
+        raise ValueError(f"Could not decode keyframes: {result.stderr.decode(errors='replace').strip()}")
+    frames = np.frombuffer(result.stdout, dtype=np.uint8).reshape(-1, height, width)
+    if len(frames) > max_frames:
+        frames = frames[np.linspace(0, len(frames) - 1, max_frames).astype(int)]
+    return [HASHERS[method](frame) for frame in frames]
+
+
+class PerceptualHashIndex:
+    """In-memory multi-index hash table over 64-bit fingerprints.
+
+    Every entry (an image, or a video as several keyframe rows) is split
+    into 16-bit chunks kept in sorted arrays. By the pigeonhole principle a
+    match within Hamming radius r agrees with the query to within r // 4
+    bits on at least one chunk, so only those chunk neighbourhoods are
+    probed and the candidates verified exactly.
+    """
+
+    def __init__(self, path=None, method="dhash"):
+        self.path = path
+        self.method = method
+        self.lock = threading.Lock()
+        # Row storage grows geometrically; hashes/row_entry are views of the filled part
+        self._hash_buffer = np.empty(0, dtype=np.uint64)
+        self._entry_buffer = np.empty(0, dtype=np.uint32)
+        self.hashes = self._hash_buffer
+        self.row_entry = self._entry_buffer
+        self.entries = []  # {"key", "kind", "variant", "output", "frames", "added_at"}
+        self.sorted_rows = 0
+        self.chunk_values = [np.empty(0, dtype=np.uint16) for _ in range(CHUNKS)]
+        self.chunk_rows = [np.empty(0, dtype=np.uint32) for _ in range(CHUNKS)]
+        self._pending_hashes = []
+        self._pending_entries = []
+        if path and os.path.exists(f"{path}.npz"):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---- building ------------------------------------------------------
+
+    def add(self, key, hashes, output=None, variant=None, kind="image"):
+        """Index one asset; `hashes` is a single int or a list of keyframe hashes"""
+        hashes = [hashes] if isinstance(hashes, int) else list(hashes)
+        with self.lock:
+            entry_id = len(self.entries)
+            self.entries.append({"key": key, "kind": kind, "variant": variant, "output": output,
+                                 "frames": len(hashes), "added_at": time.time()})
+            self._pending_hashes.extend(hashes)
+            self._pending_entries.extend([entry_id] * len(hashes))
+            if len(self._pending_hashes) >= MERGE_THRESHOLD:
+                self._flush_pending()
+        return entry_id
+
+    def set_rows(self, hashes, row_entry):
+        """Replace every row at once (loading, bulk builds) and rebuild the chunk tables"""
+        self._hash_buffer = np.asarray(hashes, dtype=np.uint64)
+        self._entry_buffer = np.asarray(row_entry, dtype=np.uint32)
+        self.hashes = self._hash_buffer
+        self.row_entry = self._entry_buffer
+        self._pending_hashes, self._pending_entries = [], []
+        self._merge()
+
+    def _flush_pending(self):
+        """Append pending rows, and merge once the unsorted tail is long enough.
+
+        Checked here rather than in add(): the query-then-add pattern of batch
+        dedupe flushes before the pending list ever reaches the threshold.
+        """
+        if self._pending_hashes:
+            rows, extra = len(self.hashes), len(self._pending_hashes)
+            if rows + extra > len(self._hash_buffer):
+                capacity = max(rows + extra, 2 * len(self._hash_buffer), MIN_CAPACITY)
+                hash_buffer = np.empty(capacity, dtype=np.uint64)
+                entry_buffer = np.empty(capacity, dtype=np.uint32)
+                hash_buffer[:rows] = self.hashes
+                entry_buffer[:rows] = self.row_entry
+                self._hash_buffer, self._entry_buffer = hash_buffer, entry_buffer
+            self._hash_buffer[rows:rows + extra] = self._pending_hashes
+            self._entry_buffer[rows:rows + extra] = self._pending_entries
+            self.hashes = self._hash_buffer[:rows + extra]
+            self.row_entry = self._entry_buffer[:rows + extra]
+            self._pending_hashes, self._pending_entries = [], []
+        if len(self.hashes) - self.sorted_rows >= MERGE_THRESHOLD:
+            self._merge()
+
+    def _merge(self):
+        """Rebuild the sorted chunk tables to cover every row"""
+        rows = np.arange(len(self.hashes), dtype=np.uint32)
+        for c in range(CHUNKS):
+            values = ((self.hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            order = np.argsort(values, kind="stable")
+            self.chunk_values[c] = values[order]
+            self.chunk_rows[c] = rows[order]
+        self.sorted_rows = len(self.hashes)
+
+    # ---- querying ------------------------------------------------------
+
+    @staticmethod
+    def _neighbours(value, radius):
+        """All 16-bit values within `radius` bit flips of `value`"""
+        masks = _flip_masks.get(radius)
+        if masks is None:
+            values = np.arange(1 << CHUNK_BITS, dtype=np.uint16)
+            masks = _flip_masks[radius] = values[popcount64(values.astype(np.uint64)) <= radius]
+        return masks ^ np.uint16(value)
+
+    def _candidate_rows(self, query, radius):
+        sub_radius = radius // CHUNKS
+        found = []
+        for c in range(CHUNKS):
+            probe = self._neighbours((query >> (c * CHUNK_BITS)) & CHUNK_MASK, sub_radius)
+            left = np.searchsorted(self.chunk_values[c], probe, side="left")
+            lengths = np.searchsorted(self.chunk_values[c], probe, side="right") - left
+            total = int(lengths.sum())
+            if total:
+                # Flat positions of every matching range, without a Python loop
+                positions = np.repeat(left - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+                found.append(self.chunk_rows[c][positions])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.uint32)
+
+    def query(self, query, radius=6):
+        """Rows within `radius` bits of `query` as (entry_id, distance) pairs"""
+        with self.lock:
+            self._flush_pending()
+            rows = self._candidate_rows(int(query), radius)
+            distances = popcount64(self.hashes[rows] ^ np.uint64(query))
+            hits = rows[distances <= radius]
+            # Rows added since the last merge are scanned as one contiguous slice
+            tail_distances = popcount64(self.hashes[self.sorted_rows:] ^ np.uint64(query))
+            tail_hits = np.flatnonzero(tail_distances <= radius) + self.sorted_rows
+            hits = np.concatenate([hits, tail_hits])
+            found = np.concatenate([distances[distances <= radius], tail_distances[tail_hits - self.sorted_rows]])
+            return list(zip(self.row_entry[hits].tolist(), found.tolist()))
+
+    def find_duplicate(self, hashes, radius=6, variant=None, min_frame_ratio=0.6):
+        """Best matching entry for an image hash or a video's keyframe hashes"""
+        hashes = [hashes] if isinstance(hashes, int) else list(hashes)
+        votes, distance_sum = {}, {}
+        for h in hashes:
+            matched = {}
+            for entry_id, distance in self.query(h, radius):
+                matched[entry_id] = min(distance, matched.get(entry_id, distance))
+            for entry_id, distance in matched.items():
+                votes[entry_id] = votes.get(entry_id, 0) + 1
+                distance_sum[entry_id] = distance_sum.get(entry_id, 0) + distance
+
+        best = None
+        for entry_id, count in votes.items():
+            entry = self.entries[entry_id]
+            if variant is not None and entry["variant"] != variant:
+                continue
+            if count / len(hashes) < min_frame_ratio:
+                continue
+            score = (count, -distance_sum[entry_id])
+            if best is None or score > best[0]:
+                best = (score, entry_id)
+        if best is None:
+            return None
+        entry_id = best[1]
+        return dict(self.entries[entry_id], entry_id=entry_id,
+                    matched_frames=votes[entry_id],
+                    mean_distance=round(distance_sum[entry_id] / votes[entry_id], 2))
+
+    # ---- persistence ---------------------------------------------------
+
+    def save(self, path=None):
+        path = path or self.path
+        with self.lock:
+            self._flush_pending()
+            np.savez(f"{path}.tmp.npz", hashes=self.hashes, row_entry=self.row_entry)
+            with open(f"{path}.entries.jsonl.tmp", "w") as f:
+                for entry in self.entries:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(f"{path}.tmp.npz", f"{path}.npz")
+            os.replace(f"{path}.entries.jsonl.tmp", f"{path}.entries.jsonl")
+
+    def load(self, path=None):
+        path = path or self.path
+        with np.load(f"{path}.npz") as data:
+            hashes, row_entry = data["hashes"], data["row_entry"]
+        with open(f"{path}.entries.jsonl") as f:
+            self.entries = [json.loads(line) for line in f]
+        self.set_rows(hashes, row_entry)
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    index = PerceptualHashIndex()
+    entries = 1_000_000
+    start = time.perf_counter()
+    index.entries = [{"key": f"asset_{i}", "kind": "image", "variant": None, "output": None,
+                      "frames": 1, "added_at": 0} for i in range(entries)]
+    index.set_rows(rng.integers(0, 2 ** 63, entries, dtype=np.uint64) * np.uint64(2),
+                   np.arange(entries, dtype=np.uint32))
+    build = time.perf_counter() - start
+
+    target = int(index.hashes[12345]) ^ 0b101  # two bits away from a stored hash
+    start = time.perf_counter()
+    for _ in range(100):
+        match = index.find_duplicate(target, radius=8)
+    per_query_ms = (time.perf_counter() - start) * 10
+
+    print(f"🔎 Perceptual hash index: {entries:,} entries built in {build:.2f}s")
+    print(f"✅ Match {match['key']} at distance {match['mean_distance']} in {per_query_ms:.3f} ms/query")
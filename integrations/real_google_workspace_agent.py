@@ -4,13 +4,16 @@ Google Workspace Integration for Agents - REAL APIs
 No more simulation - actual document and spreadsheet creation
 """
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 import json
 import os
 
+from integrations.drive_sync import DriveSyncEngine
+from integrations.google_docs_builder import DocumentBuilder
+from integrations.google_quota_manager import get_shared_quota_manager
+from integrations.tracing import instrument
+
 class RealGoogleWorkspaceAgent:
-    def __init__(self, service_account_file="google_service_account.json"):
+    def __init__(self, service_account_file="google_service_account.json", quota_manager=None):
         """Initialize with service account credentials"""
         self.scopes = [
             'https://www.googleapis.com/auth/documents',
@@ -18,6 +21,10 @@ class RealGoogleWorkspaceAgent:
             'https://www.googleapis.com/auth/drive.file'
         ]
         
+        # Deferred: the Google client libraries take longer to import than most jobs take to run
+        from google.oauth2.service_account import Credentials
+        from googleapiclient.discovery import build
+
         if not os.path.exists(service_account_file):
             print(f"❌ Service account file not found: {service_account_file}")
             print("📋 Please complete Google Cloud setup first")
@@ -31,44 +38,55 @@ class RealGoogleWorkspaceAgent:
         self.docs_service = build('docs', 'v1', credentials=self.credentials)
         self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
         self.drive_service = build('drive', 'v3', credentials=self.credentials)
+        self._drive_sync = None
+        self.quota = quota_manager or get_shared_quota_manager()
+        
+    def _execute(self, request, api, idempotent=True):
+        """Every API call goes through the host-wide quota manager, with retries
+        (only on rate limits for non-idempotent calls such as creates)"""
+        return self.quota.execute(request, api, idempotent=idempotent)
+    
+    def quota_stats(self):
+        """Throttle time, retries and failures per calling agent"""
+        return self.quota.throttle_stats()
         
     def create_document(self, title, content):
-        """Create real Google document - NO SIMULATION"""
+        """Create real Google document - NO SIMULATION
+        
+        content is plain text or a list of structured blocks (see DocumentBuilder)
+        """
         try:
             # Create document
             document_body = {'title': title}
-            document = self.docs_service.documents().create(body=document_body).execute()
+            document = self._execute(self.docs_service.documents().create(body=document_body), 'docs',
+                                      idempotent=False)
             doc_id = document.get('documentId')
             
-            # Add content
+            # Add content in as few size-bounded batchUpdate calls as possible
+            build_stats = {'batch_calls': 0, 'requests_sent': 0}
             if content:
-                requests = [{
-                    'insertText': {
-                        'location': {'index': 1},
-                        'text': content
-                    }
-                }]
-                
-                self.docs_service.documents().batchUpdate(
-                    documentId=doc_id,
-                    body={'requests': requests}
-                ).execute()
+                blocks = [content] if isinstance(content, str) else content
+                build_stats = DocumentBuilder().extend(blocks).apply(
+                    self.docs_service, doc_id,
+                    execute=lambda request, idempotent=True: self._execute(request, 'docs', idempotent))
             
             # Make publicly readable
             permission = {
                 'type': 'anyone',
                 'role': 'reader'
             }
-            self.drive_service.permissions().create(
+            self._execute(self.drive_service.permissions().create(
                 fileId=doc_id, 
                 body=permission
-            ).execute()
+            ), 'drive', idempotent=False)
             
             return {
                 'success': True,
                 'document_id': doc_id,
                 'url': f'https://docs.google.com/document/d/{doc_id}',
                 'title': title,
+                'batch_calls': build_stats['batch_calls'],
+                'requests_sent': build_stats['requests_sent'],
                 'type': 'REAL_GOOGLE_DOC'
             }
             
@@ -83,9 +101,9 @@ class RealGoogleWorkspaceAgent:
                 'properties': {'title': title}
             }
             
-            spreadsheet = self.sheets_service.spreadsheets().create(
+            spreadsheet = self._execute(self.sheets_service.spreadsheets().create(
                 body=spreadsheet_body
-            ).execute()
+            ), 'sheets', idempotent=False)
             
             spreadsheet_id = spreadsheet.get('spreadsheetId')
             
@@ -97,22 +115,22 @@ class RealGoogleWorkspaceAgent:
                     
                 body = {'values': values}
                 
-                self.sheets_service.spreadsheets().values().update(
+                self._execute(self.sheets_service.spreadsheets().values().update(
                     spreadsheetId=spreadsheet_id,
                     range='A1',
                     valueInputOption='RAW',
                     body=body
-                ).execute()
+                ), 'sheets')
             
             # Make publicly readable
             permission = {
                 'type': 'anyone',
                 'role': 'reader'
             }
-            self.drive_service.permissions().create(
+            self._execute(self.drive_service.permissions().create(
                 fileId=spreadsheet_id, 
                 body=permission
-            ).execute()
+            ), 'drive', idempotent=False)
             
             return {
                 'success': True,
@@ -135,13 +153,14 @@ class RealGoogleWorkspaceAgent:
             if folder_id:
                 file_metadata['parents'] = [folder_id]
             
+            from googleapiclient.http import MediaFileUpload
             media = MediaFileUpload(file_path, resumable=True)
             
-            file = self.drive_service.files().create(
+            file = self._execute(self.drive_service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id'
-            ).execute()
+            ), 'drive', idempotent=False)
             
             return {
                 'success': True,
@@ -152,6 +171,19 @@ class RealGoogleWorkspaceAgent:
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
+    
+    def sync_folder(self, local_dir, folder_id, delete_missing=False):
+        """Upload only new or modified files from local_dir into a Drive folder"""
+        if self._drive_sync is None:
+            manifest = os.environ.get("AGENT_DRIVE_MANIFEST", "drive_sync_manifest.json")
+            self._drive_sync = DriveSyncEngine(self.drive_service, manifest,
+                                               execute=lambda request, idempotent=True: self._execute(request, 'drive', idempotent))
+        result = self._drive_sync.sync_folder(local_dir, folder_id, delete_missing)
+        if result['success']:
+            result['type'] = 'REAL_DRIVE_SYNC'
+        return result
+
+instrument(RealGoogleWorkspaceAgent)
 
 # Example usage for agents
 if __name__ == "__main__":
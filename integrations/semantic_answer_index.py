@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Semantic Answer Index - Local near-duplicate retrieval over past Claude answers
+Questions are embedded as hashed TF-IDF vectors (no external service) and
+summarised by 256-bit random-projection signatures; a Hamming scan over the
+signatures shortlists candidates that are then ranked by exact cosine, so
+paraphrased questions can reuse or cite earlier answers instead of a new
+API call
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+
+from integrations.lazy_imports import lazy_import
+from integrations.perceptual_hash_index import popcount64
+
+np = lazy_import("numpy")
+
+HASH_BUCKETS = 1 << 20
+SIGNATURE_BITS = 256
+SIGNATURE_WORDS = SIGNATURE_BITS // 64
+EMBED_CHUNK = 4096      # Entries embedded per vectorised batch
+CANDIDATE_FACTOR = 32   # Signature shortlist size per requested hit
+MIN_CANDIDATES = 256
+REUSE_SCORE = 0.9       # Close enough to return the stored answer as is
+CONTEXT_SCORE = 0.5     # Close enough to show Claude as prior work
+DUPLICATE_SCORE = 0.98  # Adding this close to an entry replaces its answer
+
+INDEX_ARRAYS = ("signatures", "kinds", "offsets", "buckets", "weights", "document_frequency")
+
+TOKEN = re.compile(r"[a-z0-9_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me my of on or our "
+    "should so that the this to was we what when where which why will with you your".split()
+)
+
+
+def tokens(text):
+    """Lowercased words minus stopwords, with a crude plural/suffix fold, plus word bigrams"""
+    words = []
+    for word in TOKEN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        for suffix in ("ing", "ed", "es", "s", "e"):
+            if len(word) > len(suffix) + 3 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def term_counts(text):
+    """Hashed term frequencies; crc32 rather than hash() so buckets are stable across processes"""
+    counts = {}
+    for token in tokens(text):
+        bucket = zlib.crc32(token.encode()) & (HASH_BUCKETS - 1)
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def query_text(question, context=""):
+    """The text a question is indexed and looked up by"""
+    return f"{question}\n{context}" if context else question
+
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _projection_signs(buckets):
+    """Each bucket's +/-1 row of the random projection, derived from its id instead of stored"""
+    keys = buckets.astype(np.uint64)[:, None] * np.uint64(SIGNATURE_WORDS) + np.arange(SIGNATURE_WORDS, dtype=np.uint64)
+    bits = np.unpackbits(_splitmix64(keys).view(np.uint8), axis=1)
+    return bits.astype(np.float32) * 2 - 1
+
+
+class SemanticAnswerIndex:
+    """Question/answer pairs searchable by cosine similarity of hashed TF-IDF vectors.
+
+    IDF weights are taken from the corpus at insertion time; load() re-embeds
+    everything once the corpus has doubled since the last build so weights
+    track the questions agents actually ask.
+    """
+
+    def __init__(self, path=None, autosave_every=50):
+        self.path = path
+        self.autosave_every = autosave_every
+        self.lock = threading.Lock()
+        self._clear()
+        if path and os.path.exists(f"{path}.entries.jsonl"):
+            self.load()
+
+    def _clear(self):
+        # Signatures are stored word-major so the Hamming scan streams contiguous columns
+        self.document_frequency = np.zeros(HASH_BUCKETS, dtype=np.int32)
+        self.signatures = np.empty((SIGNATURE_WORDS, 0), dtype=np.uint64)
+        self.kinds = np.empty(0, dtype=np.uint8)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.buckets = np.empty(0, dtype=np.uint32)
+        self.weights = np.empty(0, dtype=np.float32)
+        self.entries = []  # {"question", "context", "answer", "kind", "agent", "added_at", "hits"}
+        self.kind_codes = {}
+        self.built_size = 0
+        self._pending = []
+        self._unsaved = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---- embedding -----------------------------------------------------
+
+    def _embed_many(self, counts_list):
+        """Sparse unit TF-IDF vectors and packed signatures for a batch of term-count dicts"""
+        lengths = np.array([len(counts) for counts in counts_list], dtype=np.int64)
+        buckets = np.fromiter((b for counts in counts_list for b in sorted(counts)), dtype=np.uint32,
+                              count=int(lengths.sum()))
+        tf = np.fromiter((counts[b] for counts in counts_list for b in sorted(counts)), dtype=np.float32,
+                         count=len(buckets))
+        documents = max(len(self.entries), 1)
+        idf = np.log((1 + documents) / (1 + self.document_frequency[buckets])) + 1
+        weights = ((1 + np.log(tf)) * idf).astype(np.float32)
+
+        starts = np.cumsum(lengths) - lengths
+        nonempty = lengths > 0
+        norms = np.ones(len(lengths), dtype=np.float32)
+        projected = np.zeros((len(lengths), SIGNATURE_BITS), dtype=np.float32)
+        if len(buckets):
+            norms[nonempty] = np.sqrt(np.add.reduceat(weights ** 2, starts[nonempty]))
+            weights /= np.repeat(norms, lengths)
+            projected[nonempty] = np.add.reduceat(weights[:, None] * _projection_signs(buckets), starts[nonempty])
+        signatures = np.packbits(projected > 0, axis=1).view(np.uint64)
+        splits = np.cumsum(lengths)[:-1]
+        return np.split(buckets, splits), np.split(weights, splits), signatures
+
+    def embed(self, text):
+        """(sorted bucket ids, unit-length TF-IDF weights, packed signature)"""
+        buckets, weights, signatures = self._embed_many([term_counts(text)])
+        return buckets[0], weights[0], signatures[0]
+
+    # ---- building ------------------------------------------------------
+
+    def add(self, question, answer, kind="ask", agent=None, context=""):
+        """Index one answered question; returns its entry id"""
+        text = query_text(question, context)
+        match = self.search(text, k=1, kind=kind, min_score=DUPLICATE_SCORE)
+        with self.lock:
+            if match:
+                # Same question again: keep the newest answer instead of a second entry
+                entry_id = match[0]["entry_id"]
+                self.entries[entry_id].update(answer=answer, agent=agent, added_at=time.time())
+            else:
+                entry_id = len(self.entries)
+                counts = term_counts(text)
+                self.document_frequency[list(counts)] += 1
+                buckets, weights, signatures = self._embed_many([counts])
+                buckets, weights, signature = buckets[0], weights[0], signatures[0]
+                code = self.kind_codes.setdefault(kind, len(self.kind_codes))
+                self.entries.append({"question": question, "context": context, "answer": answer, "kind": kind,
+                                     "agent": agent, "added_at": time.time(), "hits": 0})
+                self._pending.append((buckets, weights, signature, code))
+            self._unsaved += 1
+            autosave = self.path and self._unsaved >= self.autosave_every
+        if autosave:
+            self.save()
+        return entry_id
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        buckets, weights, signatures, codes = zip(*self._pending)
+        lengths = np.array([len(b) for b in buckets], dtype=np.int64)
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths)])
+        self.buckets = np.concatenate([self.buckets, *buckets])
+        self.weights = np.concatenate([self.weights, *weights])
+        self.signatures = np.concatenate([self.signatures, np.stack(signatures, axis=1)], axis=1)
+        self.kinds = np.concatenate([self.kinds, np.array(codes, dtype=np.uint8)])
+        self._pending = []
+
+    def rebuild(self):
+        """Re-embed every entry with the current IDF weights"""
+        counts_list = [term_counts(query_text(e["question"], e.get("context", ""))) for e in self.entries]
+        with self.lock:
+            self._pending = []
+            self.document_frequency[:] = 0
+            for counts in counts_list:
+                self.document_frequency[list(counts)] += 1
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.buckets = np.empty(0, dtype=np.uint32)
+            self.weights = np.empty(0, dtype=np.float32)
+            self.signatures = np.empty((SIGNATURE_WORDS, 0), dtype=np.uint64)
+            self.kinds = np.empty(0, dtype=np.uint8)
+            for first in range(0, len(counts_list), EMBED_CHUNK):
+                chunk = counts_list[first:first + EMBED_CHUNK]
+                buckets, weights, signatures = self._embed_many(chunk)
+                codes = [self.kind_codes[e["kind"]] for e in self.entries[first:first + EMBED_CHUNK]]
+                self._pending.extend(zip(buckets, weights, signatures, codes))
+            self._flush_pending()
+            self.built_size = len(self.entries)
+
+    # ---- querying ------------------------------------------------------
+
+    def _cosine(self, rows, buckets, weights):
+        """Exact sparse dot products of the query against `rows`"""
+        starts, stops = self.offsets[rows], self.offsets[rows + 1]
+        lengths = stops - starts
+        total = int(lengths.sum())
+        if total == 0 or len(buckets) == 0:
+            return np.zeros(len(rows), dtype=np.float32)
+        # Flat positions of every candidate's nonzeros, without a Python loop
+        segment_starts = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - segment_starts, lengths) + np.arange(total)
+        candidate_buckets = self.buckets[positions]
+        slot = np.minimum(np.searchsorted(buckets, candidate_buckets), len(buckets) - 1)
+        products = np.where(buckets[slot] == candidate_buckets, weights[slot] * self.weights[positions], 0)
+        scores = np.zeros(len(rows), dtype=np.float32)
+        nonempty = lengths > 0
+        scores[nonempty] = np.add.reduceat(products, segment_starts[nonempty])
+        return scores
+
+    def search(self, text, k=5, kind=None, min_score=0.0):
+        """Top-k earlier entries by cosine similarity, best first"""
+        with self.lock:
+            self._flush_pending()
+            if not self.entries:
+                return []
+            buckets, weights, signature = self.embed(text)
+            if len(buckets) == 0:
+                return []
+            distances = popcount64(self.signatures[0] ^ signature[0]).astype(np.uint16)
+            for word in range(1, SIGNATURE_WORDS):
+                distances += popcount64(self.signatures[word] ^ signature[word])
+            if kind is not None:
+                if kind not in self.kind_codes:
+                    return []
+                distances[self.kinds != self.kind_codes[kind]] = SIGNATURE_BITS + 1
+            # Histogram selection is several times cheaper than argpartition at this size
+            shortlist = max(k * CANDIDATE_FACTOR, MIN_CANDIDATES)
+            histogram = np.cumsum(np.bincount(distances, minlength=SIGNATURE_BITS + 2)[:SIGNATURE_BITS + 1])
+            cutoff = min(int(np.searchsorted(histogram, shortlist)), SIGNATURE_BITS)
+            rows = np.flatnonzero(distances < cutoff)
+            # Ties at the cutoff only fill the shortlist up
+            rows = np.concatenate([rows, np.flatnonzero(distances == cutoff)[:max(shortlist - len(rows), 0)]])
+            scores = self._cosine(rows, buckets, weights)
+            best = np.argsort(-scores)[:k]
+            hits = []
+            for row, score in zip(rows[best].tolist(), scores[best].tolist()):
+                if score < min_score:
+                    break
+                hits.append(dict(self.entries[row], entry_id=row, score=round(score, 4)))
+            return hits
+
+    def record_hit(self, entry_id):
+        with self.lock:
+            self.entries[entry_id]["hits"] += 1
+
+    # ---- persistence ---------------------------------------------------
+
+    def save(self, path=None):
+        """Write the index; the file lock keeps agent processes sharing `path` from interleaving the two files"""
+        path = path or self.path
+        with self.lock, file_lock(f"{path}.lock"):
+            self._flush_pending()
+            tmp = f"{path}.{os.getpid()}.tmp"
+            np.savez(f"{tmp}.npz", signatures=self.signatures, kinds=self.kinds, offsets=self.offsets,
+                     buckets=self.buckets, weights=self.weights, document_frequency=self.document_frequency,
+                     built_size=np.array([self.built_size]), entry_count=np.array([len(self.entries)]))
+            with open(f"{tmp}.entries.jsonl", "w") as f:
+                for entry in self.entries:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(f"{tmp}.npz", f"{path}.npz")
+            os.replace(f"{tmp}.entries.jsonl", f"{path}.entries.jsonl")
+            self._unsaved = 0
+
+    def load(self, path=None):
+        """Load a saved index; arrays that don't match the entries are rebuilt, unreadable entries start empty"""
+        path = path or self.path
+        try:
+            with file_lock(f"{path}.lock"):
+                with open(f"{path}.entries.jsonl") as f:
+                    entries = [json.loads(line) for line in f]
+                arrays = self._read_arrays(path, len(entries))
+            if not all(isinstance(e, dict) and "question" in e and "kind" in e for e in entries):
+                raise ValueError("malformed entry")
+            kinds = {}
+            for entry in entries:
+                kinds.setdefault(entry["kind"], len(kinds))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Semantic index {path} unreadable, starting empty: {e}")
+            self._clear()
+            return
+        self._clear()
+        self.entries = entries
+        self.kind_codes = kinds
+        if arrays is None:
+            print(f"⚠️ Semantic index {path}.npz does not match its {len(entries)} entries, rebuilding")
+            self.rebuild()
+            return
+        for name in INDEX_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.built_size = arrays["built_size"]
+        if len(self.entries) >= max(2 * self.built_size, 64):
+            self.rebuild()
+
+    @staticmethod
+    def _read_arrays(path, entry_count):
+        """Saved arrays, or None when missing, corrupt or sized for a different entry count"""
+        try:
+            with np.load(f"{path}.npz") as data:
+                arrays = {name: data[name] for name in INDEX_ARRAYS}
+                arrays["built_size"] = int(data["built_size"][0])
+                saved_count = int(data["entry_count"][0])
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+        offsets = arrays["offsets"]
+        consistent = (saved_count == entry_count
+                      and arrays["signatures"].shape == (SIGNATURE_WORDS, entry_count)
+                      and len(arrays["kinds"]) == entry_count
+                      and len(offsets) == entry_count + 1
+                      and int(offsets[-1]) == len(arrays["buckets"]) == len(arrays["weights"])
+                      and arrays["document_frequency"].shape == (HASH_BUCKETS,))
+        return arrays if consistent else None
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock held across processes for the duration of the block"""
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+def prior_answers_context(hits, max_chars=600):
+    """Earlier answers formatted for a prompt's context section"""
+    lines = ["Previously answered similar questions:"]
+    for hit in hits:
+        answer = hit["answer"] if len(hit["answer"]) <= max_chars else hit["answer"][:max_chars] + "..."
+        lines.append(f"- Q: {hit['question']} (similarity {hit['score']:.2f})\n  A: {answer}")
+    return "\n".join(lines)
+
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_semantic_index():
+    """Process-wide index at AGENT_SEMANTIC_INDEX (default claude_semantic_index); "off" disables it"""
+    global _shared_index
+    path = os.environ.get("AGENT_SEMANTIC_INDEX", "claude_semantic_index")
+    if path == "off":
+        return None
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = SemanticAnswerIndex(path)
+            atexit.register(lambda: _shared_index._unsaved and _shared_index.save())
+        return _shared_index
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(3)
+    vocabulary = np.array([f"term{i}" for i in range(20000)])
+    index = SemanticAnswerIndex()
+    entries = 300_000
+    start = time.perf_counter()
+    for i, words in enumerate(vocabulary[rng.integers(0, len(vocabulary), (entries, 12))]):
+        index.entries.append({"question": " ".join(words), "context": "",
+                              "answer": f"answer {i}", "kind": "ask", "agent": None, "added_at": 0, "hits": 0})
+    index.kind_codes["ask"] = 0
+    index.rebuild()
+    print(f"🧠 Indexed {len(index):,} questions in {time.perf_counter() - start:.1f}s")
+
+    index.add("How do I compress a 4K video for Instagram without losing quality?",
+              "Use H.264 at CRF 23 with the slow preset and AAC audio at 128k.")
+    queries = ["how can I compress 4k videos for instagram without quality loss",
+               "What is the best way to compress a 4K video for Instagram?"]
+    for query in queries:
+        index.search(query, k=3)
+        start = time.perf_counter()
+        rounds = 50
+        for _ in range(rounds):
+            hits = index.search(query, k=3)
+        ms = (time.perf_counter() - start) * 1000 / rounds
+        print(f"🔎 {ms:.2f} ms  score={hits[0]['score']}  -> {hits[0]['answer']}")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Stream Packager - HLS/DASH multi-rendition output straight from the encode
+One ffmpeg run scales the source into a bitrate ladder, writes keyframe-
+aligned fMP4 segments and manifests, and reports each segment as soon as
+it is complete so playback or upload can start before the encode ends
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_LADDER = [
+    {"name": "1080p", "height": 1080, "video_bitrate": 5000, "audio_bitrate": 128},
+    {"name": "720p", "height": 720, "video_bitrate": 2800, "audio_bitrate": 128},
+    {"name": "480p", "height": 480, "video_bitrate": 1400, "audio_bitrate": 96}
+]
+
+SEGMENT_SUFFIXES = {".m4s", ".ts", ".mp4"}
+
+
+class StreamPackager:
+    def __init__(self, ffmpeg="ffmpeg", segment_seconds=4, ladder=None, preset="veryfast", poll_interval=0.25):
+        self.ffmpeg = ffmpeg
+        self.segment_seconds = segment_seconds
+        self.ladder = ladder or DEFAULT_LADDER
+        self.preset = preset
+        self.poll_interval = poll_interval
+
+    def renditions_for(self, source_height=None):
+        """Drop ladder rungs above the source; never upscale for streaming"""
+        if not source_height:
+            return list(self.ladder)
+        fitting = [r for r in self.ladder if r["height"] <= source_height]
+        return fitting or [min(self.ladder, key=lambda r: r["height"])]
+
+    def build_command(self, input_path, output_dir, formats=("hls", "dash"), renditions=None, has_audio=True):
+        renditions = renditions or self.renditions_for()
+        count = len(renditions)
+        split = f"[0:v]split={count}" + "".join(f"[s{i}]" for i in range(count))
+        scales = ";".join(f"[s{i}]scale=-2:{r['height']}[v{i}]" for i, r in enumerate(renditions))
+
+        cmd = [self.ffmpeg, "-v", "error", "-i", input_path, "-filter_complex", f"{split};{scales}"]
+        for i in range(count):
+            cmd += ["-map", f"[v{i}]"]
+
+        # Identical forced keyframes in every rendition keep segments switchable
+        cmd += ["-c:v", "libx264", "-preset", self.preset, "-sc_threshold", "0",
+                "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})"]
+        for i, r in enumerate(renditions):
+            cmd += [f"-b:v:{i}", f"{r['video_bitrate']}k",
+                    f"-maxrate:v:{i}", f"{int(r['video_bitrate'] * 1.07)}k",
+                    f"-bufsize:v:{i}", f"{int(r['video_bitrate'] * 1.5)}k"]
+
+        if "dash" in formats:
+            if has_audio:
+                cmd += ["-map", "0:a:0", "-c:a", "aac", "-b:a", f"{renditions[0]['audio_bitrate']}k"]
+            cmd += ["-f", "dash", "-seg_duration", str(self.segment_seconds),
+                    "-use_template", "1", "-use_timeline", "1",
+                    "-adaptation_sets", "id=0,streams=v id=1,streams=a" if has_audio else "id=0,streams=v",
+                    "-init_seg_name", "init_$RepresentationID$.m4s",
+                    "-media_seg_name", "chunk_$RepresentationID$_$Number%05d$.m4s"]
+            if "hls" in formats:
+                cmd += ["-hls_playlist", "1"]  # HLS master over the same fMP4 segments
+            cmd += [os.path.join(output_dir, "manifest.mpd")]
+        else:
+            stream_map = []
+            for i, r in enumerate(renditions):
+                if has_audio:
+                    cmd += ["-map", "0:a:0"]
+                    cmd += [f"-c:a:{i}", "aac", f"-b:a:{i}", f"{r['audio_bitrate']}k"]
+                stream_map.append(f"v:{i},a:{i},name:{r['name']}" if has_audio else f"v:{i},name:{r['name']}")
+            cmd += ["-f", "hls", "-hls_time", str(self.segment_seconds),
+                    "-hls_playlist_type", "event", "-hls_segment_type", "fmp4",
+                    "-hls_flags", "independent_segments+temp_file",
+                    "-master_pl_name", "master.m3u8", "-var_stream_map", " ".join(stream_map),
+                    "-hls_segment_filename", os.path.join(output_dir, "%v", "segment_%05d.m4s"),
+                    os.path.join(output_dir, "%v", "index.m3u8")]
+        return cmd
+
+    def _completed_segments(self, output_dir):
+        # Both muxers write segments to *.tmp and rename when complete
+        return {
+            str(path) for path in Path(output_dir).rglob("*")
+            if path.suffix in SEGMENT_SUFFIXES and path.is_file()
+        }
+
+    def package(self, input_path, output_dir, formats=("hls", "dash"), source_height=None,
+                has_audio=True, on_segment=None, timeout=3600):
+        """Encode and segment `input_path`; `on_segment(path)` fires as each segment lands"""
+        output_dir = str(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        renditions = self.renditions_for(source_height)
+        cmd = self.build_command(input_path, output_dir, formats, renditions, has_audio)
+
+        seen = set()
+        first_segment_at = None
+        started = time.monotonic()
+        # stderr goes to a file: an undrained pipe fills up and stalls a chatty ffmpeg
+        stderr_file = tempfile.TemporaryFile(mode="w+")
+        try:
+            print(f"📡 Packaging {input_path} as {'+'.join(formats)} ({', '.join(r['name'] for r in renditions)})")
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr_file, text=True)
+            while True:
+                finished = process.poll() is not None
+                for segment in sorted(self._completed_segments(output_dir) - seen):
+                    seen.add(segment)
+                    if first_segment_at is None:
+                        first_segment_at = time.monotonic() - started
+                    if on_segment:
+                        on_segment(segment)
+                if finished:
+                    break
+                if time.monotonic() - started > timeout:
+                    process.kill()
+                    process.wait()
+                    raise TimeoutError(f"Packaging exceeded {timeout}s")
+                time.sleep(self.poll_interval)
+            stderr_file.seek(0)
+            stderr = stderr_file.read()
+
+            manifests = {}
+            if "dash" in formats:
+                manifests["dash"] = os.path.join(output_dir, "manifest.mpd")
+            if "hls" in formats:
+                manifests["hls"] = os.path.join(output_dir, "master.m3u8")
+
+            return {
+                "success": process.returncode == 0,
+                "output_dir": output_dir,
+                "manifests": manifests,
+                "renditions": [r["name"] for r in renditions],
+                "segments": len(seen),
+                "first_segment_seconds": round(first_segment_at, 2) if first_segment_at is not None else None,
+                "total_seconds": round(time.monotonic() - started, 2),
+                "command": " ".join(cmd),
+                "error": stderr if process.returncode != 0 else None
+            }
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            stderr_file.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    packager = StreamPackager()
+    print("📡 Stream Packager Ready")
+    print(json.dumps([r["name"] for r in packager.ladder]))
+    print(" ".join(packager.build_command("input.mp4", "stream_out")))
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Agent Tracing - Nested spans and profiling hooks across agent integrations
+Spans carry attributes and durations, nest through contextvars across
+threads and coroutines, and export to JSONL or Chrome trace files. With
+tracing disabled every hook is a single global check.
+
+Enable with AGENT_TRACE=jsonl:<path> or AGENT_TRACE=chrome:<path>
+(AGENT_TRACE=1 writes agent_traces.jsonl). AGENT_TRACE_PROFILE=cprofile
+dumps a .prof per top-level span; AGENT_TRACE_SAMPLE=<path> writes
+folded stacks from a sampling profiler for flame graphs.
+"""
+
+import atexit
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_current_span = contextvars.ContextVar("agent_trace_span", default=None)
+_span_ids = itertools.count(1)
+_tracer = None  # None means disabled; checked before doing any work
+
+
+class Span:
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "trace_id",
+                 "start_ns", "end_ns", "thread_id", "status", "_token", "_profile")
+
+    def __init__(self, name, attributes=None, parent=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.thread_id = threading.get_ident()
+        self.status = "ok"
+        self._token = None
+        self._profile = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_result(self, result):
+        """Copy the success/error convention of integration results onto the span"""
+        if isinstance(result, dict) and "success" in result:
+            self.attributes["success"] = bool(result["success"])
+            if not result["success"]:
+                self.status = "error"
+                if result.get("error"):
+                    self.attributes["error"] = str(result["error"])[:500]
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns or time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if self._profile is not None:
+            self._profile.disable()
+        tracer = _tracer
+        if tracer is not None:
+            tracer.finish(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "thread_id": self.thread_id,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is off so call sites need no branches"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_result(self, result):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+# ---- exporters -----------------------------------------------------------
+
+class JsonlExporter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a")
+
+    def export(self, span):
+        self.file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ChromeTraceExporter:
+    """Chrome trace JSON array format; the viewer accepts the array left unterminated"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.file = open(path, "w")
+        self.file.write("[\n")
+
+    def export(self, span):
+        event = {
+            "name": span.name, "ph": "X", "pid": self.pid, "tid": span.thread_id,
+            "ts": span.start_ns / 1000, "dur": (span.end_ns - span.start_ns) / 1000,
+            "args": dict(span.attributes, span_id=span.span_id, parent_id=span.parent_id, status=span.status)
+        }
+        self.file.write(json.dumps(event, default=str) + ",\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class Tracer:
+    def __init__(self, exporter, profile=None, flush_every=64):
+        self.exporter = exporter
+        self.profile = profile          # "cprofile" to profile each top-level span
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.pending = 0
+
+    def start_span(self, name, attributes=None):
+        parent = _current_span.get()
+        span = Span(name, attributes, parent)
+        if self.profile == "cprofile" and parent is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                span._profile = profile
+            except ValueError:
+                pass  # Another thread's top-level span is already being profiled
+        return span
+
+    def finish(self, span):
+        with self.lock:
+            self.exporter.export(span)
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self.exporter.flush()
+                self.pending = 0
+        if span._profile is not None:
+            span._profile.dump_stats(f"trace_{span.trace_id}_{span.name}.prof")
+
+    def close(self):
+        with self.lock:
+            self.exporter.flush()
+            self.exporter.close()
+
+
+# ---- sampling profiler ---------------------------------------------------
+
+class SamplingProfiler:
+    """py-spy style sampler: walks every thread's stack on a timer and counts folded stacks"""
+
+    def __init__(self, interval=0.005, path=None):
+        self.interval = interval
+        self.path = path
+        self.stacks = Counter()
+        self.running = False
+        self.thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while self.running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._sample, name="agent-trace-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        if self.path:
+            with open(self.path, "w") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        return self.stacks
+
+
+# ---- public API ----------------------------------------------------------
+
+def configure(spec=None, profile=None, sample_path=None):
+    """Enable tracing from a spec like "jsonl:traces.jsonl" or "chrome:trace.json"; None disables"""
+    global _tracer
+    if _tracer is not None:
+        atexit.unregister(_tracer.close)
+        _tracer.close()
+        _tracer = None
+    if not spec or spec == "0":
+        return None
+    kind, _, path = spec.partition(":")
+    if kind not in ("jsonl", "chrome"):
+        kind, path = "jsonl", ""
+    if kind == "chrome":
+        exporter = ChromeTraceExporter(path or "agent_trace.json")
+    else:
+        exporter = JsonlExporter(path or "agent_traces.jsonl")
+    _tracer = Tracer(exporter, profile)
+    atexit.register(_tracer.close)
+    if sample_path:
+        sampler = SamplingProfiler(path=sample_path).start()
+        atexit.register(sampler.stop)
+    return _tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def current_span():
+    return _current_span.get()
+
+
+def span(name, **attributes):
+    """Context manager for a nested span; a shared no-op when tracing is off"""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start_span(name, attributes)
+
+
+def traced(name=None):
+    """Decorator that wraps a sync or async callable in a span"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with _tracer.start_span(span_name) as active:
+                    result = await func(*args, **kwargs)
+                    active.record_result(result)
+                    return result
+            async_wrapper.__traced__ = True
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.start_span(span_name) as active:
+                result = func(*args, **kwargs)
+                active.record_result(result)
+                return result
+        wrapper.__traced__ = True
+        return wrapper
+    return decorate
+
+
+def instrument(cls, prefix=None):
+    """Trace every public method of an integration class; returns the class for decorator use"""
+    prefix = prefix or cls.__name__
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.isfunction(value) or getattr(value, "__traced__", False):
+            continue
+        setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+    return cls
+
+
+def run_in_context(func, *args):
+    """Bind the current span to a callable handed to a thread pool"""
+    return functools.partial(contextvars.copy_context().run, func, *args)
+
+
+if os.environ.get("AGENT_TRACE"):
+    configure(os.environ["AGENT_TRACE"], os.environ.get("AGENT_TRACE_PROFILE"),
+              os.environ.get("AGENT_TRACE_SAMPLE"))
+
+
+# Example usage
+if __name__ == "__main__":
+    class Demo:
+        def outer(self):
+            with span("inner_work", items=3):
+                time.sleep(0.01)
+            return {"success": True}
+
+        def cheap(self):
+            return 1
+
+    def per_call_ns(method, calls=1_000_000):
+        start = time.perf_counter()
+        for _ in range(calls):
+            method()
+        return (time.perf_counter() - start) / calls * 1e9
+
+    configure(None)
+    plain_ns = per_call_ns(Demo().cheap)
+    instrument(Demo)
+    demo = Demo()
+    print(f"⏱️ Tracing off: {per_call_ns(demo.cheap):.0f} ns per instrumented call ({plain_ns:.0f} ns plain)")
+
+    import tempfile
+    path = os.path.join(tempfile.gettempdir(), "agent_trace_demo.json")
+    configure(f"chrome:{path}")
+    demo.outer()
+    configure(None)
+    print(f"✅ Chrome trace written to {path} (open in chrome://tracing or Perfetto)")
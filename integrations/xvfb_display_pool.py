@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Xvfb Display Pool - Managed virtual X servers for headless GIMP work
+Starts a pool of Xvfb servers once, hands each worker its own display,
+restarts unhealthy servers and shuts everything down cleanly
+"""
+
+import atexit
+import contextlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+
+class DisplayInUse(RuntimeError):
+    """Another process claimed the display number between our check and Xvfb starting"""
+
+
+class XvfbDisplayPool:
+    def __init__(self, size=4, base_display=99, screen="1024x768x24", start_timeout=10.0, max_display_scan=100):
+        self.size = size
+        self.base_display = base_display
+        self.screen = screen
+        self.start_timeout = start_timeout
+        self.max_display_scan = max_display_scan  # display numbers tried beyond `size` before giving up
+        self.servers = {}  # display -> Popen
+        self.free = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = False
+        self._atexit_registered = False
+
+    @staticmethod
+    def _socket_path(number):
+        return f"/tmp/.X11-unix/X{number}"
+
+    @staticmethod
+    def _lock_path(number):
+        return f"/tmp/.X{number}-lock"
+
+    def _lock_owner(self, number):
+        try:
+            with open(self._lock_path(number)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _spawn(self, number):
+        """Start one Xvfb server and wait until its socket accepts clients"""
+        process = subprocess.Popen(
+            ["Xvfb", f":{number}", "-screen", "0", self.screen, "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                owner = self._lock_owner(number)
+                if owner is not None and owner != process.pid:
+                    raise DisplayInUse(f"Display :{number} was taken by pid {owner}")
+                raise RuntimeError(f"Xvfb :{number} exited with code {process.returncode}")
+            if os.path.exists(self._socket_path(number)):
+                return process
+            time.sleep(0.05)
+        process.kill()
+        raise RuntimeError(f"Xvfb :{number} did not start within {self.start_timeout}s")
+
+    def start(self):
+        """Start `size` servers on free display numbers from base_display up"""
+        if shutil.which("Xvfb") is None:
+            raise FileNotFoundError("Xvfb is not installed")
+        with self.lock:
+            if self.started:
+                return self
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+            number = self.base_display
+            last = self.base_display + self.size + self.max_display_scan
+            try:
+                while len(self.servers) < self.size:
+                    if number >= last:
+                        raise RuntimeError(f"No free display numbers in :{self.base_display}-:{last - 1}")
+                    # Leave displays owned by other processes alone, including ones
+                    # claimed after the lock-file check (lost race: try the next number)
+                    if not os.path.exists(self._lock_path(number)):
+                        display = f":{number}"
+                        try:
+                            self.servers[display] = self._spawn(number)
+                            self.free.put(display)
+                        except DisplayInUse:
+                            pass
+                    number += 1
+            except BaseException:
+                # Don't leak the servers that did start
+                self._stop_servers()
+                raise
+            self.started = True
+        print(f"✅ Virtual display pool ready: {', '.join(self.servers)}")
+        return self
+
+    def is_healthy(self, display):
+        process = self.servers.get(display)
+        number = int(display.lstrip(":"))
+        return process is not None and process.poll() is None and os.path.exists(self._socket_path(number))
+
+    def _ensure_healthy(self, display):
+        """Restart a display whose server died since it was last used"""
+        if self.is_healthy(display):
+            return
+        process = self.servers.get(display)
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        print(f"🔄 Restarting unhealthy virtual display {display}")
+        self.servers[display] = self._spawn(int(display.lstrip(":")))
+
+    @contextlib.contextmanager
+    def acquire(self, timeout=None):
+        """Borrow a display exclusively for the duration of the block"""
+        if not self.started:
+            self.start()
+        display = self.free.get(timeout=timeout)
+        try:
+            self._ensure_healthy(display)
+            yield display
+        finally:
+            self.free.put(display)
+
+    def health(self):
+        return [{
+            "display": display,
+            "pid": process.pid,
+            "alive": self.is_healthy(display)
+        } for display, process in self.servers.items()]
+
+    def _stop_servers(self, timeout=5.0):
+        for process in self.servers.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in self.servers.values():
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.servers.clear()
+        self.free = queue.Queue()
+        self.started = False
+
+    def shutdown(self, timeout=5.0):
+        """Terminate every server this pool started"""
+        with self.lock:
+            self._stop_servers(timeout)
+
+
+_shared_pool = None
+_shared_pool_failed_at = None
+_shared_pool_lock = threading.Lock()
+POOL_RETRY_SECONDS = 60.0  # how long a failed start is remembered before trying again
+
+
+def get_shared_pool(size=None):
+    """Process-wide display pool, started on first use; None if Xvfb is unavailable"""
+    global _shared_pool, _shared_pool_failed_at
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            if _shared_pool_failed_at is not None and time.monotonic() - _shared_pool_failed_at < POOL_RETRY_SECONDS:
+                return None
+            size = size or int(os.environ.get("AGENT_XVFB_POOL_SIZE", os.cpu_count() or 2))
+            pool = XvfbDisplayPool(size=size)
+            try:
+                pool.start()
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️ Virtual display pool unavailable: {e}")
+                _shared_pool_failed_at = time.monotonic()
+                return None
+            _shared_pool, _shared_pool_failed_at = pool, None
+        return _shared_pool
+
+
+# Example usage
+if __name__ == "__main__":
+    pool = XvfbDisplayPool(size=2)
+    try:
+        pool.start()
+        with pool.acquire() as display:
+            print(f"🖥️ Borrowed display {display}")
+        print(pool.health())
+    except (OSError, RuntimeError) as e:
+        print(f"❌ Display pool test failed: {e}")
+    finally:
+        pool.shutdown()
@@ -0,0 +1,87 @@
+"""AgentJobServer HTTP handling over a real loopback socket"""
+
+import asyncio
+import json
+
+import pytest
+
+from agents.agent_job_server import AgentJobServer
+
+
+async def exchange(raw):
+    """Send request bytes (or a function of the server returning them) to a fresh server.
+
+    Returns (status, body dict) of the first response.
+    """
+    server = AgentJobServer("test_agent", 0, host="127.0.0.1", workers=1)
+    await server.start()
+    try:
+        port = server.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw(server) if callable(raw) else raw)
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        body = await reader.readexactly(length)
+        writer.close()
+        return int(head.split(b" ")[1]), json.loads(body)
+    finally:
+        await server.stop()
+
+
+def request(method, path, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    lines += [f"{key}: {value}" for key, value in (headers or {"Content-Length": len(body)}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def test_ping_job_round_trip():
+    async def run():
+        server = AgentJobServer("test_agent", 0, host="127.0.0.1", workers=1)
+        await server.start()
+        try:
+            job = server.submit("ping", {"n": 1})
+            await asyncio.wait_for(job.done.wait(), 5)
+            return job.to_dict()
+        finally:
+            await server.stop()
+
+    job = asyncio.run(run())
+    assert job["status"] == "completed"
+    assert job["result"]["echo"] == {"n": 1}
+
+
+def test_health():
+    status, body = asyncio.run(exchange(request("GET", "/health")))
+    assert status == 200
+    assert body["agent"] == "test_agent"
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_invalid_content_length_is_rejected(length):
+    status, body = asyncio.run(exchange(request("POST", "/jobs", headers={"Content-Length": length})))
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_malformed_request_line_is_rejected():
+    status, body = asyncio.run(exchange(b"GARBAGE\r\n\r\n"))
+    assert status == 400
+
+
+@pytest.mark.parametrize("wait", ["soon", "nan"])
+def test_invalid_wait_is_rejected(wait):
+    def get_job(server):
+        job = server.submit("ping", {})
+        return request("GET", f"/jobs/{job.id}?wait={wait}")
+
+    status, body = asyncio.run(exchange(get_job))
+    assert status == 400
+    assert "wait" in body["error"]
+
+
+def test_unknown_job_type_is_rejected():
+    payload = json.dumps({"type": "no_such_job", "params": {}}).encode()
+    status, body = asyncio.run(exchange(request("POST", "/jobs", payload)))
+    assert status == 400
+    assert "ping" in body["job_types"]
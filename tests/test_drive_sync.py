@@ -0,0 +1,138 @@
+"""DriveSyncEngine against the in-memory FakeDriveService"""
+
+import hashlib
+import os
+
+import pytest
+
+from integrations.drive_sync import DriveSyncEngine, FakeDriveService, LocalFileMedia
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def drive():
+    return FakeDriveService()
+
+
+@pytest.fixture
+def engine(drive, tmp_path):
+    return DriveSyncEngine(drive, manifest_path=str(tmp_path / "manifest.json"), media_factory=LocalFileMedia)
+
+
+@pytest.fixture
+def local_dir(tmp_path):
+    root = tmp_path / "local"
+    write(str(root / "a.bin"), b"alpha")
+    write(str(root / "renders" / "b.bin"), b"bravo")
+    return str(root)
+
+
+def test_first_sync_uploads_everything(engine, drive, local_dir):
+    result = engine.sync_folder(local_dir, "root")
+    assert result["success"]
+    assert result["uploaded"] == 2
+    assert drive.calls["create"] == 3  # Two files and the renders folder
+
+
+def test_unchanged_files_are_skipped(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    received = drive.bytes_received
+
+    result = engine.sync_folder(local_dir, "root")
+    assert result["success"]
+    assert result["unchanged"] == 2
+    assert result["uploaded"] == result["updated"] == 0
+    assert drive.bytes_received == received
+
+
+def test_touched_but_identical_file_is_not_uploaded(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    path = os.path.join(local_dir, "a.bin")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    result = engine.sync_folder(local_dir, "root")
+    assert result["unchanged"] == 2
+    assert result["bytes_uploaded"] == 0
+
+
+def test_modified_file_updates_same_file_id(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    file_id = engine.manifest["roots"]["root"]["files"]["a.bin"]["file_id"]
+    path = os.path.join(local_dir, "a.bin")
+    write(path, b"alpha, revised")
+
+    result = engine.sync_folder(local_dir, "root")
+    assert result["updated"] == 1
+    assert result["uploaded"] == 0
+    assert engine.manifest["roots"]["root"]["files"]["a.bin"]["file_id"] == file_id
+    assert drive.files_by_id[file_id]["content"] == b"alpha, revised"
+
+
+def test_remote_edit_is_overwritten_in_place(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    file_id = engine.manifest["roots"]["root"]["files"]["a.bin"]["file_id"]
+    drive.edit_remote(file_id, b"edited in Drive")
+
+    result = engine.sync_folder(local_dir, "root")
+    assert result["remote_changes"] == 1
+    assert result["updated"] == 1
+    assert drive.files_by_id[file_id]["content"] == b"alpha"
+
+
+def test_existing_remote_files_are_adopted(drive, local_dir, tmp_path):
+    drive.files_by_id["existing"] = {"id": "existing", "name": "a.bin", "parents": ["root"],
+                                     "mimeType": "application/octet-stream", "trashed": False,
+                                     "content": b"alpha", "md5Checksum": hashlib.md5(b"alpha").hexdigest()}
+    engine = DriveSyncEngine(drive, manifest_path=str(tmp_path / "fresh.json"), media_factory=LocalFileMedia)
+
+    result = engine.sync_folder(local_dir, "root")
+    assert result["adopted"] == 1
+    assert result["uploaded"] == 1
+    assert engine.manifest["roots"]["root"]["files"]["a.bin"]["file_id"] == "existing"
+
+
+def test_manifest_survives_restart(drive, local_dir, tmp_path):
+    manifest = str(tmp_path / "manifest.json")
+    DriveSyncEngine(drive, manifest_path=manifest, media_factory=LocalFileMedia).sync_folder(local_dir, "root")
+
+    result = DriveSyncEngine(drive, manifest_path=manifest, media_factory=LocalFileMedia).sync_folder(local_dir, "root")
+    assert result["unchanged"] == 2
+    assert result["uploaded"] == 0
+
+
+def test_delete_missing_trashes_removed_files(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    file_id = engine.manifest["roots"]["root"]["files"]["a.bin"]["file_id"]
+    os.remove(os.path.join(local_dir, "a.bin"))
+
+    result = engine.sync_folder(local_dir, "root", delete_missing=True)
+    assert result["deleted"] == 1
+    assert drive.files_by_id[file_id]["trashed"] is True
+    assert "a.bin" not in engine.manifest["roots"]["root"]["files"]
+
+
+def test_delete_missing_refuses_empty_directory(engine, drive, local_dir):
+    engine.sync_folder(local_dir, "root")
+    for dirpath, _, filenames in os.walk(local_dir):
+        for filename in filenames:
+            os.remove(os.path.join(dirpath, filename))
+
+    result = engine.sync_folder(local_dir, "root", delete_missing=True)
+    assert not result["success"]
+    assert "Refusing to delete" in result["error"]
+    assert not any(item["trashed"] for item in drive.files_by_id.values())
+    assert len(engine.manifest["roots"]["root"]["files"]) == 2
+
+
+def test_missing_directory_is_an_error(engine, drive, local_dir, tmp_path):
+    engine.sync_folder(local_dir, "root")
+
+    result = engine.sync_folder(str(tmp_path / "unmounted"), "root", delete_missing=True)
+    assert not result["success"]
+    assert not any(item["trashed"] for item in drive.files_by_id.values())
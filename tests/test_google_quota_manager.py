@@ -0,0 +1,77 @@
+"""GoogleQuotaManager retry policy with fake HTTP errors and no real sleeping"""
+
+import pytest
+
+from integrations.google_quota_manager import (FakeFlakyRequest, FakeHttpError, GoogleQuotaManager,
+                                               acting_as, is_retryable)
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def manager(sleeps):
+    return GoogleQuotaManager(":memory:", budgets={"sheets": {"rate": 1000.0, "burst": 1000}},
+                              max_retries=3, base_delay=0.01, sleep=sleeps.append)
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_transient_errors_are_retried(manager, status):
+    request = FakeFlakyRequest(result={"ok": status}, failures=(status, status))
+    assert manager.execute(request, "sheets", agent="analytics_agent") == {"ok": status}
+    assert request.attempts == 3
+    stats = manager.throttle_stats()["analytics_agent"]
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+
+
+def test_bad_request_is_not_retried(manager):
+    request = FakeFlakyRequest(failures=(400,))
+    with pytest.raises(FakeHttpError):
+        manager.execute(request, "sheets", agent="analytics_agent")
+    assert request.attempts == 1
+    assert manager.throttle_stats()["analytics_agent"]["failures"] == 1
+
+
+def test_gives_up_after_max_retries(manager):
+    request = FakeFlakyRequest(failures=(503,) * 10)
+    with pytest.raises(FakeHttpError):
+        manager.execute(request, "sheets", agent="analytics_agent")
+    assert request.attempts == manager.max_retries + 1
+
+
+def test_retry_after_header_sets_minimum_delay(manager, sleeps):
+    class RetryAfterRequest(FakeFlakyRequest):
+        def execute(self):
+            self.attempts += 1
+            if self.attempts == 1:
+                raise FakeHttpError(429, "rateLimitExceeded", retry_after=7)
+            return self.result
+
+    manager.execute(RetryAfterRequest(), "sheets")
+    assert max(sleeps) >= 7
+
+
+def test_non_idempotent_calls_retry_only_when_rate_limited(manager):
+    unavailable = FakeFlakyRequest(failures=(503,))
+    with pytest.raises(FakeHttpError):
+        manager.execute(unavailable, "sheets", idempotent=False)
+    assert unavailable.attempts == 1
+
+    rate_limited = FakeFlakyRequest(failures=(429, 403))
+    assert manager.execute(rate_limited, "sheets", idempotent=False) == {"ok": True}
+    assert rate_limited.attempts == 3
+
+
+def test_network_errors_follow_idempotency():
+    assert is_retryable(ConnectionError("reset"))
+    assert not is_retryable(ConnectionError("reset"), idempotent=False)
+    assert not is_retryable(FakeHttpError(403, "forbidden"))
+
+
+def test_calls_are_attributed_to_calling_agent(manager):
+    with acting_as("report_generator"):
+        manager.execute(FakeFlakyRequest(failures=()), "sheets")
+    assert manager.throttle_stats()["report_generator"]["calls"] == 1
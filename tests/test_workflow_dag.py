@@ -0,0 +1,156 @@
+"""WorkflowDAG ordering, checkpoint reuse and failure propagation with registered functions"""
+
+from collections import Counter
+
+import pytest
+
+from agents.workflow_dag import WorkflowDAG, WorkflowError, run_workflow
+
+
+@pytest.fixture
+def calls():
+    return Counter()
+
+
+@pytest.fixture
+def failing():
+    return set()
+
+
+@pytest.fixture
+def functions(calls, failing):
+    def double(params):
+        calls["double"] += 1
+        return {"success": True, "value": params["value"] * 2}
+
+    def split(params):
+        calls["split"] += 1
+        return {"success": True, "items": list(range(params["count"]))}
+
+    def square(params):
+        calls["square"] += 1
+        if params["value"] in failing:
+            return {"success": False, "error": f"cannot square {params['value']}"}
+        return {"success": True, "value": params["value"] ** 2}
+
+    def fail(params):
+        calls["fail"] += 1
+        return {"success": False, "error": "boom"}
+
+    return {"double": double, "split": split, "square": square, "fail": fail}
+
+
+CHAIN = {
+    "name": "chain",
+    "nodes": {
+        "a": {"function": "double", "params": {"value": "${inputs.value}"}},
+        "b": {"function": "double", "params": {"value": "${a.value}"}},
+        "c": {"function": "double", "params": {"value": "${b.value}"}},
+    },
+}
+
+FAN_OUT = {
+    "name": "fan_out",
+    "nodes": {
+        "split": {"function": "split", "params": {"count": "${inputs.count}"}},
+        "square": {"function": "square", "foreach": "${split.items}",
+                   "params": {"value": "${item}"}},
+        "cube": {"function": "square", "foreach": "${square}", "params": {"value": "${item.value}"}},
+    },
+}
+
+
+def test_chain_passes_outputs_downstream(functions):
+    result = run_workflow(CHAIN, {"value": 3}, functions=functions)
+    assert result["success"]
+    assert result["results"]["c"]["value"] == 24
+
+
+def test_rerun_reuses_checkpointed_nodes(functions, calls, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    run_workflow(CHAIN, {"value": 3}, checkpoint_path=checkpoint, functions=functions)
+    assert calls["double"] == 3
+
+    rerun = run_workflow(CHAIN, {"value": 3}, checkpoint_path=checkpoint, functions=functions)
+    assert rerun["success"]
+    assert rerun["reused_from_checkpoint"] == 3
+    assert calls["double"] == 3
+
+
+def test_changed_inputs_invalidate_checkpoint(functions, calls, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    run_workflow(CHAIN, {"value": 3}, checkpoint_path=checkpoint, functions=functions)
+
+    rerun = run_workflow(CHAIN, {"value": 4}, checkpoint_path=checkpoint, functions=functions)
+    assert rerun["reused_from_checkpoint"] == 0
+    assert rerun["results"]["c"]["value"] == 32
+    assert calls["double"] == 6
+
+
+def test_failure_skips_downstream_nodes(functions, calls):
+    spec = {"name": "broken", "nodes": {
+        "a": {"function": "fail"},
+        "b": {"function": "double", "params": {"value": 1}, "after": ["a"]},
+        "c": {"function": "double", "params": {"value": "${b.value}"}},
+    }}
+    result = run_workflow(spec, functions=functions)
+    assert not result["success"]
+    assert result["status"] == {"a": "failed", "b": "skipped", "c": "skipped"}
+    assert sorted(result["failed_nodes"]) == ["a", "b", "c"]
+    assert calls["double"] == 0
+
+
+def test_failed_nodes_are_retried(functions, calls):
+    spec = {"name": "retry", "nodes": {"a": {"function": "fail", "retries": 2}}}
+    result = run_workflow(spec, functions=functions)
+    assert result["status"]["a"] == "failed"
+    assert calls["fail"] == 3
+
+
+def test_foreach_streams_items_downstream(functions):
+    result = run_workflow(FAN_OUT, {"count": 4}, functions=functions)
+    assert result["success"]
+    assert [r["value"] for r in result["results"]["cube"]] == [0, 1, 16, 81]
+
+
+def test_failed_item_fails_source_and_skips_consumer(functions, calls, failing, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    failing.add(2)
+    result = run_workflow(FAN_OUT, {"count": 4}, checkpoint_path=checkpoint, functions=functions)
+    assert result["status"]["square"] == "failed"
+    assert result["status"]["cube"] == "skipped"
+    assert result["results"]["square"][2]["error"] == "cannot square 2"
+    assert calls["square"] == 4 + 3  # The failed item is not passed on to cube
+
+    # Only the failed item runs again; finished items come from the checkpoint
+    calls.clear()
+    failing.clear()
+    rerun = run_workflow(FAN_OUT, {"count": 4}, checkpoint_path=checkpoint, functions=functions)
+    assert rerun["success"]
+    assert calls["split"] == 0
+    assert calls["square"] == 2  # square[2] and cube[2]
+
+
+def test_foreach_over_failed_source_is_skipped(functions):
+    spec = {"name": "dead_source", "nodes": {
+        "source": {"function": "fail", "foreach": "${inputs.items}"},
+        "consumer": {"function": "square", "foreach": "${source}", "params": {"value": "${item.value}"}},
+        "after_consumer": {"function": "double", "params": {"value": 1}, "after": ["consumer"]},
+    }}
+    result = run_workflow(spec, {"items": "not a list"}, functions=functions)
+    assert not result["success"]
+    assert result["status"]["source"] == "failed"
+    assert result["status"]["consumer"] == "skipped"
+    assert result["status"]["after_consumer"] == "skipped"
+
+
+@pytest.mark.parametrize("nodes, message", [
+    ({"a": {"function": "double", "params": {"value": "${b.value}"}},
+      "b": {"function": "double", "params": {"value": "${a.value}"}}}, "cycle"),
+    ({"a": {"function": "double", "params": {"value": "${missing.value}"}}}, "unknown nodes"),
+    ({"a": {"function": "nope"}}, "unknown function"),
+    ({"a": {"function": "double", "job": "x", "agent": "y"}}, "exactly one"),
+])
+def test_invalid_specs_are_rejected(functions, nodes, message):
+    with pytest.raises(WorkflowError, match=message):
+        WorkflowDAG({"name": "bad", "nodes": nodes}, functions=functions)